@@ -0,0 +1,120 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy.dialects.sqlite import insert
+from extensions import db, cache
+from models import Chapter, Quiz, Score, UserScoreSummary, QuizScoreSummary, UserSubjectScoreSummary, DailyScoreSummary
+
+def _upsert(model, keys, values, update):
+    stmt = insert(model).values(**keys, **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={column: expression(model, stmt.excluded) for column, expression in update.items()}
+    )
+    db.session.execute(stmt)
+
+def _add(column):
+    return lambda model, excluded: getattr(model, column) + getattr(excluded, column)
+
+def _min(column):
+    return lambda model, excluded: db.func.min(getattr(model, column), getattr(excluded, column))
+
+def _max(column):
+    return lambda model, excluded: db.func.max(getattr(model, column), getattr(excluded, column))
+
+def subject_id_for_quiz(quiz_id):
+    return db.session.query(Chapter.subject_id) \
+        .join(Quiz, Quiz.chapter_id == Chapter.id) \
+        .filter(Quiz.id == quiz_id).scalar()
+
+def subject_ids_for_quizzes(quiz_ids):
+    return dict(db.session.query(Quiz.id, Chapter.subject_id)
+                .join(Chapter, Chapter.id == Quiz.chapter_id)
+                .filter(Quiz.id.in_(quiz_ids)).all())
+
+def record_score(score, subject_id=None):
+    """Fold one new Score into the summary tables.
+
+    Runs inside the caller's transaction (no commit) so the summaries and the
+    Score row are committed or rolled back together.
+    """
+    _upsert(UserScoreSummary, {'user_id': score.user_id},
+            {'attempts': 1, 'total_score': score.total_score,
+             'best_score': score.total_score, 'last_attempt': score.timestamp},
+            {'attempts': _add('attempts'), 'total_score': _add('total_score'),
+             'best_score': _max('best_score'), 'last_attempt': _max('last_attempt')})
+    _upsert(QuizScoreSummary, {'quiz_id': score.quiz_id},
+            {'attempts': 1, 'total_score': score.total_score,
+             'min_score': score.total_score, 'max_score': score.total_score},
+            {'attempts': _add('attempts'), 'total_score': _add('total_score'),
+             'min_score': _min('min_score'), 'max_score': _max('max_score')})
+    if subject_id is not None:
+        _upsert(UserSubjectScoreSummary, {'user_id': score.user_id, 'subject_id': subject_id},
+                {'attempts': 1, 'total_score': score.total_score},
+                {'attempts': _add('attempts'), 'total_score': _add('total_score')})
+    _upsert(DailyScoreSummary, {'day': score.timestamp.date()},
+            {'attempts': 1, 'total_score': score.total_score},
+            {'attempts': _add('attempts'), 'total_score': _add('total_score')})
+
+def resync_subject_summaries(quiz_ids):
+    """Recompute the per-(user, subject) summaries of everyone who attempted quiz_ids.
+
+    Call after those quizzes moved to another subject (a quiz to another
+    chapter, or its chapter to another subject) or were deleted, in which case
+    pass the ids as a list taken before the delete. quiz_ids may be a list or
+    a select of ids. Runs inside the caller's transaction (no commit).
+    """
+    db.session.flush()
+    users = db.select(Score.user_id).where(Score.quiz_id.in_(quiz_ids)).distinct().scalar_subquery()
+    db.session.execute(db.delete(UserSubjectScoreSummary).where(UserSubjectScoreSummary.user_id.in_(users)))
+    db.session.execute(db.insert(UserSubjectScoreSummary).from_select(
+        ['user_id', 'subject_id', 'attempts', 'total_score'],
+        db.select(Score.user_id, Chapter.subject_id, db.func.count(Score.id), db.func.sum(Score.total_score))
+        .join(Quiz, Quiz.id == Score.quiz_id)
+        .join(Chapter, Chapter.id == Quiz.chapter_id)
+        .where(Score.user_id.in_(users))
+        .group_by(Score.user_id, Chapter.subject_id)
+    ))
+
+def rebuild_aggregates():
+    """Recompute every summary table from the raw Score rows (backfill / repair)"""
+    for model in (UserScoreSummary, QuizScoreSummary, UserSubjectScoreSummary, DailyScoreSummary):
+        db.session.query(model).delete()
+    db.session.execute(db.insert(UserScoreSummary).from_select(
+        ['user_id', 'attempts', 'total_score', 'best_score', 'last_attempt'],
+        db.select(Score.user_id, db.func.count(Score.id), db.func.sum(Score.total_score),
+                  db.func.max(Score.total_score), db.func.max(Score.timestamp))
+        .group_by(Score.user_id)
+    ))
+    db.session.execute(db.insert(QuizScoreSummary).from_select(
+        ['quiz_id', 'attempts', 'total_score', 'min_score', 'max_score'],
+        db.select(Score.quiz_id, db.func.count(Score.id), db.func.sum(Score.total_score),
+                  db.func.min(Score.total_score), db.func.max(Score.total_score))
+        .group_by(Score.quiz_id)
+    ))
+    db.session.execute(db.insert(UserSubjectScoreSummary).from_select(
+        ['user_id', 'subject_id', 'attempts', 'total_score'],
+        db.select(Score.user_id, Chapter.subject_id, db.func.count(Score.id), db.func.sum(Score.total_score))
+        .join(Quiz, Quiz.id == Score.quiz_id)
+        .join(Chapter, Chapter.id == Quiz.chapter_id)
+        .group_by(Score.user_id, Chapter.subject_id)
+    ))
+    db.session.execute(db.insert(DailyScoreSummary).from_select(
+        ['day', 'attempts', 'total_score'],
+        db.select(db.func.date(Score.timestamp), db.func.count(Score.id), db.func.sum(Score.total_score))
+        .group_by(db.func.date(Score.timestamp))
+    ))
+    db.session.commit()
+    return db.session.query(db.func.coalesce(db.func.sum(UserScoreSummary.attempts), 0)).scalar()
+
+def aggregates_need_backfill():
+    # Existing databases have scores but empty summaries until the first rebuild
+    return UserScoreSummary.query.first() is None and Score.query.first() is not None
+
+@click.command('rebuild-aggregates')
+@with_appcontext
+def rebuild_aggregates_command():
+    """Rebuild the score summary tables from the score history."""
+    total = rebuild_aggregates()
+    # Cached charts and analytics were built from the old summaries
+    cache.clear()
+    click.echo(f"Score summaries rebuilt from {total} attempts.")
@@ -0,0 +1,296 @@
+from datetime import datetime, timedelta
+from extensions import db
+from models import User, Subject, Chapter, Quiz, Score, UserScoreSummary, QuizScoreSummary, UserSubjectScoreSummary, DailyScoreSummary
+
+def empty_user_analytics():
+    return {
+        'total_quizzes': 0,
+        'average_score': 0,
+        'best_score': 0,
+        'total_score': 0,
+        'recent_activity': [],
+        'performance_by_subject': {},
+        'performance_by_chapter': {},
+        'score_trend': []
+    }
+
+def compute_user_analytics(user_id, recent_limit=5, trend_limit=10):
+    """Build the /user/analytics payload with a fixed number of grouped queries"""
+    # Totals and best score come from the running summary row
+    summary = db.session.get(UserScoreSummary, user_id)
+    if summary is None or not summary.attempts:
+        return empty_user_analytics()
+    total_quizzes, total_score, best_score = summary.attempts, summary.total_score, summary.best_score
+
+    # Recent activity (last attempts) with chapter and subject names joined in
+    recent_rows = db.session.query(
+        Score.quiz_id, Score.total_score, Score.timestamp, Chapter.name, Subject.name
+    ).outerjoin(Quiz, Quiz.id == Score.quiz_id) \
+        .outerjoin(Chapter, Chapter.id == Quiz.chapter_id) \
+        .outerjoin(Subject, Subject.id == Chapter.subject_id) \
+        .filter(Score.user_id == user_id) \
+        .order_by(Score.timestamp.desc(), Score.id) \
+        .limit(recent_limit).all()
+    recent_activity = [
+        {
+            'quiz_id': quiz_id,
+            'score': score,
+            'date': timestamp.strftime('%Y-%m-%d'),
+            'chapter': chapter_name if chapter_name else 'Unknown',
+            'subject': subject_name if subject_name else 'Unknown'
+        } for quiz_id, score, timestamp, chapter_name, subject_name in recent_rows
+    ]
+
+    # Per-subject averages from the (user, subject) summaries
+    subject_rows = db.session.query(
+        Subject.name, UserSubjectScoreSummary.total_score, UserSubjectScoreSummary.attempts
+    ).join(Subject, Subject.id == UserSubjectScoreSummary.subject_id) \
+        .filter(UserSubjectScoreSummary.user_id == user_id, UserSubjectScoreSummary.attempts > 0).all()
+    performance_by_subject = {name: subject_sum / subject_count for name, subject_sum, subject_count in subject_rows}
+
+    # Per-chapter averages; chapters are keyed by name, so same-named chapters share one bucket
+    chapter_rows = db.session.query(
+        Chapter.name, db.func.sum(Score.total_score), db.func.count(Score.id)
+    ).join(Quiz, Quiz.id == Score.quiz_id) \
+        .join(Chapter, Chapter.id == Quiz.chapter_id) \
+        .filter(Score.user_id == user_id) \
+        .group_by(Chapter.name).all()
+    performance_by_chapter = {name: chapter_sum / chapter_count for name, chapter_sum, chapter_count in chapter_rows}
+
+    # Score trend (last attempts, oldest first)
+    trend_rows = db.session.query(Score.total_score, Score.timestamp) \
+        .filter(Score.user_id == user_id) \
+        .order_by(Score.timestamp.desc(), Score.id.desc()) \
+        .limit(trend_limit).all()
+    score_trend = [
+        {
+            'attempt': i + 1,
+            'score': score,
+            'date': timestamp.strftime('%Y-%m-%d')
+        } for i, (score, timestamp) in enumerate(reversed(trend_rows))
+    ]
+
+    return {
+        'total_quizzes': total_quizzes,
+        'average_score': round(total_score / total_quizzes, 2),
+        'best_score': best_score,
+        'total_score': total_score,
+        'recent_activity': recent_activity,
+        'performance_by_subject': performance_by_subject,
+        'performance_by_chapter': performance_by_chapter,
+        'score_trend': score_trend
+    }
+
+CHART_ORDERS = ('top', 'bottom')
+
+def _filter_quizzes(query, subject_id=None, chapter_id=None):
+    if chapter_id is not None:
+        query = query.filter(Quiz.chapter_id == chapter_id)
+    if subject_id is not None:
+        query = query.join(Chapter, Chapter.id == Quiz.chapter_id).filter(Chapter.subject_id == subject_id)
+    return query
+
+def _summary_chart_rows(subject_id, chapter_id, order, limit):
+    # (quiz_id, attempts, total, min, max) straight from the per-quiz summaries
+    summary = QuizScoreSummary
+    query = db.session.query(summary.quiz_id, summary.attempts, summary.total_score, summary.min_score, summary.max_score) \
+        .join(Quiz, Quiz.id == summary.quiz_id) \
+        .filter(summary.attempts > 0)
+    query = _filter_quizzes(query, subject_id, chapter_id)
+    average = summary.total_score * 1.0 / summary.attempts
+    if order == 'top':
+        query = query.order_by(average.desc(), summary.quiz_id)
+    elif order == 'bottom':
+        query = query.order_by(average.asc(), summary.quiz_id)
+    else:
+        query = query.order_by(summary.quiz_id)
+    if limit is not None:
+        query = query.limit(limit)
+    return [(quiz_id, attempts, total, low, high, None) for quiz_id, attempts, total, low, high in query.all()]
+
+def _score_chart_rows(subject_id, chapter_id, start, end, order, limit):
+    # One pass over Score grouped by (quiz, score): the per-score counts are the
+    # histogram, and attempts, total, min and max fold out of them
+    query = db.session.query(Score.quiz_id, Score.total_score, db.func.count(Score.id)) \
+        .join(Quiz, Quiz.id == Score.quiz_id)
+    query = _filter_quizzes(query, subject_id, chapter_id)
+    if start is not None:
+        query = query.filter(Score.timestamp >= datetime.combine(start, datetime.min.time()))
+    if end is not None:
+        query = query.filter(Score.timestamp < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    per_quiz = {}
+    for quiz_id, score, count in query.group_by(Score.quiz_id, Score.total_score).all():
+        per_quiz.setdefault(quiz_id, []).append((score, count))
+    rows = []
+    for quiz_id, histogram in per_quiz.items():
+        histogram.sort()
+        attempts = sum(count for _, count in histogram)
+        total = sum(score * count for score, count in histogram)
+        rows.append((quiz_id, attempts, total, histogram[0][0], histogram[-1][0], histogram))
+    if order in CHART_ORDERS:
+        rows.sort(key=lambda row: (-row[2] / row[1] if order == 'top' else row[2] / row[1], row[0]))
+    else:
+        rows.sort()
+    return rows[:limit] if limit is not None else rows
+
+def parse_chart_args(args):
+    """compute_admin_charts keyword arguments from request args; raises ValueError"""
+    options = {}
+    for name in ('subject_id', 'chapter_id', 'limit'):
+        if args.get(name):
+            try:
+                options[name] = int(args[name])
+            except ValueError:
+                raise ValueError(f"'{name}' must be an integer")
+    if options.get('limit') is not None and options['limit'] < 1:
+        raise ValueError("'limit' must be at least 1")
+    for name in ('start', 'end'):
+        if args.get(name):
+            try:
+                options[name] = datetime.strptime(args[name], '%Y-%m-%d').date()
+            except ValueError:
+                raise ValueError(f"'{name}' must be a date (YYYY-MM-DD)")
+    if args.get('order'):
+        if args['order'] not in CHART_ORDERS:
+            raise ValueError(f"'order' must be one of: {', '.join(CHART_ORDERS)}")
+        options['order'] = args['order']
+    options['histogram'] = args.get('histogram') in ('1', 'true')
+    return options
+
+def compute_admin_charts(subject_id=None, chapter_id=None, start=None, end=None, order=None, limit=None, histogram=False):
+    """Per-quiz average, attempts, min and max score from one grouped query.
+
+    Filters by subject, chapter and attempt date range (inclusive dates);
+    order='top'/'bottom' with a limit keeps only the best or worst averages.
+    Without a date range or histogram the per-quiz summaries are read,
+    otherwise the scores themselves are grouped by quiz and score value.
+    """
+    if start is not None or end is not None or histogram:
+        rows = _score_chart_rows(subject_id, chapter_id, start, end, order, limit)
+    else:
+        rows = _summary_chart_rows(subject_id, chapter_id, order, limit)
+    chart = {
+        'labels': [f"Quiz {row[0]}" for row in rows],
+        'scores': [round(row[2] / row[1], 2) for row in rows],
+        'quiz_ids': [row[0] for row in rows],
+        'attempts': [row[1] for row in rows],
+        'min_scores': [row[3] for row in rows],
+        'max_scores': [row[4] for row in rows]
+    }
+    if histogram:
+        # [score, attempts with that score] pairs per quiz
+        chart['histograms'] = [[list(pair) for pair in row[5]] for row in rows]
+    return chart
+
+def compute_admin_analytics(days=7):
+    """Dashboard counters, attempts over the last days and top users from the summaries"""
+    total_scores, score_sum = db.session.query(
+        db.func.coalesce(db.func.sum(DailyScoreSummary.attempts), 0),
+        db.func.coalesce(db.func.sum(DailyScoreSummary.total_score), 0)
+    ).one()
+    avg_score = score_sum / total_scores if total_scores else 0
+    # All catalogue counters in one statement of scalar subqueries
+    total_users, total_quizzes, total_subjects, total_chapters = db.session.query(
+        db.select(db.func.count(User.id)).where(User.role == 'user').scalar_subquery(),
+        db.select(db.func.count(Quiz.id)).scalar_subquery(),
+        db.select(db.func.count(Subject.id)).scalar_subquery(),
+        db.select(db.func.count(Chapter.id)).scalar_subquery()
+    ).one()
+    analytics = {
+        'total_users': total_users,
+        'total_quizzes': total_quizzes,
+        'total_scores': total_scores,
+        'total_subjects': total_subjects,
+        'total_chapters': total_chapters,
+        'average_score': round(avg_score, 2) if avg_score else 0
+    }
+
+    # Attempts over time (last days), missing days count as zero
+    today = datetime.now().date()
+    first_day = today - timedelta(days=days - 1)
+    daily = dict(db.session.query(DailyScoreSummary.day, DailyScoreSummary.attempts)
+                 .filter(DailyScoreSummary.day >= first_day, DailyScoreSummary.day <= today).all())
+    attempts_over_time = []
+    for i in range(days - 1, -1, -1):
+        day = today - timedelta(days=i)
+        attempts_over_time.append({'date': day.strftime('%Y-%m-%d'), 'count': daily.get(day, 0)})
+
+    # Top scoring users (by total score)
+    user_scores = db.session.query(User.full_name, UserScoreSummary.total_score) \
+        .join(UserScoreSummary, UserScoreSummary.user_id == User.id) \
+        .order_by(UserScoreSummary.total_score.desc()) \
+        .limit(5).all()
+    top_users = [{'name': name, 'score': score} for name, score in user_scores]
+
+    return {
+        'analytics': analytics,
+        'attempts_over_time': attempts_over_time,
+        'top_users': top_users
+    }
+
+# bucket -> (SQLite expression for the bucket start, label format, step, default window)
+TIMESERIES_BUCKETS = {
+    'hour': (lambda column: db.func.strftime('%Y-%m-%d %H:00', column), '%Y-%m-%d %H:00', timedelta(hours=1), timedelta(hours=48)),
+    'day': (lambda column: db.func.date(column), '%Y-%m-%d', timedelta(days=1), timedelta(days=30)),
+    'week': (lambda column: db.func.date(column, 'weekday 0', '-6 days'), '%Y-%m-%d', timedelta(weeks=1), timedelta(weeks=12)),
+}
+TIMESERIES_MAX_BUCKETS = 2000
+
+def _bucket_floor(moment, bucket):
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    if bucket == 'hour':
+        return moment
+    moment = moment.replace(hour=0)
+    return moment - timedelta(days=moment.weekday()) if bucket == 'week' else moment
+
+def parse_timeseries_args(args, now=None):
+    """(bucket, start, end) from request args; the window is [start, end), start aligned to its bucket"""
+    bucket = args.get('bucket', 'day')
+    if bucket not in TIMESERIES_BUCKETS:
+        raise ValueError(f"'bucket' must be one of: {', '.join(TIMESERIES_BUCKETS)}")
+    bounds = {}
+    for name in ('start', 'end'):
+        try:
+            bounds[name] = datetime.fromisoformat(args[name]) if args.get(name) else None
+        except ValueError:
+            raise ValueError(f"'{name}' must be an ISO date or datetime")
+    _, _, step, default_window = TIMESERIES_BUCKETS[bucket]
+    end = bounds['end'] or now or datetime.now()
+    start = _bucket_floor(bounds['start'] or end - default_window + step, bucket)
+    if start >= end:
+        raise ValueError("'start' must be before 'end'")
+    if (end - start) / step > TIMESERIES_MAX_BUCKETS:
+        raise ValueError(f"Window too large: at most {TIMESERIES_MAX_BUCKETS} {bucket} buckets")
+    return bucket, start, end
+
+def compute_score_timeseries(bucket, start, end):
+    """Attempts, average score and distinct active users per bucket in [start, end).
+
+    One grouped query; the range predicate on Score.timestamp uses its index and
+    only the selected rows are bucketed. Empty buckets are filled with zeros.
+    """
+    expression, label_format, step, _ = TIMESERIES_BUCKETS[bucket]
+    bucket_start = expression(Score.timestamp)
+    rows = db.session.query(
+        bucket_start, db.func.count(Score.id), db.func.avg(Score.total_score), db.func.count(db.distinct(Score.user_id))
+    ).filter(Score.timestamp >= start, Score.timestamp < end) \
+        .group_by(bucket_start).all()
+    by_bucket = {label: (attempts, average, users) for label, attempts, average, users in rows}
+    series = []
+    moment = start
+    while moment < end:
+        label = moment.strftime(label_format)
+        attempts, average, users = by_bucket.get(label, (0, None, 0))
+        series.append({
+            'bucket': label,
+            'attempts': attempts,
+            'average_score': round(average, 2) if average is not None else 0,
+            'active_users': users
+        })
+        moment += step
+    return {
+        'bucket': bucket,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'series': series
+    }
@@ -1,12 +1,19 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, Response, stream_with_context
 from flask_login import login_required, current_user
-from extensions import db, cache, invalidate_cache_pattern, invalidate_user_cache, invalidate_subject_cache, invalidate_chapter_cache, invalidate_quiz_cache, invalidate_question_cache, invalidate_charts_cache, cache_key_with_user, cache_key_with_params, get_cache_stats, delete_cache_pattern
+from extensions import db, cache, tagged_cache_key, invalidate_tags, invalidate_user_cache, invalidate_subject_cache, invalidate_chapter_cache, invalidate_quiz_cache, invalidate_question_cache, invalidate_score_cache, get_cache_stats
 from models import User, Subject, Chapter, Quiz, Question, Score
+from analytics import compute_user_analytics, compute_admin_charts, compute_admin_analytics, parse_chart_args, parse_timeseries_args, compute_score_timeseries
+from aggregates import record_score, subject_id_for_quiz, subject_ids_for_quizzes, resync_subject_summaries
+from grading import answer_key, grade, grade_submissions
+from submissions import write_behind_enabled, enqueue_submission, submission_queue_stats
+from listing import list_response, is_stream_request
+from exports import EXPORT_COMPRESSION, parse_compression, quiz_history_filename, quiz_history_chunks
+from cache_policy import cached_endpoint, catalogue_list_key, user_analytics_key, admin_charts_key, admin_analytics_key, admin_timeseries_key
 from datetime import datetime
 import os
 import csv
 import glob
-from celery_app import export_all_users_stats_task, export_quiz_history_task, test_email_task, monthly_report_task
+from celery_app import export_all_users_stats_task, export_quiz_history_task, test_email_task, monthly_report_task, warm_cache_task
 
 api = Blueprint('api', __name__)
 
@@ -29,6 +36,9 @@ def api_register():
     db.session.add(user)
     db.session.commit()
     
+    # New user shows up in the users list
+    invalidate_user_cache()
+    
     return jsonify({'message': 'User registered successfully!'}), 201
 
 @api.route('/login', methods=['POST'])
@@ -50,24 +60,15 @@ def api_logout():
 
 @api.route('/users', methods=['GET'])
 @login_required
-@cache.cached(timeout=1, key_prefix=lambda: f"users_list_{current_user.role}")
+@cached_endpoint('users', key=lambda: tagged_cache_key(f"users_list_{current_user.role}", ["users"], **request.args), unless=is_stream_request)
 def get_users():
     if current_user.role != 'admin':
         return jsonify({'error': 'Unauthorized'}), 403
-    users = User.query.filter_by(role='user').all()
-    user_list = [
-        {
-            'id': u.id,
-            'email': u.email,
-            'full_name': u.full_name,
-            'role': u.role
-        } for u in users
-    ]
-    return jsonify({'users': user_list}), 200
+    return list_response('users')
 
 @api.route('/users/<int:user_id>', methods=['GET'])
 @login_required
-@cache.cached(timeout=1, key_prefix=lambda: f"user_{request.view_args['user_id']}")
+@cached_endpoint('users', key=lambda: tagged_cache_key(f"user_{request.view_args['user_id']}", [f"user:{request.view_args['user_id']}"], viewer=current_user.id))
 def get_user(user_id):
     if current_user.role != 'admin' and current_user.id != user_id:
         return jsonify({'error': 'Unauthorized'}), 403
@@ -93,12 +94,8 @@ def update_user(user_id):
         user.set_password(data.get('password'))
     db.session.commit()
     
-    # Invalidate user cache
+    # Invalidate user cache (profile and users list)
     invalidate_user_cache(user_id)
-    cache.delete(f"user_{user_id}")
-    # Invalidate users list cache for all roles
-    cache.delete(f"users_list_admin")
-    cache.delete(f"users_list_user")
     
     return jsonify({'message': 'User updated successfully!'}), 200
 
@@ -111,33 +108,21 @@ def delete_user(user_id):
     db.session.delete(user)
     db.session.commit()
     
-    # Invalidate user cache
+    # Invalidate user cache (profile and users list)
     invalidate_user_cache(user_id)
-    cache.delete(f"user_{user_id}")
-    # Invalidate users list cache for all roles
-    cache.delete(f"users_list_admin")
-    cache.delete(f"users_list_user")
     
     return jsonify({'message': 'User deleted successfully!'}), 200
 
 # Subject Management APIs
 @api.route('/subjects', methods=['GET'])
 @login_required
-@cache.cached(timeout=1)  
+@cached_endpoint('subjects', key=lambda: catalogue_list_key("subjects", **request.args), unless=is_stream_request)
 def get_subjects():
-    subjects = Subject.query.all()
-    subject_list = [
-        {
-            'id': s.id,
-            'name': s.name,
-            'description': s.description
-        } for s in subjects
-    ]
-    return jsonify({'subjects': subject_list}), 200
+    return list_response('subjects')
 
 @api.route('/subjects/<int:subject_id>', methods=['GET'])
 @login_required
-@cache.cached(timeout=1, key_prefix=lambda: f"subject_{request.view_args['subject_id']}")
+@cached_endpoint('subjects', key=lambda: tagged_cache_key(f"subject_{request.view_args['subject_id']}", [f"subject:{request.view_args['subject_id']}"]))
 def get_subject(subject_id):
     subject = Subject.query.get_or_404(subject_id)
     subject_data = {
@@ -177,10 +162,7 @@ def update_subject(subject_id):
     db.session.commit()
     
     # Invalidate subject cache
-    invalidate_subject_cache()
-    cache.delete(f"subject_{subject_id}")
-    # Invalidate subjects list cache
-    cache.delete("quiz_masterview//api/subjects")
+    invalidate_subject_cache(subject_id)
     
     return jsonify({'message': 'Subject updated successfully!'}), 200
 
@@ -190,36 +172,29 @@ def delete_subject(subject_id):
     if current_user.role != 'admin':
         return jsonify({'error': 'Unauthorized'}), 403
     subject = Subject.query.get_or_404(subject_id)
+    # Chapters, quizzes and questions are removed with it by the cascade
+    quizzes = [q for c in subject.chapters for q in c.quizzes]
+    dependent_tags = [f"chapter:{c.id}" for c in subject.chapters] + [f"quiz:{q.id}" for q in quizzes] \
+        + [f"question:{question.id}" for q in quizzes for question in q.questions]
     db.session.delete(subject)
     db.session.commit()
     
-    # Invalidate subject cache
-    invalidate_subject_cache()
-    cache.delete(f"subject_{subject_id}")
-    # Invalidate subjects list cache
-    cache.delete("quiz_masterview//api/subjects")
+    # Invalidate subject cache and everything removed with it
+    invalidate_subject_cache(subject_id)
+    invalidate_tags("chapters", "quizzes", "questions", *dependent_tags)
     
     return jsonify({'message': 'Subject deleted successfully!'}), 200
 
 # Chapter Management APIs
 @api.route('/chapters', methods=['GET'])
 @login_required
-@cache.cached(timeout=1)  
+@cached_endpoint('chapters', key=lambda: catalogue_list_key("chapters", **request.args), unless=is_stream_request)
 def get_chapters():
-    chapters = Chapter.query.all()
-    chapter_list = [
-        {
-            'id': c.id,
-            'name': c.name,
-            'description': c.description,
-            'subject_id': c.subject_id
-        } for c in chapters
-    ]
-    return jsonify({'chapters': chapter_list}), 200
+    return list_response('chapters')
 
 @api.route('/chapters/<int:chapter_id>', methods=['GET'])
 @login_required
-@cache.cached(timeout=1, key_prefix=lambda: f"chapter_{request.view_args['chapter_id']}")
+@cached_endpoint('chapters', key=lambda: tagged_cache_key(f"chapter_{request.view_args['chapter_id']}", [f"chapter:{request.view_args['chapter_id']}"]))
 def get_chapter(chapter_id):
     chapter = Chapter.query.get_or_404(chapter_id)
     chapter_data = {
@@ -258,12 +233,15 @@ def update_chapter(chapter_id):
     data = request.get_json()
     chapter.name = data.get('name', chapter.name)
     chapter.description = data.get('description', chapter.description)
+    old_subject_id = chapter.subject_id
     chapter.subject_id = data.get('subject_id', chapter.subject_id)
+    if chapter.subject_id != old_subject_id:
+        # The chapter's attempts now count toward another subject
+        resync_subject_summaries(db.select(Quiz.id).where(Quiz.chapter_id == chapter_id))
     db.session.commit()
     
     # Invalidate chapter cache
-    invalidate_chapter_cache()
-    cache.delete(f"chapter_{chapter_id}")
+    invalidate_chapter_cache(chapter_id)
     
     return jsonify({'message': 'Chapter updated successfully!'}), 200
 
@@ -273,35 +251,31 @@ def delete_chapter(chapter_id):
     if current_user.role != 'admin':
         return jsonify({'error': 'Unauthorized'}), 403
     chapter = Chapter.query.get_or_404(chapter_id)
+    # Quizzes and questions are removed with it by the cascade
+    quiz_ids = [q.id for q in chapter.quizzes]
+    dependent_tags = [f"quiz:{quiz_id}" for quiz_id in quiz_ids] \
+        + [f"question:{question.id}" for q in chapter.quizzes for question in q.questions]
     db.session.delete(chapter)
+    # Their attempts stay but no longer count toward any subject
+    resync_subject_summaries(quiz_ids)
     db.session.commit()
     
-    # Invalidate chapter cache
-    invalidate_chapter_cache()
-    cache.delete(f"chapter_{chapter_id}")
+    # Invalidate chapter cache and everything removed with it
+    invalidate_chapter_cache(chapter_id)
+    invalidate_tags("quizzes", "questions", *dependent_tags)
     
     return jsonify({'message': 'Chapter deleted successfully!'}), 200
 
 # Quiz Management APIs
 @api.route('/quizzes', methods=['GET'])
 @login_required
-@cache.cached(timeout=1)  
+@cached_endpoint('quizzes', key=lambda: catalogue_list_key("quizzes", **request.args), unless=is_stream_request)
 def get_quizzes():
-    quizzes = Quiz.query.all()
-    quiz_list = [
-        {
-            'id': q.id,
-            'chapter_id': q.chapter_id,
-            'date_of_quiz': q.date_of_quiz.strftime('%Y-%m-%d'),
-            'duration': q.duration,
-            'remarks': q.remarks
-        } for q in quizzes
-    ]
-    return jsonify({'quizzes': quiz_list}), 200
+    return list_response('quizzes')
 
 @api.route('/quizzes/<int:quiz_id>', methods=['GET'])
 @login_required
-@cache.cached(timeout=1, key_prefix=lambda: f"quiz_{request.view_args['quiz_id']}")
+@cached_endpoint('quizzes', key=lambda: tagged_cache_key(f"quiz_{request.view_args['quiz_id']}", [f"quiz:{request.view_args['quiz_id']}"]))
 def get_quiz(quiz_id):
     quiz = Quiz.query.get_or_404(quiz_id)
     quiz_data = {
@@ -344,7 +318,11 @@ def update_quiz(quiz_id):
         return jsonify({'error': 'Unauthorized'}), 403
     quiz = Quiz.query.get_or_404(quiz_id)
     data = request.get_json()
+    old_chapter_id = quiz.chapter_id
     quiz.chapter_id = data.get('chapter_id', quiz.chapter_id)
+    if quiz.chapter_id != old_chapter_id:
+        # The quiz's attempts may now count toward another subject
+        resync_subject_summaries([quiz_id])
     if data.get('date_of_quiz'):
         quiz.date_of_quiz = datetime.strptime(data.get('date_of_quiz'), '%Y-%m-%d').date()
     quiz.duration = data.get('duration', quiz.duration)
@@ -352,8 +330,7 @@ def update_quiz(quiz_id):
     db.session.commit()
     
     # Invalidate quiz cache
-    invalidate_quiz_cache()
-    cache.delete(f"quiz_{quiz_id}")
+    invalidate_quiz_cache(quiz_id)
     
     return jsonify({'message': 'Quiz updated successfully!'}), 200
 
@@ -363,38 +340,29 @@ def delete_quiz(quiz_id):
     if current_user.role != 'admin':
         return jsonify({'error': 'Unauthorized'}), 403
     quiz = Quiz.query.get_or_404(quiz_id)
+    # Questions are removed with it by the cascade
+    dependent_tags = [f"question:{question.id}" for question in quiz.questions]
     db.session.delete(quiz)
+    # Its attempts stay but no longer count toward any subject
+    resync_subject_summaries([quiz_id])
     db.session.commit()
     
-    # Invalidate quiz cache
-    invalidate_quiz_cache()
-    cache.delete(f"quiz_{quiz_id}")
+    # Invalidate quiz cache and its questions
+    invalidate_quiz_cache(quiz_id)
+    invalidate_tags("questions", *dependent_tags)
     
     return jsonify({'message': 'Quiz deleted successfully!'}), 200
 
 # Question Management APIs
 @api.route('/questions', methods=['GET'])
 @login_required
-@cache.cached(timeout=1)  
+@cached_endpoint('questions', key=lambda: catalogue_list_key("questions", **request.args), unless=is_stream_request)
 def get_questions():
-    questions = Question.query.all()
-    question_list = [
-        {
-            'id': q.id,
-            'quiz_id': q.quiz_id,
-            'question_statement': q.question_statement,
-            'option1': q.option1,
-            'option2': q.option2,
-            'option3': q.option3,
-            'option4': q.option4,
-            'correct_option': q.correct_option
-        } for q in questions
-    ]
-    return jsonify({'questions': question_list}), 200
+    return list_response('questions')
 
 @api.route('/questions/<int:question_id>', methods=['GET'])
 @login_required
-@cache.cached(timeout=1, key_prefix=lambda: f"question_{request.view_args['question_id']}")
+@cached_endpoint('questions', key=lambda: tagged_cache_key(f"question_{request.view_args['question_id']}", [f"question:{request.view_args['question_id']}"]))
 def get_question(question_id):
     question = Question.query.get_or_404(question_id)
     question_data = {
@@ -454,8 +422,7 @@ def update_question(question_id):
     db.session.commit()
     
     # Invalidate question cache
-    invalidate_question_cache()
-    cache.delete(f"question_{question_id}")
+    invalidate_question_cache(question_id)
     
     return jsonify({'message': 'Question updated successfully!'}), 200
 
@@ -469,33 +436,22 @@ def delete_question(question_id):
     db.session.commit()
     
     # Invalidate question cache
-    invalidate_question_cache()
-    cache.delete(f"question_{question_id}")
+    invalidate_question_cache(question_id)
     
     return jsonify({'message': 'Question deleted successfully!'}), 200
 
 # Score Management APIs
 @api.route('/scores', methods=['GET'])
 @login_required
-@cache.cached(timeout=1, key_prefix=lambda: f"scores_list_{current_user.role}")
+@cached_endpoint('scores', key=lambda: tagged_cache_key(f"scores_list_{current_user.role}", ["scores"], **request.args), unless=is_stream_request)
 def get_scores():
     if current_user.role != 'admin':
         return jsonify({'error': 'Unauthorized'}), 403
-    scores = Score.query.all()
-    score_list = [
-        {
-            'id': s.id,
-            'user_id': s.user_id,
-            'quiz_id': s.quiz_id,
-            'total_score': s.total_score,
-            'timestamp': s.timestamp.strftime('%Y-%m-%d %H:%M:%S')
-        } for s in scores
-    ]
-    return jsonify({'scores': score_list}), 200
+    return list_response('scores')
 
 @api.route('/scores/<int:score_id>', methods=['GET'])
 @login_required
-@cache.cached(timeout=1, key_prefix=lambda: f"score_{request.view_args['score_id']}")
+@cached_endpoint('scores', key=lambda: f"score_{request.view_args['score_id']}_{current_user.id}")
 def get_score(score_id):
     score = Score.query.get_or_404(score_id)
     if current_user.role != 'admin' and current_user.id != score.user_id:
@@ -516,39 +472,86 @@ def attempt_quiz(quiz_id):
     data = request.get_json()
     answers = data.get('answers', {})
     
-    # Get quiz questions
-    questions = Question.query.filter_by(quiz_id=quiz_id).all()
-    total_score = 0
-    
-    for question in questions:
-        user_answer = answers.get(str(question.id))
-        if user_answer is not None and int(user_answer) == question.correct_option:
-            total_score += 1
-    
-    # Save score with timestamp
-    score = Score(
-        user_id=current_user.id,
-        quiz_id=quiz_id,
-        total_score=total_score,
-        timestamp=datetime.now()
-    )
-    db.session.add(score)
-    db.session.commit()
-    
-    # Invalidate user-specific cache
-    invalidate_user_cache(current_user.id)
-    invalidate_charts_cache()
+    # Grade against the quiz's cached answer key
+    key = answer_key(quiz_id)
+    total_score = grade(key, answers)
+    
+    # Queue the graded attempt for the batch writer when enabled
+    timestamp = datetime.now()
+    submission_id = None
+    if write_behind_enabled():
+        submission_id = enqueue_submission(current_user.id, quiz_id, total_score, timestamp)
+    
+    if submission_id is None:
+        # Save score with timestamp
+        score = Score(
+            user_id=current_user.id,
+            quiz_id=quiz_id,
+            total_score=total_score,
+            timestamp=timestamp
+        )
+        db.session.add(score)
+        record_score(score, subject_id_for_quiz(quiz_id))
+        db.session.commit()
+        
+        # Invalidate the user's history/analytics and score aggregates
+        invalidate_score_cache(current_user.id)
     
     return jsonify({
         'message': 'Quiz completed successfully!',
         'total_score': total_score,
-        'total_questions': len(questions)
+        'total_questions': len(key[0]),
+        'queued': submission_id is not None,
+        'submission_id': submission_id
     }), 200
 
+@api.route('/admin/attempts/import', methods=['POST'])
+@login_required
+def import_attempts():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    attempts = (request.get_json() or {}).get('attempts', [])
+    if not isinstance(attempts, list) or not attempts:
+        return jsonify({'error': 'attempts must be a non-empty list'}), 400
+    try:
+        rows = [
+            (int(a['user_id']), int(a['quiz_id']), a.get('answers') or {},
+             datetime.strptime(a['timestamp'], '%Y-%m-%d %H:%M:%S') if a.get('timestamp') else datetime.now())
+            for a in attempts
+        ]
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid attempt: {e}'}), 400
+    
+    user_ids = {user_id for user_id, _, _, _ in rows}
+    quiz_ids = {quiz_id for _, quiz_id, _, _ in rows}
+    known_users = {u for (u,) in db.session.query(User.id).filter(User.id.in_(user_ids))}
+    subject_ids = subject_ids_for_quizzes(quiz_ids)
+    unknown = sorted(user_ids - known_users)
+    if unknown:
+        return jsonify({'error': f'Unknown user ids: {unknown}'}), 400
+    unknown = sorted(quiz_ids - set(subject_ids))
+    if unknown:
+        return jsonify({'error': f'Unknown quiz ids: {unknown}'}), 400
+    
+    # Grade everything in one pass, then save in a single transaction
+    graded = grade_submissions([(quiz_id, answers) for _, quiz_id, answers, _ in rows])
+    results = []
+    for (user_id, quiz_id, _, timestamp), (total_score, total_questions) in zip(rows, graded):
+        score = Score(user_id=user_id, quiz_id=quiz_id, total_score=total_score, timestamp=timestamp)
+        db.session.add(score)
+        record_score(score, subject_ids[quiz_id])
+        results.append({'user_id': user_id, 'quiz_id': quiz_id,
+                        'total_score': total_score, 'total_questions': total_questions})
+    db.session.commit()
+    
+    invalidate_tags("scores", *[f"user:{user_id}:scores" for user_id in user_ids])
+    
+    return jsonify({'message': f'{len(results)} attempts imported', 'results': results}), 201
+
 # User-specific APIs
 @api.route('/user/quiz_history', methods=['GET'])
 @login_required
-@cache.cached(timeout=1, key_prefix=lambda: f"quiz_history_{current_user.id}")
+@cached_endpoint('user_data', key=lambda: tagged_cache_key(f"quiz_history_{current_user.id}", [f"user:{current_user.id}:scores"]))
 def quiz_history():
     scores = Score.query.filter_by(user_id=current_user.id).all()
     history = [
@@ -569,8 +572,12 @@ def export_quiz_history():
     # Only allow user or admin to export their own history
     if current_user.role != 'admin' and int(request.json.get('user_id', user_id)) != user_id:
         return jsonify({'error': 'Unauthorized'}), 403
+    try:
+        compression = parse_compression(request.json.get('compression'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     # Enqueue Celery task
-    task = export_quiz_history_task.delay(user_id)
+    task = export_quiz_history_task.delay(user_id, compression)
     return jsonify({'message': 'Export started', 'task_id': str(task.id)}), 202
 
 @api.route('/user/download_quiz_history/<task_id>', methods=['GET'])
@@ -589,101 +596,10 @@ def download_quiz_history(task_id):
 
 @api.route('/user/analytics', methods=['GET'])
 @login_required
-@cache.cached(timeout=1, key_prefix=lambda: f"user_analytics_{current_user.id}")
+@cached_endpoint('user_data', key=lambda: user_analytics_key(current_user.id), single_flight=True)
 def user_analytics():
     """Get user-specific analytics and summary data"""
-    user_id = current_user.id
-    
-    # Get user's quiz history
-    scores = Score.query.filter_by(user_id=user_id).all()
-    
-    if not scores:
-        return jsonify({
-            'total_quizzes': 0,
-            'average_score': 0,
-            'best_score': 0,
-            'total_score': 0,
-            'recent_activity': [],
-            'performance_by_subject': {},
-            'performance_by_chapter': {},
-            'score_trend': []
-        }), 200
-    
-    # Calculate basic statistics
-    total_quizzes = len(scores)
-    total_score = sum(s.total_score for s in scores)
-    average_score = total_score / total_quizzes
-    best_score = max(s.total_score for s in scores)
-    
-    # Recent activity (last 5 attempts)
-    recent_scores = sorted(scores, key=lambda x: x.timestamp, reverse=True)[:5]
-    recent_activity = []
-    for score in recent_scores:
-        quiz = Quiz.query.get(score.quiz_id)
-        chapter = Chapter.query.get(quiz.chapter_id) if quiz else None
-        subject = Subject.query.get(chapter.subject_id) if chapter else None
-        recent_activity.append({
-            'quiz_id': score.quiz_id,
-            'score': score.total_score,
-            'date': score.timestamp.strftime('%Y-%m-%d'),
-            'chapter': chapter.name if chapter else 'Unknown',
-            'subject': subject.name if subject else 'Unknown'
-        })
-    
-    # Performance by subject
-    performance_by_subject = {}
-    for score in scores:
-        quiz = Quiz.query.get(score.quiz_id)
-        if quiz:
-            chapter = Chapter.query.get(quiz.chapter_id)
-            if chapter:
-                subject = Subject.query.get(chapter.subject_id)
-                if subject:
-                    subject_name = subject.name
-                    if subject_name not in performance_by_subject:
-                        performance_by_subject[subject_name] = []
-                    performance_by_subject[subject_name].append(score.total_score)
-    
-    # Calculate average by subject
-    for subject in performance_by_subject:
-        performance_by_subject[subject] = sum(performance_by_subject[subject]) / len(performance_by_subject[subject])
-    
-    # Performance by chapter
-    performance_by_chapter = {}
-    for score in scores:
-        quiz = Quiz.query.get(score.quiz_id)
-        if quiz:
-            chapter = Chapter.query.get(quiz.chapter_id)
-            if chapter:
-                chapter_name = chapter.name
-                if chapter_name not in performance_by_chapter:
-                    performance_by_chapter[chapter_name] = []
-                performance_by_chapter[chapter_name].append(score.total_score)
-    
-    # Calculate average by chapter
-    for chapter in performance_by_chapter:
-        performance_by_chapter[chapter] = sum(performance_by_chapter[chapter]) / len(performance_by_chapter[chapter])
-    
-    # Score trend (last 10 attempts)
-    trend_scores = sorted(scores, key=lambda x: x.timestamp)[-10:]
-    score_trend = []
-    for i, score in enumerate(trend_scores):
-        score_trend.append({
-            'attempt': i + 1,
-            'score': score.total_score,
-            'date': score.timestamp.strftime('%Y-%m-%d')
-        })
-    
-    return jsonify({
-        'total_quizzes': total_quizzes,
-        'average_score': round(average_score, 2),
-        'best_score': best_score,
-        'total_score': total_score,
-        'recent_activity': recent_activity,
-        'performance_by_subject': performance_by_subject,
-        'performance_by_chapter': performance_by_chapter,
-        'score_trend': score_trend
-    }), 200
+    return jsonify(compute_user_analytics(current_user.id)), 200
 
 @api.route('/user/export_quiz_history_direct', methods=['GET'])
 @login_required
@@ -692,68 +608,34 @@ def export_quiz_history_direct():
     # Only allow user or admin to export their own history
     if current_user.role != 'admin' and int(request.args.get('user_id', user_id)) != user_id:
         return jsonify({'error': 'Unauthorized'}), 403
-    
-    # Direct CSV generation without Celery
-    user = User.query.get(user_id)
-    scores = Score.query.filter_by(user_id=user_id).all()
-    
-    filename = f"quiz_history_{user_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}.csv"
-    export_dir = os.path.join(os.getcwd(), 'exports')
-    os.makedirs(export_dir, exist_ok=True)
-    filepath = os.path.join(export_dir, filename)
-    
-    with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.writer(csvfile)
-        # Enhanced CSV headers with all required fields
-        writer.writerow(['Quiz ID', 'Chapter ID', 'Chapter Name', 'Subject Name', 'Date of Quiz', 'Quiz Duration', 'Quiz Remarks', 'Score', 'Attempt Date', 'User Name'])
-        
-        for score in scores:
-            # Get quiz details
-            quiz = Quiz.query.get(score.quiz_id)
-            chapter = Chapter.query.get(quiz.chapter_id) if quiz else None
-            subject = Subject.query.get(chapter.subject_id) if chapter else None
-            
-            writer.writerow([
-                score.quiz_id,
-                quiz.chapter_id if quiz else 'N/A',
-                chapter.name if chapter else 'N/A',
-                subject.name if subject else 'N/A',
-                quiz.date_of_quiz.strftime('%Y-%m-%d') if quiz else 'N/A',
-                quiz.duration if quiz else 'N/A',
-                quiz.remarks if quiz else 'N/A',
-                score.total_score,
-                score.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                user.full_name
-            ])
-    
-    return send_file(filepath, as_attachment=True, download_name=filename)
+    # ?compression=gzip|zstd; the CSV is streamed into the response as it is read, nothing is written to disk
+    try:
+        compression = parse_compression(request.args.get('compression'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    filename = quiz_history_filename(user_id, compression)
+    headers = {'Content-Disposition': f'attachment; filename="{filename}"', 'X-Accel-Buffering': 'no'}
+    body = stream_with_context(quiz_history_chunks(user_id, compression))
+    return Response(body, mimetype=EXPORT_COMPRESSION[compression]['mimetype'], headers=headers)
 
 # Admin APIs
 @api.route('/admin/charts', methods=['GET'])
 @login_required
-@cache.cached(timeout=1) 
+@cached_endpoint('charts', key=lambda: admin_charts_key(current_user.role, **request.args), single_flight=True)
 def admin_charts():
     if current_user.role != 'admin':
         return jsonify({'error': 'Unauthorized'}), 403
-    from models import Quiz, Score
-    quizzes = Quiz.query.all()
-    labels = []
-    avg_scores = []
-    for quiz in quizzes:
-        scores = Score.query.filter_by(quiz_id=quiz.id).all()
-        if scores:
-            avg = sum(s.total_score for s in scores) / len(scores)
-            labels.append(f"Quiz {quiz.id}")
-            avg_scores.append(round(avg, 2))
-    chart_data = {
-        'labels': labels,
-        'scores': avg_scores
-    }
+    # ?subject_id=&chapter_id=&start=YYYY-MM-DD&end=YYYY-MM-DD&order=top|bottom&limit=&histogram=1
+    try:
+        options = parse_chart_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    chart_data = compute_admin_charts(**options)
     return jsonify({'chart_data': chart_data}), 200
 
 @api.route('/admin/search', methods=['POST'])
 @login_required
-@cache.cached(timeout=1, key_prefix=lambda: f"search_{hash(str(request.get_json()))}")
+@cached_endpoint('search', key=lambda: tagged_cache_key(f"search_{current_user.role}", ["users", "subjects", "chapters", "quizzes", "questions"], term=(request.get_json() or {}).get('term', '')))
 def admin_search():
     if current_user.role != 'admin':
         return jsonify({'error': 'Unauthorized'}), 403
@@ -805,58 +687,28 @@ def admin_search():
             'question_text': q.question_statement
         } for q in Question.query.filter(Question.question_statement.ilike(f"%{term}%")).all()
     ]
-    # Invalidate search cache
-    delete_cache_pattern("quiz_mastersearch_*")
     return jsonify({'results': results}), 200
 
 @api.route('/admin/analytics', methods=['GET'])
 @login_required
-@cache.cached(timeout=1)  
+@cached_endpoint('charts', key=lambda: admin_analytics_key(current_user.role), single_flight=True)
 def admin_analytics():
     if current_user.role != 'admin':
         return jsonify({'error': 'Unauthorized'}), 403
-    from models import User, Quiz, Score, Subject, Chapter
-    total_users = User.query.filter_by(role='user').count()
-    total_quizzes = Quiz.query.count()
-    total_scores = Score.query.count()
-    total_subjects = Subject.query.count()
-    total_chapters = Chapter.query.count()
-    
-    # Calculate average score
-    avg_score = 0
-    if total_scores > 0:
-        avg_score = db.session.query(db.func.avg(Score.total_score)).scalar()
-    
-    analytics = {
-        'total_users': total_users,
-        'total_quizzes': total_quizzes,
-        'total_scores': total_scores,
-        'total_subjects': total_subjects,
-        'total_chapters': total_chapters,
-        'average_score': round(avg_score, 2) if avg_score else 0
-    }
-    # Attempts over time (last 7 days)
-    from datetime import datetime, timedelta
-    today = datetime.now().date()
-    attempts_over_time = []
-    for i in range(6, -1, -1):
-        day = today - timedelta(days=i)
-        count = Score.query.filter(db.func.date(Score.timestamp) == day).count()
-        attempts_over_time.append({'date': day.strftime('%Y-%m-%d'), 'count': count})
-
-    # Top scoring users (by total score)
-    user_scores = db.session.query(User.full_name, db.func.sum(Score.total_score).label('score')) \
-        .join(Score, User.id == Score.user_id) \
-        .group_by(User.id) \
-        .order_by(db.func.sum(Score.total_score).desc()) \
-        .limit(5).all()
-    top_users = [{'name': name, 'score': score} for name, score in user_scores]
+    return jsonify(compute_admin_analytics()), 200
 
-    return jsonify({
-        'analytics': analytics,
-        'attempts_over_time': attempts_over_time,
-        'top_users': top_users
-    }), 200
+@api.route('/admin/analytics/timeseries', methods=['GET'])
+@login_required
+@cached_endpoint('charts', key=lambda: admin_timeseries_key(current_user.role, **request.args), single_flight=True)
+def admin_analytics_timeseries():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    # ?bucket=hour|day|week&start=&end= (ISO dates or datetimes, end defaults to now)
+    try:
+        bucket, start, end = parse_timeseries_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(compute_score_timeseries(bucket, start, end)), 200
 
 # Admin Export APIs
 @api.route('/admin/export_all_users_stats', methods=['POST'])
@@ -915,11 +767,43 @@ def cache_stats():
     if current_user.role != 'admin':
         return jsonify({'error': 'Unauthorized'}), 403
     from extensions import get_cache_stats, get_cache_hit_rate
+    from cache_policy import single_flight_stats
     stats = get_cache_stats()
     hit_rate = get_cache_hit_rate()
     stats['hit_rate'] = hit_rate
+    stats['single_flight'] = single_flight_stats()
+    stats['submission_queue'] = submission_queue_stats()
     return jsonify({'cache_stats': stats}), 200
 
+@api.route('/admin/profiling/endpoints', methods=['GET'])
+@login_required
+def profiling_endpoints():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    from profiling import top_endpoints
+    try:
+        limit = int(request.args.get('limit', 20))
+        return jsonify({'profiling': top_endpoints(request.args.get('sort', 'db_ms'), limit)}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@api.route('/admin/profiling/reset', methods=['POST'])
+@login_required
+def profiling_reset():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    from profiling import reset_profiling
+    reset_profiling()
+    return jsonify({'message': 'Profiling counters reset'}), 200
+
+@api.route('/admin/cache/policies', methods=['GET'])
+@login_required
+def cache_policies_endpoint():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    from cache_policy import cache_policies
+    return jsonify({'cache_policies': cache_policies()}), 200
+
 @api.route('/admin/cache/clear', methods=['POST'])
 @login_required
 def clear_cache():
@@ -936,15 +820,23 @@ def clear_cache():
 def warm_cache_endpoint():
     if current_user.role != 'admin':
         return jsonify({'error': 'Unauthorized'}), 403
-    try:
-        from extensions import warm_cache
-        success = warm_cache()
-        if success:
-            return jsonify({'message': 'Cache warmed successfully'}), 200
-        else:
-            return jsonify({'error': 'Failed to warm cache'}), 500
-    except Exception as e:
-        return jsonify({'error': f'Cache warming error: {str(e)}'}), 500
+    data = request.get_json(silent=True) or {}
+    task = warm_cache_task.delay(data.get('top_users'))
+    return jsonify({'message': 'Cache warming started', 'task_id': str(task.id)}), 202
+
+@api.route('/admin/cache/warm/<task_id>', methods=['GET'])
+@login_required
+def warm_cache_status(task_id):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    result = warm_cache_task.AsyncResult(task_id)
+    if result.state == 'PROGRESS':
+        return jsonify({'status': 'running', 'progress': result.info}), 200
+    if result.ready():
+        if result.failed():
+            return jsonify({'status': 'failed', 'error': str(result.result)}), 200
+        return jsonify({'status': 'done', 'result': result.result}), 200
+    return jsonify({'status': 'pending'}), 200
 
 @api.route('/admin/cache/optimize', methods=['POST'])
 @login_required
@@ -7,7 +7,8 @@ from flask_cors import CORS
 
 load_dotenv()
 
-def create_app():
+def create_app(bootstrap=True):
+    """Build the Flask app; bootstrap=False skips schema, admin, backfill and cache startup work (Celery workers)"""
     app = Flask(__name__)
     app.config.from_object(Config)
     
@@ -36,52 +37,87 @@ def create_app():
     from api import api
     app.register_blueprint(api, url_prefix='/api')
     
-    # Create database tables
+    # CLI commands
+    from aggregates import rebuild_aggregates_command
+    from migrations import upgrade_db_command
+    from submissions import flush_submissions_command
+    app.cli.add_command(rebuild_aggregates_command)
+    app.cli.add_command(upgrade_db_command)
+    app.cli.add_command(flush_submissions_command)
+    
     with app.app_context():
-        db.create_all()
-        # Ensure admin user exists with hashed password
-        from models import User
-        from werkzeug.security import generate_password_hash
-        admin = User.query.filter_by(email="admin@123.com").first()
-        if not admin:
-            admin = User(
-                email="admin@123.com",
-                full_name="Admin",
-                role="admin"
-            )
+        # Per-request query counts, DB time and slow-query log
+        from profiling import init_profiling
+        init_profiling(app)
+        # Request latency histograms and the /metrics endpoint
+        from metrics import init_metrics
+        init_metrics(app)
+        if bootstrap:
+            bootstrap_app(app)
+    
+    return app
+
+def bootstrap_app(app):
+    """One-off startup work for the web process; call inside an app context"""
+    # Create database tables
+    db.create_all()
+    # Bring databases created by older versions up to the current schema
+    from migrations import upgrade_schema
+    upgrade_schema()
+    # Ensure admin user exists with hashed password
+    from models import User
+    from werkzeug.security import generate_password_hash
+    admin = User.query.filter_by(email="admin@123.com").first()
+    if not admin:
+        admin = User(
+            email="admin@123.com",
+            full_name="Admin",
+            role="admin"
+        )
+        admin.password = generate_password_hash("admin123")
+        db.session.add(admin)
+        db.session.commit()
+        print("Admin account created: email=admin@123.com password=admin123")
+    else:
+        # If admin exists but password is not hashed, re-hash it
+        from werkzeug.security import check_password_hash
+        try:
+            # Try to check if password is already hashed
+            check_password_hash(admin.password, "test")
+        except Exception:
             admin.password = generate_password_hash("admin123")
-            db.session.add(admin)
             db.session.commit()
-            print("Admin account created: email=admin@123.com password=admin123")
-        else:
-            # If admin exists but password is not hashed, re-hash it
-            from werkzeug.security import check_password_hash
-            try:
-                # Try to check if password is already hashed
-                check_password_hash(admin.password, "test")
-            except Exception:
-                admin.password = generate_password_hash("admin123")
-                db.session.commit()
-                print("Admin password was not hashed. Reset to default: admin123")
-        
-        # Try to warm up cache on startup for better performance
-        try:
-            from extensions import warm_cache, optimize_cache_performance
-            print("Warming up cache...")
-            warm_cache()
-            
-            print("Optimizing cache performance...")
-            optimize_cache_performance()
-        except Exception as e:
-            print(f"Cache operations failed: {e}")
-            print("Continuing without cache optimization...")
+            print("Admin password was not hashed. Reset to default: admin123")
+    
+    # Backfill score summaries for databases created before they existed
+    from aggregates import aggregates_need_backfill, rebuild_aggregates
+    if aggregates_need_backfill():
+        print("Backfilling score summaries...")
+        rebuild_aggregates()
+    
+    # Try to warm up cache on startup for better performance
+    try:
+        from extensions import optimize_cache_performance
+        from cache_warmer import schedule_boot_warm
+        if schedule_boot_warm():
+            print("Cache warming scheduled")
         
-        print("Application initialized successfully!")
+        print("Optimizing cache performance...")
+        optimize_cache_performance()
+    except Exception as e:
+        print(f"Cache operations failed: {e}")
+        print("Continuing without cache optimization...")
     
-    return app
+    print("Application initialized successfully!")
 
-app = create_app()
+def __getattr__(name):
+    # The module-level app ("app:app", database.py) is created on first access,
+    # so importing create_app (celery_app.py) does not bootstrap a second app
+    if name == 'app':
+        globals()['app'] = create_app()
+        return globals()['app']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
+    create_app().run(debug=True, port=5000)
 
@@ -0,0 +1,121 @@
+"""Hit rate and latency of the cached API under a mixed read/write load.
+
+Replays the same seeded workload (catalogue browsing, history/analytics reads,
+admin dashboards, quiz attempts and catalogue edits) three times:
+
+  off       no cache at all
+  timeout1  the old behaviour, every cached endpoint expiring after 1 second
+  policy    the per-resource TTLs from config (cache_policy.RESOURCE_TIMEOUTS)
+
+and reports the hit rate of cacheable reads, p50/p99 latency and the number of
+stale reads (a quiz history that does not show an attempt made just before).
+The cached modes use the cache configured in config.py, so Redis must be up.
+
+Run from the project folder:  python -m benchmarks.bench_cache_policy
+"""
+import argparse
+import json
+import random
+import time
+from benchmarks.common import make_app, seed, create_admin, enable_logins, login, percentile
+from config import Config
+from extensions import db, cache
+from models import Score
+from cache_policy import RESOURCE_TIMEOUTS
+
+MODES = ['off', 'timeout1', 'policy']
+
+def build_app(mode):
+    if mode == 'off':
+        return make_app()
+    overrides = {setting: 1 for setting in RESOURCE_TIMEOUTS.values()} if mode == 'timeout1' else {}
+    return make_app(cache_type=Config.CACHE_TYPE, **overrides)
+
+def setup(app, users):
+    with app.app_context():
+        ids = seed(users=users, scores_per_user=20)
+        emails = enable_logins(ids['user_ids'])
+        attempts = dict(db.session.query(Score.user_id, db.func.count(Score.id)).group_by(Score.user_id).all())
+        admin = create_admin()
+        # Entries and tag generations left over from a previous mode or run
+        cache.clear()
+    clients = {uid: login(app, email, 'bench') for uid, email in emails.items()}
+    return ids, attempts, clients, login(app, *admin)
+
+def run(mode, requests, users, write_ratio, seed_value):
+    app = build_app(mode)
+    ids, attempts, clients, admin = setup(app, users)
+    rng = random.Random(seed_value)
+    user_ids = list(clients)
+    latencies = []
+    reads = hits = stale = writes = 0
+
+    def timed(call, url, **kwargs):
+        started = time.perf_counter()
+        response = call(url, **kwargs)
+        latencies.append(time.perf_counter() - started)
+        return response
+
+    reads_by_weight = [
+        (30, lambda uid: (clients[uid], '/api/subjects')),
+        (20, lambda uid: (clients[uid], f"/api/quizzes?chapter_id={rng.choice(ids['chapter_ids'])}")),
+        (15, lambda uid: (clients[uid], f"/api/quizzes/{rng.choice(ids['quiz_ids'])}")),
+        (15, lambda uid: (clients[uid], '/api/user/quiz_history')),
+        (15, lambda uid: (clients[uid], '/api/user/analytics')),
+        (3, lambda uid: (admin, '/api/admin/charts')),
+        (2, lambda uid: (admin, '/api/admin/analytics')),
+    ]
+    weights = [w for w, _ in reads_by_weight]
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        uid = rng.choice(user_ids)
+        if rng.random() < write_ratio:
+            writes += 1
+            if rng.random() < 0.9:
+                quiz_id = rng.choice(ids['quiz_ids'])
+                response = timed(clients[uid].post, f"/api/quizzes/{quiz_id}/attempt", json={'answers': {}})
+                assert response.status_code == 200, response.status_code
+                attempts[uid] = attempts.get(uid, 0) + 1
+                # The very next history read must include the new attempt
+                history = timed(clients[uid].get, '/api/user/quiz_history')
+                reads += 1
+                hits += history.headers.get('X-Cache') == 'HIT'
+                stale += len(history.get_json()['history']) != attempts[uid]
+            else:
+                quiz_id = rng.choice(ids['quiz_ids'])
+                response = timed(admin.put, f"/api/quizzes/{quiz_id}", json={'remarks': f"edited {writes}"})
+                assert response.status_code == 200, response.status_code
+            continue
+        _, pick = rng.choices(reads_by_weight, weights=weights)[0]
+        client, url = pick(uid)
+        response = timed(client.get, url)
+        assert response.status_code == 200, (url, response.status_code)
+        reads += 1
+        hits += response.headers.get('X-Cache') == 'HIT'
+    elapsed = time.perf_counter() - started
+
+    return {
+        'mode': mode,
+        'requests': len(latencies),
+        'writes': writes,
+        'hit_rate': round(hits / reads * 100, 1) if reads else 0,
+        'stale_reads': stale,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'requests_per_second': round(len(latencies) / elapsed) if elapsed else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--write-ratio', type=float, default=0.05)
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    for mode in args.modes.split(','):
+        print(json.dumps(run(mode, args.requests, args.users, args.write_ratio, args.seed)))
+
+if __name__ == '__main__':
+    main()
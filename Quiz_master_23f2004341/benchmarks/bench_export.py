@@ -0,0 +1,99 @@
+"""Quiz history export throughput (rows/second) and peak memory as the history grows.
+
+For each size, seeds one user with that many attempts and drains the export
+pipeline (exports.quiz_history_chunks, what the task writes to disk and the
+direct endpoint streams) in every compression mode, next to
+
+  legacy  the old loop: all scores loaded, then three query.get per row
+
+which is only run up to --legacy-max rows. Peak memory is traced Python
+allocations; it should stay flat for the pipeline as the size grows. zstd is
+skipped when the zstandard package is not installed.
+
+Run from the project folder:  python -m benchmarks.bench_export --sizes 5000,50000,200000
+"""
+import argparse
+import csv
+import io
+import json
+import time
+import tracemalloc
+from benchmarks.common import make_app, seed, count_queries
+from exports import EXPORT_COMPRESSION, QUIZ_HISTORY_HEADER, parse_compression, quiz_history_chunks
+from models import User, Score, Quiz, Chapter, Subject
+
+def legacy(user_id):
+    user = User.query.get(user_id)
+    scores = Score.query.filter_by(user_id=user_id).all()
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(QUIZ_HISTORY_HEADER)
+    for score in scores:
+        quiz = Quiz.query.get(score.quiz_id)
+        chapter = Chapter.query.get(quiz.chapter_id) if quiz else None
+        subject = Subject.query.get(chapter.subject_id) if chapter else None
+        writer.writerow([
+            score.quiz_id,
+            quiz.chapter_id if quiz else 'N/A',
+            chapter.name if chapter else 'N/A',
+            subject.name if subject else 'N/A',
+            quiz.date_of_quiz.strftime('%Y-%m-%d') if quiz else 'N/A',
+            quiz.duration if quiz else 'N/A',
+            quiz.remarks if quiz else 'N/A',
+            score.total_score,
+            score.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+            user.full_name
+        ])
+    return len(output.getvalue().encode('utf-8')), len(scores)
+
+def pipeline(user_id, compression):
+    counter = {'rows': 0}
+    size = sum(len(chunk) for chunk in quiz_history_chunks(user_id, compression, counter))
+    return size, counter['rows']
+
+def modes():
+    yield 'legacy', None
+    for compression in EXPORT_COMPRESSION:
+        try:
+            parse_compression(compression)
+        except ValueError:
+            continue
+        yield compression or 'csv', compression
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='5000,50000,200000', help='attempts in the exported history')
+    parser.add_argument('--legacy-max', type=int, default=5000)
+    args = parser.parse_args()
+    for rows in (int(n) for n in args.sizes.split(',')):
+        app = make_app()
+        with app.app_context():
+            user_id = seed(users=1, scores_per_user=rows)['user_ids'][0]
+            for mode, compression in modes():
+                if mode == 'legacy' and rows > args.legacy_max:
+                    continue
+                run = (lambda: legacy(user_id)) if mode == 'legacy' else (lambda: pipeline(user_id, compression))
+                # Start from a cold identity map, as a fresh request or task would
+                app.extensions['sqlalchemy'].session.remove()
+                with count_queries() as counter:
+                    started = time.perf_counter()
+                    size, written = run()
+                    elapsed = time.perf_counter() - started
+                # Tracing slows everything down, so memory is measured on a second, untimed run
+                app.extensions['sqlalchemy'].session.remove()
+                tracemalloc.start()
+                run()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(json.dumps({
+                    'rows': written,
+                    'mode': mode,
+                    'queries': counter.count,
+                    'seconds': round(elapsed, 3),
+                    'rows_per_second': round(written / elapsed) if elapsed else None,
+                    'output_bytes': size,
+                    'peak_mb': round(peak / 1e6, 2),
+                }))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Grading throughput in submissions/second: ORM rows vs cached answer keys.
+
+  legacy  the old attempt_quiz loop: load full Question rows, compare in Python
+  keyed   one answer_key() lookup (cache, then one two-column query) per submission
+  bulk    grade_submissions() over the whole batch with a single key lookup
+
+The keyed and bulk modes use the cache configured in config.py. Redis must be
+up either way (tag generations live there); pass --cache NullCache to measure
+them with every key loaded from SQLite.
+
+Run from the project folder:  python -m benchmarks.bench_grading
+"""
+import argparse
+import json
+import random
+import time
+from benchmarks.common import make_app, seed
+from config import Config
+from extensions import cache
+from models import Question
+from grading import answer_key, grade, grade_submissions
+
+def legacy_grade(quiz_id, answers):
+    questions = Question.query.filter_by(quiz_id=quiz_id).all()
+    total_score = 0
+    for question in questions:
+        user_answer = answers.get(str(question.id))
+        if user_answer is not None and int(user_answer) == question.correct_option:
+            total_score += 1
+    return total_score
+
+def make_submissions(count, quiz_ids, questions_by_quiz, rng):
+    submissions = []
+    for _ in range(count):
+        quiz_id = rng.choice(quiz_ids)
+        answers = {str(question_id): rng.randint(1, 4) for question_id in questions_by_quiz[quiz_id]}
+        submissions.append((quiz_id, answers))
+    return submissions
+
+def timed(label, fn, submissions):
+    started = time.perf_counter()
+    scores = fn(submissions)
+    elapsed = time.perf_counter() - started
+    return scores, {
+        'mode': label,
+        'submissions': len(submissions),
+        'seconds': round(elapsed, 3),
+        'submissions_per_second': round(len(submissions) / elapsed) if elapsed else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--submissions', type=int, default=5000)
+    parser.add_argument('--questions', type=int, default=30, help='questions per quiz')
+    parser.add_argument('--cache', default=Config.CACHE_TYPE)
+    args = parser.parse_args()
+
+    app = make_app(cache_type=args.cache)
+    rng = random.Random(7)
+    with app.app_context():
+        ids = seed(users=1, scores_per_user=1, questions_per_quiz=args.questions)
+        cache.clear()
+        questions_by_quiz = {}
+        for quiz_id, question_id in Question.query.with_entities(Question.quiz_id, Question.id):
+            questions_by_quiz.setdefault(quiz_id, []).append(question_id)
+        submissions = make_submissions(args.submissions, ids['quiz_ids'], questions_by_quiz, rng)
+
+        legacy, result = timed('legacy', lambda subs: [legacy_grade(q, a) for q, a in subs], submissions)
+        print(json.dumps(result))
+        keyed, result = timed('keyed', lambda subs: [grade(answer_key(q), a) for q, a in subs], submissions)
+        print(json.dumps(result))
+        bulk, result = timed('bulk', lambda subs: [s for s, _ in grade_submissions(subs)], submissions)
+        print(json.dumps(result))
+        assert legacy == keyed == bulk, 'grading modes disagree'
+
+if __name__ == '__main__':
+    main()
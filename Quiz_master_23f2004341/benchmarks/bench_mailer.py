@@ -0,0 +1,105 @@
+"""Bulk email throughput: a connection per message vs the pooled mailer.
+
+Starts a local SMTP sink (aiosmtpd, pip install -r benchmarks/requirements.txt)
+that adds a delay to every EHLO, standing in for the TCP/TLS/AUTH setup of a
+real server, and to every DATA. Then delivers the same messages with
+
+  per_message  the old send_email: connect, EHLO, send, QUIT for every message
+  pooled       mailer.send_many with one sender (one reused connection)
+  parallel     mailer.send_many with --workers senders
+
+--fail-rate makes the sink answer a share of messages with a transient 451 so
+the retry path is exercised; every message must still arrive exactly once.
+
+Run from the project folder:  python -m benchmarks.bench_mailer --messages 500
+"""
+import argparse
+import asyncio
+import json
+import random
+import smtplib
+import threading
+import time
+from benchmarks.common import make_app
+from mailer import build_message, send_many, get_pool
+
+class Sink:
+    def __init__(self, handshake_ms, send_ms, fail_rate, seed=1):
+        self.handshake = handshake_ms / 1000
+        self.send = send_ms / 1000
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.received = []
+        self.lock = threading.Lock()
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        await asyncio.sleep(self.handshake)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.send)
+        with self.lock:
+            if self.rng.random() < self.fail_rate:
+                return '451 Temporary failure, try again'
+            self.received.extend(envelope.rcpt_tos)
+        return '250 OK'
+
+def per_message(config, messages):
+    sent = 0
+    for to, subject, body, html in messages:
+        msg = build_message(config['MAIL_DEFAULT_SENDER'], to, subject, body, html)
+        try:
+            with smtplib.SMTP(config['MAIL_SERVER'], config['MAIL_PORT']) as server:
+                server.sendmail(msg['From'], [to], msg.as_string())
+            sent += 1
+        except smtplib.SMTPException:
+            pass
+    return {'sent': sent, 'failed': len(messages) - sent, 'retries': 0}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--handshake-ms', type=float, default=20.0, help='delay added to every EHLO')
+    parser.add_argument('--send-ms', type=float, default=2.0, help='delay added to every DATA')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='share of DATA commands answered with 451')
+    parser.add_argument('--port', type=int, default=8025)
+    args = parser.parse_args()
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        raise SystemExit("This benchmark needs aiosmtpd: pip install -r benchmarks/requirements.txt")
+
+    sink = Sink(args.handshake_ms, args.send_ms, args.fail_rate)
+    controller = Controller(sink, hostname='127.0.0.1', port=args.port)
+    controller.start()
+    app = make_app(MAIL_SERVER='127.0.0.1', MAIL_PORT=args.port, MAIL_USERNAME='', MAIL_USE_TLS=False,
+                   MAIL_RETRY_BACKOFF=0.01, MAIL_POOL_SIZE=args.workers)
+    messages = [(f"user{i}@example.com", "Quiz Master: Daily Reminder", f"Hi user {i},\n\nReminder body.", None)
+                for i in range(args.messages)]
+    modes = [
+        ('per_message', lambda: per_message(app.config, messages)),
+        ('pooled', lambda: send_many(iter(messages), config=app.config, workers=1)),
+        ('parallel', lambda: send_many(iter(messages), config=app.config, workers=args.workers)),
+    ]
+    try:
+        for mode, run in modes:
+            sink.received.clear()
+            started = time.perf_counter()
+            stats = run()
+            elapsed = time.perf_counter() - started
+            print(json.dumps({
+                'mode': mode,
+                **stats,
+                'delivered': len(sink.received),
+                'duplicates': len(sink.received) - len(set(sink.received)),
+                'seconds': round(elapsed, 3),
+                'messages_per_second': round(stats['sent'] / elapsed, 1) if elapsed else None,
+            }))
+    finally:
+        get_pool(app.config).close()
+        controller.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Scaling of the monthly report pipeline with the number of users.
+
+For each user count, seeds a fresh database, then times collect_monthly_reports
+(the two window-function queries) and rendering every report, i.e. all the work
+of monthly_report_task and its chunk subtasks except sending the emails. The
+time per user should stay flat as users grow; the old task ran a query per user
+per user and per attempt.
+
+Run from the project folder:  python -m benchmarks.bench_monthly_report --users 250,500,1000,2000
+"""
+import argparse
+import json
+import time
+from benchmarks.common import make_app, seed, count_queries
+from monthly_reports import report_period, collect_monthly_reports, render_monthly_report
+
+def run(users, scores_per_user):
+    app = make_app()
+    with app.app_context():
+        seed(users=users, scores_per_user=scores_per_user)
+        start, end = report_period()
+        with count_queries() as counter:
+            started = time.perf_counter()
+            reports, total_users = collect_monthly_reports(start, end)
+            collected = time.perf_counter() - started
+        period_label = start.strftime('%B %Y')
+        started = time.perf_counter()
+        for report in reports:
+            render_monthly_report(report, period_label, total_users)
+        rendered = time.perf_counter() - started
+    return {
+        'users': users,
+        'queries': counter.count,
+        'collect_seconds': round(collected, 3),
+        'render_seconds': round(rendered, 3),
+        'ms_per_user': round((collected + rendered) / users * 1000, 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', default='250,500,1000,2000')
+    parser.add_argument('--scores', type=int, default=20, help='past attempts per user')
+    args = parser.parse_args()
+    for users in (int(n) for n in args.users.split(',')):
+        print(json.dumps(run(users, args.scores)))
+
+if __name__ == '__main__':
+    main()
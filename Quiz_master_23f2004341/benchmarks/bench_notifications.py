@@ -0,0 +1,115 @@
+"""Daily reminder fan-out: sequential email + webhook per user vs the dispatcher.
+
+Starts a local SMTP sink (aiosmtpd, pip install -r benchmarks/requirements.txt,
+see bench_mailer) and a local webhook that answers every POST after
+--webhook-ms, standing in for a slow Google Chat endpoint. Then notifies the same users with
+
+  sequential  the old loop: send the email, then requests.post to the webhook
+  dispatcher  notifications.dispatch: channels in parallel, webhook digests
+
+--webhook-status 500 makes the webhook fail every post, so the circuit breaker
+opens and the remaining digests are skipped instead of waiting on timeouts.
+--distinct sets how many different messages there are; identical webhook
+messages are collapsed into one digest entry.
+
+Run from the project folder:  python -m benchmarks.bench_notifications --users 300
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from benchmarks.common import make_app
+from benchmarks.bench_mailer import Sink
+from mailer import build_message, send_message, get_pool
+from notifications import dispatch, send_google_chat_message
+
+class Webhook:
+    def __init__(self, delay_ms, status, port):
+        self.posts = 0
+        self.lock = threading.Lock()
+        webhook = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                time.sleep(delay_ms / 1000)
+                with webhook.lock:
+                    webhook.posts += 1
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.url = f"http://127.0.0.1:{port}/webhook"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+
+def sequential(config, notifications):
+    stats = {'email': {'sent': 0, 'failed': 0}, 'google_chat': {'sent': 0, 'failed': 0}}
+    for channel, target, subject, body in notifications:
+        if channel == 'email':
+            ok = send_message(build_message(config['MAIL_DEFAULT_SENDER'], target, subject, body), config)
+        else:
+            ok = send_google_chat_message(target, body)
+        stats[channel]['sent' if ok else 'failed'] += 1
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=300)
+    parser.add_argument('--distinct', type=int, default=None, help='different messages (default: one per user)')
+    parser.add_argument('--webhook-ms', type=float, default=50.0, help='delay of every webhook POST')
+    parser.add_argument('--webhook-status', type=int, default=200)
+    parser.add_argument('--handshake-ms', type=float, default=20.0, help='delay added to every EHLO')
+    parser.add_argument('--send-ms', type=float, default=2.0, help='delay added to every DATA')
+    parser.add_argument('--smtp-port', type=int, default=8026)
+    parser.add_argument('--webhook-port', type=int, default=8027)
+    args = parser.parse_args()
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        raise SystemExit("This benchmark needs aiosmtpd: pip install -r benchmarks/requirements.txt")
+
+    sink = Sink(args.handshake_ms, args.send_ms, 0.0)
+    controller = Controller(sink, hostname='127.0.0.1', port=args.smtp_port)
+    controller.start()
+    webhook = Webhook(args.webhook_ms, args.webhook_status, args.webhook_port)
+    app = make_app(MAIL_SERVER='127.0.0.1', MAIL_PORT=args.smtp_port, MAIL_USERNAME='', MAIL_USE_TLS=False,
+                   MAIL_RETRY_BACKOFF=0.01)
+    distinct = args.distinct or args.users
+    notifications = []
+    for i in range(args.users):
+        body = f"Hi user {i % distinct},\n\nDon't forget to attempt the latest quizzes!"
+        notifications.append(('email', f"user{i}@example.com", "Quiz Master: Daily Reminder", body))
+        notifications.append(('google_chat', webhook.url, "Quiz Master: Daily Reminder", body))
+    modes = [
+        ('sequential', lambda: sequential(app.config, notifications)),
+        ('dispatcher', lambda: dispatch(iter(notifications), app.config)),
+    ]
+    try:
+        for mode, run in modes:
+            sink.received.clear()
+            webhook.posts = 0
+            started = time.perf_counter()
+            stats = run()
+            elapsed = time.perf_counter() - started
+            print(json.dumps({
+                'mode': mode,
+                'seconds': round(elapsed, 3),
+                'emails_delivered': len(sink.received),
+                'webhook_posts': webhook.posts,
+                'channels': {name: channel for name, channel in stats.items() if name != 'sms'},
+            }))
+    finally:
+        get_pool(app.config).close()
+        webhook.stop()
+        controller.stop()
+
+if __name__ == '__main__':
+    main()
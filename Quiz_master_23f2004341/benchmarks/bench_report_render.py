@@ -0,0 +1,159 @@
+"""Rendering cost of the monthly reports at 10k users.
+
+Builds synthetic report data (no database: collection is covered by
+bench_monthly_report) for --users users with --quizzes attempts each and
+renders every report with
+
+  legacy  the old f-string concatenation with the stylesheet inlined per user
+  html    the precompiled Jinja2 HTML template
+  text    the plain-text template
+  json    the JSON summary
+
+The first template render of the run includes compiling it, as in a fresh
+worker; the rest reuse the compiled template.
+
+Run from the project folder:  python -m benchmarks.bench_report_render --users 10000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime
+import benchmarks.common  # noqa: F401  (puts the project on sys.path)
+from monthly_reports import REPORT_FORMATS, render_monthly_report
+
+def make_reports(users, quizzes, seed=1):
+    rng = random.Random(seed)
+    reports = []
+    for user_id in range(1, users + 1):
+        rows = [{
+            'quiz_id': rng.randint(1, 200),
+            'score': rng.randint(0, 10),
+            'rank': rng.randint(1, 50),
+            'total_participants': 50,
+            'quiz_name': f"Quiz {rng.randint(1, 200)}",
+            'subject': f"Subject {rng.randint(1, 10)}",
+            'chapter': f"Chapter {rng.randint(1, 40)}",
+            'date': f"2024-05-{rng.randint(1, 28):02d} 10:00",
+        } for _ in range(rng.randint(0, quizzes * 2))]
+        reports.append({
+            'user_id': user_id, 'email': f"user{user_id}@example.com", 'full_name': f"User {user_id}",
+            'attempts': len(rows), 'total_score': sum(row['score'] for row in rows),
+            'rank': rng.randint(1, users), 'quizzes': rows,
+        })
+    return reports
+
+def legacy_render(report, period_label, total_users):
+    """The f-string renderer the templates replaced, for comparison"""
+    attempts = report['attempts']
+    average = report['total_score'] / attempts if attempts else 0
+    report_html = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset=\"UTF-8\">
+        <title>Quiz Master - Monthly Activity Report</title>
+        <style>
+            body {{ font-family: Arial, sans-serif; margin: 20px; background-color: #f5f5f5; }}
+            .container {{ max-width: 800px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
+            .header {{ text-align: center; color: #2c3e50; border-bottom: 3px solid #3498db; padding-bottom: 20px; margin-bottom: 30px; }}
+            .stats-grid {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 20px; margin-bottom: 30px; }}
+            .stat-card {{ background: #ecf0f1; padding: 20px; border-radius: 8px; text-align: center; }}
+            .stat-number {{ font-size: 2em; font-weight: bold; color: #3498db; }}
+            .stat-label {{ color: #7f8c8d; margin-top: 5px; }}
+            .quiz-table {{ width: 100%; border-collapse: collapse; margin-top: 20px; }}
+            .quiz-table th, .quiz-table td {{ padding: 12px; text-align: left; border-bottom: 1px solid #ddd; }}
+            .quiz-table th {{ background-color: #3498db; color: white; }}
+            .quiz-table tr:nth-child(even) {{ background-color: #f9f9f9; }}
+            .rank-badge {{ background: #e74c3c; color: white; padding: 4px 8px; border-radius: 12px; font-size: 0.8em; }}
+            .footer {{ margin-top: 30px; text-align: center; color: #7f8c8d; font-size: 0.9em; }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <h1>📊 Monthly Activity Report</h1>
+                <p>Report Period: {period_label}</p>
+            </div>
+            <div class="stats-grid">
+                <div class="stat-card">
+                    <div class="stat-number">{attempts}</div>
+                    <div class="stat-label">Quizzes Taken</div>
+                </div>
+                <div class="stat-card">
+                    <div class="stat-number">{average:.1f}</div>
+                    <div class="stat-label">Average Score</div>
+                </div>
+                <div class="stat-card">
+                    <div class="stat-number">{report['rank']}/{total_users}</div>
+                    <div class="stat-label">Overall Rank</div>
+                </div>
+                <div class="stat-card">
+                    <div class="stat-number">{report['total_score']}</div>
+                    <div class="stat-label">Total Points</div>
+                </div>
+            </div>
+            <h2>📝 Quiz Performance Details</h2>
+            <table class="quiz-table">
+                <thead>
+                    <tr>
+                        <th>Quiz</th>
+                        <th>Subject</th>
+                        <th>Chapter</th>
+                        <th>Score</th>
+                        <th>Rank</th>
+                        <th>Date</th>
+                    </tr>
+                </thead>
+                <tbody>
+    """
+    for quiz_data in report['quizzes']:
+        rank_class = "rank-badge" if quiz_data['rank'] <= 3 else ""
+        rank_text = f"#{quiz_data['rank']}" if quiz_data['rank'] > 0 else "N/A"
+        report_html += f"""
+                    <tr>
+                        <td><strong>{quiz_data['quiz_name']}</strong></td>
+                        <td>{quiz_data['subject']}</td>
+                        <td>{quiz_data['chapter']}</td>
+                        <td><strong>{quiz_data['score']}</strong></td>
+                        <td><span class=\"{rank_class}\">{rank_text}</span></td>
+                        <td>{quiz_data['date']}</td>
+                    </tr>
+        """
+    report_html += f"""
+                </tbody>
+            </table>
+            <div class="footer">
+                <p>Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+                <p>Keep up the great work! 🚀</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+    return report_html
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--quizzes', type=int, default=10, help='average attempts per user')
+    args = parser.parse_args()
+    reports = make_reports(args.users, args.quizzes)
+    generated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    renderers = [('legacy', lambda report: legacy_render(report, 'May 2024', args.users))]
+    renderers += [(fmt, lambda report, fmt=fmt: render_monthly_report(report, 'May 2024', args.users, fmt, generated_at))
+                  for fmt in REPORT_FORMATS]
+    for mode, render in renderers:
+        started = time.perf_counter()
+        size = sum(len(render(report)) for report in reports)
+        elapsed = time.perf_counter() - started
+        print(json.dumps({
+            'mode': mode,
+            'users': args.users,
+            'seconds': round(elapsed, 3),
+            'us_per_user': round(elapsed / args.users * 1e6, 1),
+            'avg_bytes': size // args.users,
+        }))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Peak Python memory of streaming /api/scores exports as the table grows.
+
+Run from the project folder:  python -m benchmarks.bench_streaming
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from benchmarks.common import make_app, seed, create_admin, login
+
+def drain(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, response.status_code
+    size = 0
+    lines = 0
+    for chunk in response.response:
+        chunk = chunk.encode() if isinstance(chunk, str) else chunk
+        size += len(chunk)
+        lines += chunk.count(b'\n')
+    response.close()
+    return size, lines
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000', help='score rows to stream')
+    parser.add_argument('--format', default='ndjson', choices=['ndjson', 'csv'])
+    args = parser.parse_args()
+
+    for size in [int(s) for s in args.sizes.split(',')]:
+        app = make_app()
+        with app.app_context():
+            seed(users=100, scores_per_user=max(1, size // 100))
+            email, password = create_admin()
+        client = login(app, email, password)
+        tracemalloc.start()
+        started = time.perf_counter()
+        nbytes, lines = drain(client, f"/api/scores?stream=1&format={args.format}")
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(json.dumps({
+            'rows': size,
+            'lines': lines,
+            'bytes': nbytes,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(size / elapsed) if elapsed else None,
+            'peak_kib': round(peak / 1024, 1)
+        }))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Per-task startup overhead of Celery tasks: a new Flask app per task vs one per worker.
+
+  per_task    the old get_flask_app(): create_app() with the full web bootstrap
+              (create_all, migrations, admin check, backfill check, cache
+              optimisation) and an app context for every task
+  per_worker  celery_app.get_flask_app(): one lightweight app per process,
+              ContextTask pushing an app context around each run
+
+Both run the same trivial task (one SELECT) eagerly, so the difference is the
+startup cost alone. Boot-time cache warming is switched off for the per_task
+mode, which makes its numbers a lower bound. Uses a throwaway SQLite file and
+the cache configured in config.py (Redis must be up).
+
+Run from the project folder:  python -m benchmarks.bench_task_startup
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from benchmarks.common import percentile
+from config import Config
+
+def configure_database():
+    fd, path = tempfile.mkstemp(prefix='quiz_master_bench_', suffix='.db')
+    os.close(fd)
+    Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{path}"
+    Config.CACHE_WARM_ON_BOOT = False
+
+def summarize(mode, timings):
+    return {
+        'mode': mode,
+        'tasks': len(timings),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+        'p50_ms': round(percentile(timings, 50) * 1000, 3),
+        'p99_ms': round(percentile(timings, 99) * 1000, 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=200)
+    args = parser.parse_args()
+
+    configure_database()
+    from app import create_app
+    from celery_app import celery, get_flask_app
+    from extensions import db
+    from models import User
+
+    # Schema and admin row, as the web process would have left them
+    create_app()
+
+    def count_users():
+        return User.query.count()
+
+    per_task = []
+    for _ in range(args.tasks):
+        started = time.perf_counter()
+        app = create_app()
+        with app.app_context():
+            count_users()
+        per_task.append(time.perf_counter() - started)
+    print(json.dumps(summarize('per_task', per_task)))
+
+    ping = celery.task(name='benchmarks.bench_task_startup.ping')(count_users)
+    get_flask_app()  # created once at worker_process_init
+    per_worker = []
+    for _ in range(args.tasks):
+        started = time.perf_counter()
+        ping.apply()
+        per_worker.append(time.perf_counter() - started)
+    print(json.dumps(summarize('per_worker', per_worker)))
+    print(json.dumps({'speedup': round(sum(per_task) / sum(per_worker), 1)}))
+    with get_flask_app().app_context():
+        db.engine.dispose()
+
+if __name__ == '__main__':
+    main()
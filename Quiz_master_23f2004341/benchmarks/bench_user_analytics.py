@@ -0,0 +1,97 @@
+"""Query count and latency of /user/analytics as the number of attempts grows.
+
+The legacy per-score implementation is compared with it (same payload, query
+count, latency) up to --legacy-max attempts only: it expires the session for
+every score, so its cost grows quadratically and 5000 attempts take minutes.
+
+Run from the project folder:  python -m benchmarks.bench_user_analytics
+"""
+import argparse
+import json
+import time
+from benchmarks.common import make_app, seed, count_queries
+from extensions import db
+from models import Subject, Chapter, Quiz, Score
+from analytics import compute_user_analytics
+
+def legacy_user_analytics(user_id):
+    # Previous per-score implementation, kept here as the baseline
+    scores = Score.query.filter_by(user_id=user_id).all()
+    total_quizzes = len(scores)
+    total_score = sum(s.total_score for s in scores)
+    recent_activity = []
+    for score in sorted(scores, key=lambda x: x.timestamp, reverse=True)[:5]:
+        quiz = db.session.get(Quiz, score.quiz_id)
+        chapter = db.session.get(Chapter, quiz.chapter_id) if quiz else None
+        subject = db.session.get(Subject, chapter.subject_id) if chapter else None
+        recent_activity.append({
+            'quiz_id': score.quiz_id,
+            'score': score.total_score,
+            'date': score.timestamp.strftime('%Y-%m-%d'),
+            'chapter': chapter.name if chapter else 'Unknown',
+            'subject': subject.name if subject else 'Unknown'
+        })
+    by_subject, by_chapter = {}, {}
+    for score in scores:
+        # The old code issued fresh lookups per score; expire to defeat the identity map
+        db.session.expire_all()
+        quiz = db.session.get(Quiz, score.quiz_id)
+        chapter = db.session.get(Chapter, quiz.chapter_id) if quiz else None
+        subject = db.session.get(Subject, chapter.subject_id) if chapter else None
+        if chapter:
+            by_chapter.setdefault(chapter.name, []).append(score.total_score)
+            if subject:
+                by_subject.setdefault(subject.name, []).append(score.total_score)
+    trend = sorted(scores, key=lambda x: x.timestamp)[-10:]
+    return {
+        'total_quizzes': total_quizzes,
+        'average_score': round(total_score / total_quizzes, 2),
+        'best_score': max(s.total_score for s in scores),
+        'total_score': total_score,
+        'recent_activity': recent_activity,
+        'performance_by_subject': {k: sum(v) / len(v) for k, v in by_subject.items()},
+        'performance_by_chapter': {k: sum(v) / len(v) for k, v in by_chapter.items()},
+        'score_trend': [
+            {'attempt': i + 1, 'score': s.total_score, 'date': s.timestamp.strftime('%Y-%m-%d')}
+            for i, s in enumerate(trend)
+        ]
+    }
+
+def measure(fn, user_id, repeat):
+    with count_queries() as counter:
+        fn(user_id)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(user_id)
+    elapsed = (time.perf_counter() - started) / repeat
+    return counter.count, round(elapsed * 1000, 2)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10,100,1000,5000', help='attempts per user to test')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--legacy-max', type=int, default=1000, help='largest size the legacy code is run at')
+    parser.add_argument('--skip-legacy', action='store_true')
+    args = parser.parse_args()
+
+    results = []
+    for size in [int(s) for s in args.sizes.split(',')]:
+        app = make_app()
+        with app.app_context():
+            ids = seed(users=1, scores_per_user=size)
+            user_id = ids['user_ids'][0]
+            row = {'attempts': size}
+            row['queries'], row['ms'] = measure(compute_user_analytics, user_id, args.repeat)
+            if not args.skip_legacy and size <= args.legacy_max:
+                expected = json.dumps(legacy_user_analytics(user_id), sort_keys=True)
+                actual = json.dumps(compute_user_analytics(user_id), sort_keys=True)
+                row['same_payload'] = expected == actual
+                row['legacy_queries'], row['legacy_ms'] = measure(legacy_user_analytics, user_id, 1)
+            results.append(row)
+            print(json.dumps(row))
+            db.session.remove()
+    counts = {r['queries'] for r in results}
+    print(f"Query count constant across sizes: {len(counts) == 1}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Check that upgrade_schema brings older databases up to the current models.
+
+Starts from two databases and runs the web bootstrap's schema steps on each
+(db.create_all, then migrations.upgrade_schema):
+
+  baseline  the schema the first release created (no indexes, no
+            Score.submission_id), with a few rows in it
+  fresh     an empty database, where create_all already did everything and
+            every migration must be a no-op
+
+Afterwards every table, column and index of the models must exist, the schema
+version must be the last migration's, and the baseline rows must still be
+there. A second upgrade_schema must apply nothing. Exits non-zero otherwise.
+
+Run from the project folder:  python -m benchmarks.check_migrations
+"""
+import os
+import sys
+import tempfile
+from sqlalchemy import text
+from benchmarks.common import make_app
+from extensions import db
+from migrations import MIGRATIONS, current_schema_version, upgrade_schema
+
+# Tables exactly as the first release's db.create_all() created them
+BASELINE_SCHEMA = [
+    """CREATE TABLE subject (
+        id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, description TEXT,
+        PRIMARY KEY (id), UNIQUE (name))""",
+    """CREATE TABLE user (
+        id INTEGER NOT NULL, email VARCHAR(150) NOT NULL, password VARCHAR(150) NOT NULL,
+        full_name VARCHAR(100) NOT NULL, qualification VARCHAR(100), dob DATE, role VARCHAR(10) NOT NULL,
+        PRIMARY KEY (id), UNIQUE (email))""",
+    """CREATE TABLE chapter (
+        id INTEGER NOT NULL, subject_id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, description TEXT,
+        PRIMARY KEY (id), FOREIGN KEY(subject_id) REFERENCES subject (id))""",
+    """CREATE TABLE quiz (
+        id INTEGER NOT NULL, chapter_id INTEGER NOT NULL, date_of_quiz DATE NOT NULL,
+        duration VARCHAR(10) NOT NULL, remarks TEXT,
+        PRIMARY KEY (id), FOREIGN KEY(chapter_id) REFERENCES chapter (id))""",
+    """CREATE TABLE question (
+        id INTEGER NOT NULL, quiz_id INTEGER NOT NULL, question_statement TEXT NOT NULL,
+        option1 VARCHAR(200) NOT NULL, option2 VARCHAR(200) NOT NULL, option3 VARCHAR(200) NOT NULL,
+        option4 VARCHAR(200) NOT NULL, correct_option INTEGER NOT NULL,
+        PRIMARY KEY (id), FOREIGN KEY(quiz_id) REFERENCES quiz (id))""",
+    """CREATE TABLE score (
+        id INTEGER NOT NULL, quiz_id INTEGER NOT NULL, user_id INTEGER NOT NULL,
+        timestamp DATETIME NOT NULL, total_score INTEGER NOT NULL,
+        PRIMARY KEY (id), FOREIGN KEY(quiz_id) REFERENCES quiz (id), FOREIGN KEY(user_id) REFERENCES user (id))""",
+]
+
+BASELINE_ROWS = [
+    "INSERT INTO subject (id, name, description) VALUES (1, 'Maths', 'Baseline subject')",
+    "INSERT INTO user (id, email, password, full_name, role) VALUES (1, 'old@example.com', 'x', 'Old User', 'user')",
+    "INSERT INTO chapter (id, subject_id, name, description) VALUES (1, 1, 'Algebra', NULL)",
+    "INSERT INTO quiz (id, chapter_id, date_of_quiz, duration, remarks) VALUES (1, 1, '2024-01-01', '00:30', NULL)",
+    "INSERT INTO question (id, quiz_id, question_statement, option1, option2, option3, option4, correct_option) "
+    "VALUES (1, 1, '1 + 1?', '1', '2', '3', '4', 2)",
+    "INSERT INTO score (id, quiz_id, user_id, timestamp, total_score) VALUES (1, 1, 1, '2024-01-02 10:00:00', 1)",
+]
+
+def temp_database(statements):
+    fd, path = tempfile.mkstemp(prefix='quiz_master_migrations_', suffix='.db')
+    os.close(fd)
+    app = make_app(f"sqlite:///{path}")
+    with app.app_context():
+        # make_app ran create_all; start over from the schema given
+        db.drop_all()
+        with db.engine.begin() as connection:
+            for statement in statements:
+                connection.execute(text(statement))
+    return app
+
+def schema_problems():
+    problems = []
+    with db.engine.connect() as connection:
+        for table in db.metadata.sorted_tables:
+            columns = {row[1] for row in connection.execute(text(f"PRAGMA table_info('{table.name}')"))}
+            if not columns:
+                problems.append(f"missing table {table.name}")
+                continue
+            problems += [f"missing column {table.name}.{column.name}"
+                         for column in table.columns if column.name not in columns]
+            indexes = {row[1] for row in connection.execute(text(f"PRAGMA index_list('{table.name}')"))}
+            problems += [f"missing index {index.name}" for index in table.indexes if index.name not in indexes]
+        version = current_schema_version(connection)
+    latest = MIGRATIONS[-1][0]
+    if version != latest:
+        problems.append(f"schema version {version}, expected {latest}")
+    return problems
+
+def check(name, statements, expected_scores):
+    app = temp_database(statements)
+    with app.app_context():
+        try:
+            db.create_all()
+            applied = upgrade_schema()
+            problems = schema_problems()
+            if upgrade_schema():
+                problems.append("second upgrade applied migrations again")
+            scores = db.session.execute(text("SELECT COUNT(*) FROM score")).scalar()
+            if scores != expected_scores:
+                problems.append(f"{scores} scores, expected {expected_scores}")
+        except Exception as e:
+            applied, problems = [], [repr(e)]
+        finally:
+            db.session.remove()
+            db.engine.dispose()
+    print(f"[{'FAIL' if problems else 'ok'}] {name}: {len(applied)} migration(s) applied, "
+          f"problems: {'; '.join(problems) or 'none'}")
+    return not problems
+
+def main():
+    failures = 0
+    failures += not check('baseline', BASELINE_SCHEMA + BASELINE_ROWS, expected_scores=1)
+    failures += not check('fresh', [], expected_scores=0)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
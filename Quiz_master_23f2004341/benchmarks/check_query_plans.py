@@ -0,0 +1,78 @@
+"""Check that the hot queries are answered from indexes, not full table scans.
+
+Runs EXPLAIN QUERY PLAN for the statements behind attempt_quiz, quiz_history,
+the quiz history export, the reminder audience and the ranking code against a
+freshly migrated database and exits non-zero if any of them scans a whole table
+it should have searched. Where the module builds the statement itself
+(exports, reminders, monthly reports), that statement is explained, not a
+copy.
+
+Run from the project folder:  python -m benchmarks.check_query_plans
+"""
+import sys
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from benchmarks.common import make_app, seed
+from extensions import db
+from models import Chapter, Quiz, Question, Score
+from migrations import upgrade_schema
+from exports import quiz_history_statement
+from reminders import audience_statement
+from monthly_reports import monthly_totals_statement, monthly_attempts_statement
+
+def hot_queries():
+    now = datetime.now()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    yesterday = (now - timedelta(days=1)).date()
+    return {
+        'attempt_quiz: questions of a quiz': Question.query.filter_by(quiz_id=1),
+        'quiz_history: scores of a user': Score.query.filter_by(user_id=1),
+        'exports: quiz history of a user': quiz_history_statement(1),
+        'reminders: audience': audience_statement(datetime.now() - timedelta(days=1), yesterday),
+        'ranking: quiz leaderboard': Score.query.filter_by(quiz_id=1)
+            .order_by(Score.total_score.desc()),
+        'monthly reports: user totals': monthly_totals_statement(month_start, now),
+        'monthly reports: ranked attempts': monthly_attempts_statement(month_start, now),
+        'catalogue: quizzes of a chapter': Quiz.query.filter_by(chapter_id=1),
+        'catalogue: chapters of a subject': Chapter.query.filter_by(subject_id=1),
+    }
+
+# Table scans a query cannot avoid: the reminder audience and the monthly
+# totals consider every user. Their per-user score lookups must still use
+# indexes.
+EXPECTED_SCANS = {
+    'reminders: audience': {'user'},
+    'monthly reports: user totals': {'user'},
+}
+
+def explain(query):
+    statement = getattr(query, 'statement', query).compile(db.engine, compile_kwargs={'literal_binds': True})
+    rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {statement}")).all()
+    return [row[-1] for row in rows]
+
+def full_scans(plan, expected=()):
+    # "SCAN <table>" without an index is a full table scan; SEARCH and index scans are fine,
+    # and so is reading back a co-routine (a subquery, union or window pass) the plan built
+    coroutines = {step.split(maxsplit=1)[1] for step in plan if step.startswith('CO-ROUTINE')}
+    return [step for step in plan
+            if step.startswith('SCAN') and 'INDEX' not in step
+            and step.split(maxsplit=1)[1] not in coroutines and step.split()[1] not in expected]
+
+def main():
+    app = make_app()
+    failures = 0
+    with app.app_context():
+        seed(users=20, scores_per_user=50)
+        upgrade_schema()
+        db.session.execute(text("ANALYZE"))
+        for name, query in hot_queries().items():
+            plan = explain(query)
+            scans = full_scans(plan, EXPECTED_SCANS.get(name, ()))
+            status = 'FULL SCAN' if scans else 'ok'
+            failures += bool(scans)
+            print(f"[{status}] {name}: {' | '.join(plan)}")
+    print(f"{failures} quer{'y' if failures == 1 else 'ies'} without index")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""Check that overlapping submission flushes write every queued attempt exactly once.
+
+Queues --submissions attempts, then starts --flushers threads at the same
+moment, the way beat and the maintenance worker's thread pool can. It does
+this twice:
+
+  locked    flush_submissions, serialized by the flush lock
+  unlocked  the flush loop itself with the lock bypassed, as when a lease runs
+            out, so only the per-thread consumer names keep them apart
+
+Unserialized flushers also contend for SQLite's write lock; a run that loses
+it is retried, as the next beat run would. Every scenario must finish without
+other errors (in particular no IntegrityError on submission_id), with one
+Score per submission and nothing left pending.
+
+A last scenario queues one poison entry among good ones (a trigger makes its
+insert fail). The first run must save every good entry; runs after that must
+dead-letter the poison entry once it has been delivered
+SUBMISSIONS_MAX_DELIVERIES times, leaving nothing pending. Exits non-zero if
+any scenario fails. Needs Redis.
+
+Run from the project folder:  python -m benchmarks.check_submission_flush
+"""
+import argparse
+import sys
+import threading
+from datetime import datetime
+from sqlalchemy.exc import OperationalError
+from benchmarks.common import make_app, seed
+from sqlalchemy import text
+from extensions import db, redis_client
+from models import Score
+import submissions
+from submissions import (SUBMISSIONS_STREAM, SUBMISSIONS_GROUP, SUBMISSIONS_DEAD_STREAM, enqueue_submission,
+                         flush_submissions)
+
+def run_flushers(app, flush, count):
+    barrier = threading.Barrier(count)
+    inserted, errors, busy = [], [], []
+
+    def flusher():
+        with app.app_context():
+            barrier.wait()
+            try:
+                # Like beat calling again: a run that lost SQLite's write lock
+                # leaves its batch pending and the next run of the thread retries it
+                while True:
+                    try:
+                        done = flush()
+                    except OperationalError as e:
+                        if 'database is locked' not in str(e):
+                            raise
+                        busy.append(1)
+                        continue
+                    inserted.append(done)
+                    if not done:
+                        break
+            except Exception as e:
+                errors.append(repr(e))
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=flusher) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(inserted), errors, len(busy)
+
+def check(app, name, flush, user_ids, quiz_ids, submission_count, flushers):
+    redis_client.delete(SUBMISSIONS_STREAM, submissions.FLUSH_LOCK_KEY)
+    with app.app_context():
+        db.session.query(Score).filter(Score.submission_id.isnot(None)).delete()
+        db.session.commit()
+        for i in range(submission_count):
+            enqueue_submission(user_ids[i % len(user_ids)], quiz_ids[i % len(quiz_ids)], i % 10, datetime.now())
+    inserted, errors, busy = run_flushers(app, flush, flushers)
+    # The locked runs that found the lock taken did nothing; drain what is left
+    with app.app_context():
+        inserted += flush_submissions()
+        rows = db.session.query(Score).filter(Score.submission_id.isnot(None)).count()
+        distinct = db.session.query(db.func.count(db.distinct(Score.submission_id))).scalar()
+    pending = redis_client.xpending(SUBMISSIONS_STREAM, SUBMISSIONS_GROUP).get('pending', 0)
+    # Returned counts miss the batches of a run that later lost the write lock, so rows decide
+    ok = not errors and rows == distinct == submission_count and not pending
+    print(f"[{'ok' if ok else 'FAIL'}] {name}: {flushers} flushers, {submission_count} queued, "
+          f"{inserted} inserted, {rows} rows, {pending} pending, {busy} SQLite lock retries, "
+          f"errors: {errors or 'none'}")
+    return ok
+
+def check_poison(app, user_ids, quiz_ids, submission_count):
+    redis_client.delete(SUBMISSIONS_STREAM, SUBMISSIONS_DEAD_STREAM, submissions.FLUSH_LOCK_KEY)
+    max_deliveries = app.config['SUBMISSIONS_MAX_DELIVERIES']
+    with app.app_context():
+        db.session.query(Score).filter(Score.submission_id.isnot(None)).delete()
+        db.session.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS poison_submission BEFORE INSERT ON score "
+            "WHEN NEW.quiz_id < 0 BEGIN SELECT RAISE(ABORT, 'poison submission'); END"
+        ))
+        db.session.commit()
+        for i in range(submission_count):
+            quiz_id = -1 if i == submission_count // 2 else quiz_ids[i % len(quiz_ids)]
+            enqueue_submission(user_ids[i % len(user_ids)], quiz_id, i % 10, datetime.now())
+        errors, runs = [], 0
+        try:
+            # claim_idle_ms=0: each run may come from another thread (consumer) of the worker
+            first = flush_submissions(claim_idle_ms=0)
+            runs = 1
+            while runs <= max_deliveries and not redis_client.xlen(SUBMISSIONS_DEAD_STREAM):
+                flush_submissions(claim_idle_ms=0)
+                runs += 1
+        except Exception as e:
+            first = 0
+            errors.append(repr(e))
+        rows = db.session.query(Score).filter(Score.submission_id.isnot(None)).count()
+        db.session.execute(text("DROP TRIGGER poison_submission"))
+        db.session.commit()
+    pending = redis_client.xpending(SUBMISSIONS_STREAM, SUBMISSIONS_GROUP).get('pending', 0)
+    dead = redis_client.xrange(SUBMISSIONS_DEAD_STREAM)
+    good = submission_count - 1
+    ok = (not errors and first == good and rows == good and not pending and len(dead) == 1
+          and dead[0][1]['quiz_id'] == '-1')
+    print(f"[{'ok' if ok else 'FAIL'}] poison: {submission_count} queued, {first} saved by the first run, "
+          f"{rows} rows, {len(dead)} dead-lettered after {runs} runs, {pending} pending, "
+          f"errors: {errors or 'none'}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--submissions', type=int, default=2000)
+    parser.add_argument('--flushers', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=50)
+    args = parser.parse_args()
+    app = make_app(SUBMISSIONS_WRITE_BEHIND=True)
+    with app.app_context():
+        ids = seed(users=20, scores_per_user=0)
+    scenarios = {
+        'locked': lambda: flush_submissions(batch_size=args.batch_size),
+        'unlocked': lambda: submissions._flush(args.batch_size, 60000, None),
+    }
+    failures = 0
+    for name, flush in scenarios.items():
+        failures += not check(app, name, flush, ids['user_ids'], ids['quiz_ids'], args.submissions, args.flushers)
+    failures += not check_poison(app, ids['user_ids'], ids['quiz_ids'], min(args.submissions, 200))
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import os
+import sys
+import random
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta
+
+# Allow running the scripts as ``python -m benchmarks.<name>`` from the project folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import event
+from config import Config
+from werkzeug.security import generate_password_hash
+from extensions import db, login_manager, bcrypt, cache
+from models import User, Subject, Chapter, Quiz, Question, Score
+from aggregates import rebuild_aggregates
+
+def make_app(database_uri=None, cache_type='NullCache', **overrides):
+    """Minimal app for benchmarks: same models, extensions and API, throwaway SQLite file"""
+    if database_uri is None:
+        fd, path = tempfile.mkstemp(prefix='quiz_master_bench_', suffix='.db')
+        os.close(fd)
+        database_uri = f"sqlite:///{path}"
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config['TESTING'] = True
+    app.config['CACHE_TYPE'] = cache_type
+    app.config['CACHE_NO_NULL_WARNING'] = True
+    app.config.update(overrides)
+    db.init_app(app)
+    login_manager.init_app(app)
+    bcrypt.init_app(app)
+    cache.init_app(app)
+    from api import api
+    app.register_blueprint(api, url_prefix='/api')
+    with app.app_context():
+        db.create_all()
+    return app
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+@contextmanager
+def count_queries(engine=None):
+    # Pass the engine to count outside an app context, e.g. around test client requests
+    counter = QueryCounter()
+    engine = engine or db.engine
+    event.listen(engine, 'before_cursor_execute', counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter)
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0
+
+def create_admin(email='bench-admin@example.com', password='bench'):
+    admin = User(email=email, full_name='Bench Admin', role='admin',
+                 password=generate_password_hash(password))
+    db.session.add(admin)
+    db.session.commit()
+    return email, password
+
+def enable_logins(user_ids, password='bench'):
+    """Give seeded users a real password hash so they can log in; returns their emails"""
+    users = User.query.filter(User.id.in_(user_ids)).all()
+    for user in users:
+        user.set_password(password)
+    db.session.commit()
+    return {user.id: user.email for user in users}
+
+def login(app, email, password):
+    client = app.test_client()
+    response = client.post('/api/login', json={'email': email, 'password': password})
+    assert response.status_code == 200, response.get_json()
+    return client
+
+def seed(users=10, subjects=3, chapters_per_subject=3, quizzes_per_chapter=3,
+         questions_per_quiz=10, scores_per_user=20, seed_value=42):
+    """Insert a synthetic dataset through the models; returns the created ids"""
+    rng = random.Random(seed_value)
+    subject_rows = [Subject(name=f"Subject {i}", description=f"Bench subject {i}") for i in range(subjects)]
+    db.session.add_all(subject_rows)
+    db.session.flush()
+    chapter_rows = [
+        Chapter(subject_id=s.id, name=f"Chapter {s.id}.{i}", description="Bench chapter")
+        for s in subject_rows for i in range(chapters_per_subject)
+    ]
+    db.session.add_all(chapter_rows)
+    db.session.flush()
+    today = date.today()
+    quiz_rows = [
+        Quiz(chapter_id=c.id, date_of_quiz=today - timedelta(days=rng.randint(0, 60)),
+             duration="00:30", remarks=f"Bench quiz {i}")
+        for c in chapter_rows for i in range(quizzes_per_chapter)
+    ]
+    db.session.add_all(quiz_rows)
+    db.session.flush()
+    db.session.bulk_insert_mappings(Question, [
+        {
+            'quiz_id': q.id,
+            'question_statement': f"Question {i} of quiz {q.id}?",
+            'option1': "Option A", 'option2': "Option B",
+            'option3': "Option C", 'option4': "Option D",
+            'correct_option': rng.randint(1, 4)
+        } for q in quiz_rows for i in range(questions_per_quiz)
+    ])
+    user_rows = [
+        User(email=f"bench{i}@example.com", password="x", full_name=f"Bench User {i}", role='user')
+        for i in range(users)
+    ]
+    db.session.add_all(user_rows)
+    db.session.flush()
+    now = datetime.now()
+    quiz_ids = [q.id for q in quiz_rows]
+    db.session.bulk_insert_mappings(Score, [
+        {
+            'user_id': u.id,
+            'quiz_id': rng.choice(quiz_ids),
+            'timestamp': now - timedelta(minutes=rng.randint(0, 60 * 24 * 60)),
+            'total_score': rng.randint(0, questions_per_quiz)
+        } for u in user_rows for _ in range(scores_per_user)
+    ])
+    db.session.commit()
+    # Bulk inserts bypass attempt_quiz, so fill the score summaries in one pass
+    rebuild_aggregates()
+    return {
+        'user_ids': [u.id for u in user_rows],
+        'quiz_ids': quiz_ids,
+        'chapter_ids': [c.id for c in chapter_rows],
+        'subject_ids': [s.id for s in subject_rows]
+    }
@@ -0,0 +1,219 @@
+"""Load test for the REST API: per-endpoint throughput, latency percentiles and SQL counts.
+
+Seeds a synthetic dataset of the requested size through models.py, logs in a
+pool of students and an admin, then replays a scenario against the api
+blueprint in-process:
+
+  browse     students browsing subjects, chapters, quizzes and questions
+  exam       attempt_quiz bursts: every student opens and submits the same quiz
+  dashboard  admin charts, analytics, search and the users/scores lists
+  mixed      all of the above plus logins, history and analytics (default)
+
+Each endpoint reports requests, errors, throughput (requests per second of
+time spent in it), p50/p95/p99 latency and SQL statements per request. The
+result is printed as JSON and can be saved with --output; --compare checks a
+run against a saved one and exits 1 when an endpoint needs more queries or its
+p95 got worse than --tolerance percent.
+
+The cache configured in config.py is used (Redis must be up); pass
+--cache NullCache to load SQLite directly.
+
+Run from the project folder:  python -m benchmarks.loadtest --scenario mixed --output run.json
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from benchmarks.common import make_app, seed, create_admin, enable_logins, login, count_queries, percentile
+from config import Config
+from extensions import db, cache
+from models import Question
+
+class Context:
+    def __init__(self, app, ids, students, admin, questions_by_quiz, rng):
+        self.app = app
+        self.ids = ids
+        self.students = students
+        self.admin = admin
+        self.questions_by_quiz = questions_by_quiz
+        self.rng = rng
+
+    def student(self):
+        return self.rng.choice(list(self.students.values()))
+
+    def answers(self, quiz_id):
+        return {str(q): self.rng.randint(1, 4) for q in self.questions_by_quiz.get(quiz_id, [])}
+
+# Operation name -> ctx -> (endpoint label, client, method, url, json body)
+OPERATIONS = {
+    'login': lambda ctx: ('POST /api/login', ctx.app.test_client(), 'post', '/api/login',
+                          {'email': ctx.rng.choice(list(ctx.students)), 'password': 'bench'}),
+    'subjects': lambda ctx: ('GET /api/subjects', ctx.student(), 'get', '/api/subjects', None),
+    'chapters': lambda ctx: ('GET /api/chapters', ctx.student(), 'get',
+                             f"/api/chapters?subject_id={ctx.rng.choice(ctx.ids['subject_ids'])}", None),
+    'quizzes': lambda ctx: ('GET /api/quizzes', ctx.student(), 'get',
+                            f"/api/quizzes?chapter_id={ctx.rng.choice(ctx.ids['chapter_ids'])}", None),
+    'quiz': lambda ctx: ('GET /api/quizzes/<id>', ctx.student(), 'get',
+                         f"/api/quizzes/{ctx.rng.choice(ctx.ids['quiz_ids'])}", None),
+    'questions': lambda ctx: ('GET /api/questions', ctx.student(), 'get',
+                              f"/api/questions?quiz_id={ctx.rng.choice(ctx.ids['quiz_ids'])}", None),
+    'attempt': lambda ctx: _attempt(ctx, ctx.rng.choice(ctx.ids['quiz_ids']), ctx.student()),
+    'history': lambda ctx: ('GET /api/user/quiz_history', ctx.student(), 'get', '/api/user/quiz_history', None),
+    'analytics': lambda ctx: ('GET /api/user/analytics', ctx.student(), 'get', '/api/user/analytics', None),
+    'admin_charts': lambda ctx: ('GET /api/admin/charts', ctx.admin, 'get', '/api/admin/charts', None),
+    'admin_analytics': lambda ctx: ('GET /api/admin/analytics', ctx.admin, 'get', '/api/admin/analytics', None),
+    'admin_search': lambda ctx: ('POST /api/admin/search', ctx.admin, 'post', '/api/admin/search',
+                                 {'term': ctx.rng.choice(['Bench', 'Subject', 'Chapter', 'Question 1', 'zzz'])}),
+    'users': lambda ctx: ('GET /api/users', ctx.admin, 'get', '/api/users', None),
+    'scores': lambda ctx: ('GET /api/scores', ctx.admin, 'get', '/api/scores', None),
+}
+
+def _attempt(ctx, quiz_id, client):
+    return ('POST /api/quizzes/<id>/attempt', client, 'post', f"/api/quizzes/{quiz_id}/attempt",
+            {'answers': ctx.answers(quiz_id)})
+
+SCENARIO_WEIGHTS = {
+    'browse': {'subjects': 30, 'chapters': 25, 'quizzes': 25, 'quiz': 10, 'questions': 10},
+    'dashboard': {'admin_charts': 30, 'admin_analytics': 30, 'admin_search': 20, 'users': 10, 'scores': 10},
+    'mixed': {'login': 2, 'subjects': 15, 'chapters': 10, 'quizzes': 10, 'quiz': 8, 'questions': 8,
+              'attempt': 12, 'history': 12, 'analytics': 12, 'admin_charts': 4, 'admin_analytics': 4,
+              'admin_search': 1, 'users': 1, 'scores': 1},
+}
+
+def weighted(ctx, weights, requests):
+    names = list(weights)
+    for name in ctx.rng.choices(names, weights=[weights[n] for n in names], k=requests):
+        yield OPERATIONS[name](ctx)
+
+def exam(ctx, requests):
+    """Rounds of one quiz opened and submitted by every student, in random order"""
+    sent = 0
+    while sent < requests:
+        quiz_id = ctx.rng.choice(ctx.ids['quiz_ids'])
+        clients = list(ctx.students.values())
+        ctx.rng.shuffle(clients)
+        for client in clients:
+            yield ('GET /api/questions', client, 'get', f"/api/questions?quiz_id={quiz_id}", None)
+            yield _attempt(ctx, quiz_id, client)
+            sent += 2
+            if sent >= requests:
+                return
+
+def scenario_operations(ctx, scenario, requests):
+    if scenario == 'exam':
+        return exam(ctx, requests)
+    return weighted(ctx, SCENARIO_WEIGHTS[scenario], requests)
+
+def setup(args):
+    app = make_app(cache_type=args.cache)
+    rng = random.Random(args.seed)
+    with app.app_context():
+        ids = seed(users=args.users, subjects=args.subjects, chapters_per_subject=args.chapters,
+                   quizzes_per_chapter=args.quizzes, questions_per_quiz=args.questions,
+                   scores_per_user=args.scores, seed_value=args.seed)
+        emails = enable_logins(rng.sample(ids['user_ids'], min(args.active_users, len(ids['user_ids']))))
+        admin = create_admin()
+        questions_by_quiz = {}
+        for quiz_id, question_id in Question.query.with_entities(Question.quiz_id, Question.id):
+            questions_by_quiz.setdefault(quiz_id, []).append(question_id)
+        # Entries and tag generations left over from a previous run
+        cache.clear()
+    students = {email: login(app, email, 'bench') for email in emails.values()}
+    return Context(app, ids, students, login(app, *admin), questions_by_quiz, rng)
+
+def run(ctx, scenario, requests):
+    samples = {}
+    # No app context around the requests: each one must get its own session and g
+    with ctx.app.app_context():
+        engine = db.engine
+    with count_queries(engine) as counter:
+        started = time.perf_counter()
+        for label, client, method, url, body in scenario_operations(ctx, scenario, requests):
+            queries_before = counter.count
+            request_started = time.perf_counter()
+            response = getattr(client, method)(url, json=body) if body is not None else getattr(client, method)(url)
+            elapsed = time.perf_counter() - request_started
+            response.close()
+            entry = samples.setdefault(label, {'latencies': [], 'queries': [], 'errors': 0})
+            entry['latencies'].append(elapsed)
+            entry['queries'].append(counter.count - queries_before)
+            entry['errors'] += response.status_code >= 400
+        wall = time.perf_counter() - started
+
+    endpoints = {}
+    for label, entry in sorted(samples.items()):
+        latencies, queries = entry['latencies'], entry['queries']
+        busy = sum(latencies)
+        endpoints[label] = {
+            'requests': len(latencies),
+            'errors': entry['errors'],
+            'requests_per_second': round(len(latencies) / busy, 1) if busy else None,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'mean_queries': round(sum(queries) / len(queries), 2),
+            'max_queries': max(queries),
+        }
+    total = sum(e['requests'] for e in endpoints.values())
+    return {
+        'total': {
+            'requests': total,
+            'errors': sum(e['errors'] for e in endpoints.values()),
+            'seconds': round(wall, 3),
+            'requests_per_second': round(total / wall, 1) if wall else None,
+        },
+        'endpoints': endpoints,
+    }
+
+def compare(previous, current, tolerance):
+    """Print per-endpoint deltas; returns the list of regressions"""
+    regressions = []
+    for label, now in current['endpoints'].items():
+        before = previous.get('endpoints', {}).get(label)
+        if not before:
+            continue
+        p95_change = (now['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0
+        print(f"{label}: p95 {before['p95_ms']} -> {now['p95_ms']} ms ({p95_change:+.1f}%), "
+              f"queries {before['mean_queries']} -> {now['mean_queries']}", file=sys.stderr)
+        if now['mean_queries'] > before['mean_queries']:
+            regressions.append(f"{label}: more SQL queries per request")
+        if p95_change > tolerance:
+            regressions.append(f"{label}: p95 {p95_change:+.1f}%")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenario', default='mixed', choices=['browse', 'exam', 'dashboard', 'mixed'])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--active-users', type=int, default=50, help='students that log in and send requests')
+    parser.add_argument('--subjects', type=int, default=5)
+    parser.add_argument('--chapters', type=int, default=5, help='chapters per subject')
+    parser.add_argument('--quizzes', type=int, default=4, help='quizzes per chapter')
+    parser.add_argument('--questions', type=int, default=10, help='questions per quiz')
+    parser.add_argument('--scores', type=int, default=20, help='past attempts per user')
+    parser.add_argument('--cache', default=Config.CACHE_TYPE)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the JSON result to this file')
+    parser.add_argument('--compare', help='JSON result of a previous run to compare against')
+    parser.add_argument('--tolerance', type=float, default=20.0, help='allowed p95 increase in percent')
+    args = parser.parse_args()
+
+    ctx = setup(args)
+    result = run(ctx, args.scenario, args.requests)
+    result['config'] = {k: v for k, v in vars(args).items() if k not in ('output', 'compare', 'tolerance')}
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(json.load(f), result, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import pickle
+import threading
+from collections import OrderedDict
+from flask_caching.backends.rediscache import RedisCache
+from metrics import record_cache_lookup
+
+INVALIDATION_CHANNEL = "quiz_master:invalidate"
+
+_MISSING = object()
+
+class LocalLRU:
+    """Bounded, TTL-limited in-process cache (one per worker process)"""
+
+    def __init__(self, max_entries=1024, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return _MISSING
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+class InvalidationBus:
+    """Redis pub/sub channel that keeps the in-process tiers of every worker coherent.
+
+    Messages are JSON objects with optional ``keys`` (cache keys to drop),
+    ``tags`` (tag generations to forget) and ``clear`` fields. Each process runs
+    one daemon listener thread; it is (re)started lazily after a fork. While the
+    subscription is down messages may be missed, so local tiers are flushed on
+    every (re)connect and their TTL bounds any remaining staleness.
+    """
+
+    def __init__(self, client, channel=INVALIDATION_CHANNEL):
+        self.client = client
+        self.channel = channel
+        self._handlers = []
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, handler):
+        self._handlers.append(handler)
+
+    def publish(self, keys=(), tags=(), clear=False):
+        message = {'keys': list(keys), 'tags': list(tags), 'clear': clear, 'pid': os.getpid()}
+        # Apply locally right away, other processes get it through the channel
+        self._dispatch(message)
+        try:
+            self.client.publish(self.channel, json.dumps(message))
+        except Exception as e:
+            print(f"Cache invalidation publish error: {e}")
+
+    def ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # New process (first use or after fork): inherited local entries may be stale
+            self._dispatch({'clear': True})
+            self._pid = os.getpid()
+            thread = threading.Thread(target=self._listen, name='cache-invalidation', daemon=True)
+            thread.start()
+
+    def _dispatch(self, message):
+        for handler in self._handlers:
+            try:
+                handler(message)
+            except Exception as e:
+                print(f"Cache invalidation handler error: {e}")
+
+    def _listen(self):
+        pid = os.getpid()
+        failures = 0
+        while self._pid == pid:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                self._dispatch({'clear': True})
+                failures = 0
+                for raw in pubsub.listen():
+                    if raw.get('type') != 'message':
+                        continue
+                    data = raw['data']
+                    message = json.loads(data.decode() if isinstance(data, bytes) else data)
+                    if message.get('pid') != pid:
+                        self._dispatch(message)
+            except Exception as e:
+                if not failures:
+                    print(f"Cache invalidation listener error: {e}")
+                failures += 1
+                time.sleep(min(30, 2 ** failures))
+
+class TwoTierRedisCache(RedisCache):
+    """flask-caching backend: a per-process LRU in front of the shared Redis cache.
+
+    Reads are served from the local tier when possible and fall back to Redis;
+    writes go to both. Local entries hold the pickled value so every request
+    gets its own copy of the cached object. Deletes and clears are broadcast on
+    the invalidation bus so the local copies in every worker are evicted.
+
+    Configured with CACHE_LOCAL_MAX_ENTRIES and CACHE_LOCAL_TIMEOUT.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.local = LocalLRU()
+        self.bus = None
+        self._stats = {'local_hits': 0, 'local_misses': 0, 'redis_hits': 0, 'redis_misses': 0}
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        cache = super().factory(app, config, args, kwargs)
+        cache.local = LocalLRU(
+            max_entries=config.get('CACHE_LOCAL_MAX_ENTRIES', 1024),
+            ttl=config.get('CACHE_LOCAL_TIMEOUT', 30)
+        )
+        from extensions import invalidation_bus, configure_local_tags
+        configure_local_tags(cache.local.max_entries * 4, cache.local.ttl)
+        cache.bus = invalidation_bus
+        cache.bus.subscribe(cache._on_invalidation)
+        return cache
+
+    def _on_invalidation(self, message):
+        if message.get('clear'):
+            self.local.clear()
+        elif message.get('keys'):
+            self.local.delete(*message['keys'])
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def tier_stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        for tier in ('local', 'redis'):
+            total = stats[f'{tier}_hits'] + stats[f'{tier}_misses']
+            stats[f'{tier}_hit_rate'] = round(stats[f'{tier}_hits'] / total * 100, 2) if total else 0
+        stats['local_entries'] = len(self.local)
+        return stats
+
+    def _ready(self):
+        if self.bus is not None:
+            self.bus.ensure_listener()
+
+    def get(self, key):
+        self._ready()
+        value = self.local.get(key)
+        if value is not _MISSING:
+            self._count('local_hits')
+            record_cache_lookup(key, True)
+            return pickle.loads(value)
+        self._count('local_misses')
+        value = super().get(key)
+        record_cache_lookup(key, value is not None)
+        if value is None:
+            self._count('redis_misses')
+            return None
+        self._count('redis_hits')
+        self.local.set(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        return value
+
+    def get_many(self, *keys):
+        self._ready()
+        values = [self.local.get(key) for key in keys]
+        missing = [key for key, value in zip(keys, values) if value is _MISSING]
+        with self._stats_lock:
+            self._stats['local_hits'] += len(keys) - len(missing)
+            self._stats['local_misses'] += len(missing)
+        fetched = dict(zip(missing, super().get_many(*missing))) if missing else {}
+        results = []
+        for key, value in zip(keys, values):
+            if value is not _MISSING:
+                record_cache_lookup(key, True)
+                results.append(pickle.loads(value))
+                continue
+            value = fetched[key]
+            record_cache_lookup(key, value is not None)
+            self._count('redis_hits' if value is not None else 'redis_misses')
+            if value is not None:
+                self.local.set(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+            results.append(value)
+        return results
+
+    def has(self, key):
+        return self.local.get(key) is not _MISSING or super().has(key)
+
+    def set(self, key, value, timeout=None):
+        self._ready()
+        result = super().set(key, value, timeout=timeout)
+        timeout = self._normalize_timeout(timeout)
+        self.local.set(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ttl=timeout or None)
+        return result
+
+    def set_many(self, mapping, timeout=None):
+        self._ready()
+        result = super().set_many(mapping, timeout=timeout)
+        timeout = self._normalize_timeout(timeout)
+        for key, value in mapping.items():
+            self.local.set(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ttl=timeout or None)
+        return result
+
+    def add(self, key, value, timeout=None):
+        added = super().add(key, value, timeout=timeout)
+        if added:
+            timeout = self._normalize_timeout(timeout)
+            self.local.set(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ttl=timeout or None)
+        return added
+
+    def delete(self, key):
+        result = super().delete(key)
+        self._broadcast(keys=[key])
+        return result
+
+    def delete_many(self, *keys):
+        result = super().delete_many(*keys)
+        self._broadcast(keys=list(keys))
+        return result
+
+    def clear(self):
+        result = super().clear()
+        self._broadcast(clear=True)
+        return result
+
+    def _broadcast(self, keys=(), clear=False):
+        if self.bus is not None:
+            self.bus.publish(keys=keys, clear=clear)
+        elif clear:
+            self.local.clear()
+        else:
+            self.local.delete(*keys)
@@ -0,0 +1,206 @@
+import time
+import uuid
+import functools
+from flask import current_app
+from extensions import cache, redis_client, tagged_cache_key, untagged_cache_key
+
+# Cache policy registry for the API endpoints.
+#
+# Each cached view declares the resource class it serves. The class selects the
+# TTL from config (CACHE_TIMEOUT_*), read at request time so per-app overrides
+# apply. Keys embed the tag generations the payload depends on (see
+# extensions.tagged_cache_key), and every write path bumps those tags, so an
+# entry is never served after the data behind it changed; the TTL only bounds
+# how long unused entries occupy memory.
+#
+# Only successful JSON responses are cached, as raw body bytes: errors (403,
+# 404, validation) are always recomputed and a hit never re-serializes.
+#
+# Expensive views can opt into single-flight rebuilds: on a miss one worker
+# takes a short Redis lease (SET NX PX) and recomputes, while concurrent
+# requests get the previous payload for up to CACHE_STALE_GRACE seconds past
+# its TTL, or wait for the rebuild if there is none. Stale copies live under
+# the key without tag generations, so they also cover misses caused by writes.
+
+RESOURCE_TIMEOUTS = {
+    'users': 'CACHE_TIMEOUT_USER_DATA',
+    'subjects': 'CACHE_TIMEOUT_SUBJECTS',
+    'chapters': 'CACHE_TIMEOUT_CHAPTERS',
+    'quizzes': 'CACHE_TIMEOUT_QUIZZES',
+    'questions': 'CACHE_TIMEOUT_QUESTIONS',
+    'scores': 'CACHE_TIMEOUT_USER_DATA',
+    'user_data': 'CACHE_TIMEOUT_USER_DATA',
+    'charts': 'CACHE_TIMEOUT_CHARTS',
+    'search': 'CACHE_TIMEOUT_SEARCH',
+}
+
+# view name -> {'resource': ..., 'timeout_setting': ..., 'single_flight': ...}, filled by cached_endpoint
+CACHE_POLICIES = {}
+
+LOCK_KEY_PREFIX = "quiz_master:lock:"
+SINGLE_FLIGHT_STATS_KEY = "quiz_master:single_flight:stats"
+
+# Delete the lock only if this worker still owns it (the lease may have passed on)
+_release_lock = redis_client.register_script(
+    "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+)
+
+def resource_timeout(resource):
+    config = current_app.config
+    return config.get(RESOURCE_TIMEOUTS[resource], config.get('CACHE_DEFAULT_TIMEOUT', 300))
+
+def cache_policies():
+    """Registered policies with the TTL currently in effect"""
+    return {
+        name: dict(policy, timeout=resource_timeout(policy['resource']))
+        for name, policy in sorted(CACHE_POLICIES.items())
+    }
+
+# Keys shared by the views and the cache warmer
+
+def catalogue_list_key(resource, **args):
+    return tagged_cache_key(f"{resource}_list", [resource], **args)
+
+def user_analytics_key(user_id):
+    return tagged_cache_key(f"user_analytics_{user_id}", [f"user:{user_id}:scores", "subjects", "chapters", "quizzes"])
+
+def admin_charts_key(role, **filters):
+    # Chapters are in the tags because subject filters go through them
+    return tagged_cache_key(f"admin_charts_{role}", ["scores", "quizzes", "chapters"], **filters)
+
+def admin_timeseries_key(role, **args):
+    return tagged_cache_key(f"admin_timeseries_{role}", ["scores"], **args)
+
+def admin_analytics_key(role):
+    return tagged_cache_key(f"admin_analytics_{role}", ["scores", "users", "quizzes", "subjects", "chapters"])
+
+def _cached_response(body, status='HIT'):
+    response = current_app.response_class(body, status=200, mimetype='application/json')
+    response.headers['X-Cache'] = status
+    return response
+
+def _stale_key(cache_key):
+    return f"stale:{untagged_cache_key(cache_key)}"
+
+def store_payload(cache_key, body, resource, keep_stale=False):
+    timeout = resource_timeout(resource)
+    cache.set(cache_key, body, timeout=timeout)
+    if keep_stale:
+        grace = current_app.config.get('CACHE_STALE_GRACE', 60)
+        cache.set(_stale_key(cache_key), body, timeout=timeout + grace)
+
+def _build(view, args, kwargs, cache_key, resource, keep_stale=False):
+    response = current_app.make_response(view(*args, **kwargs))
+    if response.status_code == 200 and response.mimetype == 'application/json' \
+            and not response.is_streamed:
+        try:
+            store_payload(cache_key, response.get_data(), resource, keep_stale)
+        except Exception as e:
+            print(f"Cache write error: {e}")
+        response.headers['X-Cache'] = 'MISS'
+    return response
+
+def _record_single_flight(name, **counters):
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for counter, amount in counters.items():
+            pipe.hincrbyfloat(SINGLE_FLIGHT_STATS_KEY, f"{name}:{counter}", amount)
+        pipe.execute()
+    except Exception as e:
+        print(f"Single-flight stats error: {e}")
+
+def single_flight_stats():
+    """Stale serves, lock waits and rebuild times per view, across all workers"""
+    try:
+        raw = redis_client.hgetall(SINGLE_FLIGHT_STATS_KEY)
+    except Exception as e:
+        print(f"Single-flight stats error: {e}")
+        return {}
+    stats = {}
+    for field, value in raw.items():
+        name, _, counter = field.rpartition(':')
+        value = float(value)
+        stats.setdefault(name, {})[counter] = int(value) if value.is_integer() else round(value, 3)
+    for counters in stats.values():
+        rebuilds = counters.get('rebuilds', 0)
+        counters['avg_rebuild_ms'] = round(counters.get('rebuild_ms', 0) / rebuilds, 2) if rebuilds else 0
+    return stats
+
+def _acquire_rebuild_lock(cache_key):
+    """Lock token if this worker should rebuild, None if another worker already is"""
+    token = uuid.uuid4().hex
+    lease_ms = int(current_app.config.get('CACHE_REBUILD_LEASE', 15) * 1000)
+    try:
+        if redis_client.set(LOCK_KEY_PREFIX + cache_key, token, nx=True, px=lease_ms):
+            return token
+        return None
+    except Exception as e:
+        # Without Redis there is nothing to coordinate on; just rebuild
+        print(f"Rebuild lock error: {e}")
+        return token
+
+def _release_rebuild_lock(cache_key, token):
+    try:
+        _release_lock(keys=[LOCK_KEY_PREFIX + cache_key], args=[token])
+    except Exception as e:
+        print(f"Rebuild lock release error: {e}")
+
+def _wait_for_rebuild(cache_key):
+    deadline = time.monotonic() + current_app.config.get('CACHE_REBUILD_LEASE', 15)
+    delay = 0.01
+    while time.monotonic() < deadline:
+        time.sleep(delay)
+        body = cache.get(cache_key)
+        if body is not None:
+            return body
+        delay = min(delay * 2, 0.2)
+    return None
+
+def _single_flight(view, args, kwargs, cache_key, resource):
+    name = view.__name__
+    token = _acquire_rebuild_lock(cache_key)
+    if token is None:
+        stale = cache.get(_stale_key(cache_key))
+        if stale is not None:
+            _record_single_flight(name, stale_served=1)
+            return _cached_response(stale, 'STALE')
+        _record_single_flight(name, lock_waits=1)
+        body = _wait_for_rebuild(cache_key)
+        if body is not None:
+            return _cached_response(body)
+        # The rebuilding worker died or overran its lease: rebuild here as well
+        token = _acquire_rebuild_lock(cache_key)
+    started = time.perf_counter()
+    try:
+        return _build(view, args, kwargs, cache_key, resource, keep_stale=True)
+    finally:
+        _record_single_flight(name, rebuilds=1, rebuild_ms=round((time.perf_counter() - started) * 1000, 3))
+        if token is not None:
+            _release_rebuild_lock(cache_key, token)
+
+def cached_endpoint(resource, key, unless=None, single_flight=False):
+    """Cache a JSON view's 200 responses under ``key()`` for the resource's TTL"""
+    if resource not in RESOURCE_TIMEOUTS:
+        raise ValueError(f"Unknown cache resource: {resource}")
+
+    def decorator(view):
+        CACHE_POLICIES[view.__name__] = {'resource': resource, 'timeout_setting': RESOURCE_TIMEOUTS[resource],
+                                         'single_flight': single_flight}
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if unless is not None and unless():
+                return view(*args, **kwargs)
+            try:
+                cache_key = key()
+                body = cache.get(cache_key)
+            except Exception as e:
+                print(f"Cache read error: {e}")
+                return view(*args, **kwargs)
+            if body is not None:
+                return _cached_response(body)
+            if single_flight:
+                return _single_flight(view, args, kwargs, cache_key, resource)
+            return _build(view, args, kwargs, cache_key, resource)
+        return wrapper
+    return decorator
@@ -0,0 +1,78 @@
+import time
+from flask import current_app, jsonify
+from extensions import db, redis_client
+from models import UserScoreSummary
+from analytics import compute_user_analytics, compute_admin_charts, compute_admin_analytics
+from listing import parse_list_args, fetch_page
+from cache_policy import CACHE_POLICIES, store_payload, catalogue_list_key, user_analytics_key, admin_charts_key, admin_analytics_key
+
+# Precomputes the payloads a fresh deploy is stampeded for and stores them under
+# the exact keys the API views read (see cache_policy). Each key is built before
+# its payload: if a write bumps a tag in between, the entry lands under the old
+# generation and is simply never read, so warming can never serve stale data.
+
+BOOT_LOCK_KEY = "quiz_master:warm:boot"
+
+def _catalogue_page(resource, args):
+    return lambda: fetch_page(resource, **parse_list_args(resource, args))
+
+def warm_targets(top_users):
+    """(name, cached view, key, payload builder) for every payload to precompute"""
+    max_page = str(current_app.config.get('API_MAX_PAGE_SIZE', 1000))
+    targets = []
+    for resource in ('subjects', 'chapters', 'quizzes'):
+        # Default page and the full page the frontend asks for (pagination.js)
+        for args in ({}, {'limit': max_page}):
+            targets.append((f"{resource}_list", f"get_{resource}",
+                            lambda resource=resource, args=args: catalogue_list_key(resource, **args),
+                            _catalogue_page(resource, args)))
+    targets.append(("admin_charts", 'admin_charts', lambda: admin_charts_key('admin'),
+                    lambda: {'chart_data': compute_admin_charts()}))
+    targets.append(("admin_analytics", 'admin_analytics', lambda: admin_analytics_key('admin'), compute_admin_analytics))
+
+    active_users = db.session.query(UserScoreSummary.user_id) \
+        .order_by(UserScoreSummary.last_attempt.desc()).limit(top_users).all()
+    for (user_id,) in active_users:
+        targets.append((f"user_analytics_{user_id}", 'user_analytics',
+                        lambda user_id=user_id: user_analytics_key(user_id),
+                        lambda user_id=user_id: compute_user_analytics(user_id)))
+    return targets
+
+def warm_cache(top_users=None, progress=None):
+    """Precompute catalogue, dashboard and top users' analytics payloads.
+
+    ``progress(done, total, name)`` is called after each payload.
+    """
+    if top_users is None:
+        top_users = current_app.config.get('CACHE_WARM_TOP_USERS', 50)
+    started = time.perf_counter()
+    targets = warm_targets(top_users)
+    warmed = failed = 0
+    for done, (name, view, key, build) in enumerate(targets, 1):
+        try:
+            policy = CACHE_POLICIES[view]
+            cache_key = key()
+            store_payload(cache_key, jsonify(build()).get_data(), policy['resource'], policy['single_flight'])
+            warmed += 1
+        except Exception as e:
+            failed += 1
+            print(f"Cache warming failed for {name}: {e}")
+        if progress:
+            progress(done, len(targets), name)
+    seconds = round(time.perf_counter() - started, 3)
+    print(f"Cache warmed: {warmed} payloads ({failed} failed) in {seconds}s")
+    return {'warmed': warmed, 'failed': failed, 'seconds': seconds}
+
+def schedule_boot_warm():
+    """Enqueue one warming run per deploy, however many processes boot at once"""
+    if not current_app.config.get('CACHE_WARM_ON_BOOT', True):
+        return None
+    try:
+        # Every web process bootstraps the app; only the first one in the window enqueues
+        if not redis_client.set(BOOT_LOCK_KEY, 1, nx=True, ex=current_app.config.get('CACHE_WARM_BOOT_WINDOW', 300)):
+            return None
+        from celery_app import warm_cache_task
+        return warm_cache_task.delay()
+    except Exception as e:
+        print(f"Could not schedule cache warming: {e}")
+        return None
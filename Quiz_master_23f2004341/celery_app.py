@@ -1,30 +1,129 @@
-from celery import Celery
+from celery import Celery, chord
+from celery.signals import worker_process_init
+from flask import current_app, has_app_context
 import os
 import csv
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime
+from config import Config
 from extensions import db, send_email
-from models import User, Quiz, Score, Subject, Chapter
-import requests
+from metrics import instrument_celery
+from models import User, Quiz, Score, Subject, Chapter, UserScoreSummary
 
 # Configure Celery to use Redis as the broker and result backend
 celery = Celery('tasks', 
                 broker=os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0'),
                 backend=os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0'))
 
+# Queue topology: each class of work has its own queue and its own worker, so
+# a long monthly report cannot hold up a user's export. Pool, concurrency and
+# time limits are set per queue through the environment, e.g.
+# CELERY_REPORTS_CONCURRENCY=2 or CELERY_INTERACTIVE_POOL=threads.
+#
+# Time limits are only enforced by the prefork pool (a soft limit raises
+# SoftTimeLimitExceeded in the task, a hard limit kills the child process);
+# the threads and solo pools ignore both. Every queue therefore runs on
+# prefork, except on Windows, where prefork is not available and the workers
+# fall back to threads without time limits.
+#
+# queue -> tasks, default pool, concurrency, soft/hard time limit (seconds), priority
+# (Redis: 0 is served first; only matters when one worker consumes several queues)
+DEFAULT_POOL = 'threads' if os.name == 'nt' else 'prefork'
+TASK_QUEUES = {
+    'interactive': {
+        'tasks': ['celery_worker.export_quiz_history_task', 'celery_worker.export_all_users_stats_task',
+                  'celery_worker.test_email_task', 'celery_app.test_task'],
+        'pool': DEFAULT_POOL, 'concurrency': 4, 'soft_time_limit': 120, 'time_limit': 180, 'priority': 0,
+    },
+    'maintenance': {
+        'tasks': ['celery_worker.flush_submissions_task', 'celery_worker.warm_cache_task'],
+        'pool': DEFAULT_POOL, 'concurrency': 2, 'soft_time_limit': 300, 'time_limit': 360, 'priority': 3,
+    },
+    'notifications': {
+        'tasks': ['celery_worker.daily_reminder_task'],
+        'pool': DEFAULT_POOL, 'concurrency': 4, 'soft_time_limit': 1800, 'time_limit': 2100, 'priority': 6,
+    },
+    'reports': {
+        'tasks': ['celery_worker.monthly_report_task', 'celery_worker.send_monthly_report_chunk',
+                  'celery_worker.monthly_report_summary'],
+        'pool': DEFAULT_POOL, 'concurrency': 2,
+        'soft_time_limit': 3600, 'time_limit': 3900, 'priority': 9,
+    },
+}
+
+def queue_setting(queue, name):
+    default = TASK_QUEUES[queue][name]
+    value = os.getenv(f"CELERY_{queue.upper()}_{name.upper()}")
+    if value is None or value == '':
+        return default
+    return value if isinstance(default, str) else int(value)
+
+def worker_argv(queue, loglevel='info'):
+    """celery worker arguments for a worker that consumes one queue with its own pool settings"""
+    return ['worker', f'--queues={queue}', f'--pool={queue_setting(queue, "pool")}',
+            f'--concurrency={queue_setting(queue, "concurrency")}', f'--hostname={queue}@%h', f'--loglevel={loglevel}']
+
 celery.conf.update(
-    worker_concurrency=1,  # Use single worker process
-    worker_pool='solo',    # Use solo pool instead of prefork
     task_always_eager=False,
     task_eager_propagates=True,
     worker_prefetch_multiplier=1,
     task_acks_late=True,
-    worker_disable_rate_limits=True
+    worker_disable_rate_limits=True,
+    task_default_queue='interactive',
+    task_routes={
+        task: {'queue': queue, 'priority': queue_setting(queue, 'priority')}
+        for queue, settings in TASK_QUEUES.items() for task in settings['tasks']
+    },
+    # Enforced by the prefork pool only; threads and solo workers ignore them (see TASK_QUEUES)
+    task_annotations={
+        task: {'soft_time_limit': queue_setting(queue, 'soft_time_limit'), 'time_limit': queue_setting(queue, 'time_limit')}
+        for queue, settings in TASK_QUEUES.items() for task in settings['tasks']
+    },
+    broker_transport_options={
+        'queue_order_strategy': 'priority',
+        'priority_steps': list(range(10)),
+        # With acks_late an unacknowledged task is redelivered after this long; keep it above every time limit
+        'visibility_timeout': max(queue_setting(queue, 'time_limit') for queue in TASK_QUEUES) + 600,
+    }
 )
 
+# Per-task runtime histograms for /metrics
+instrument_celery(celery)
+
+# One Flask app per worker process, created when the process starts (or on the
+# first task) and reused by every task; ContextTask pushes an app context around
+# each run. The worker app skips the web bootstrap (create_all, admin check,
+# backfill, cache warming and CONFIG SET), which the web process already does.
+# worker_process_init only fires for prefork children, so on the threads pool
+# the first tasks race to create the app; the lock makes one of them do it.
+_flask_app = None
+_flask_app_pid = None
+_flask_app_lock = threading.Lock()
+
 def get_flask_app():
-    from app import create_app
-    app = create_app()
-    return app
+    global _flask_app, _flask_app_pid
+    # A forked child must not reuse the parent's engine connections
+    if _flask_app is None or _flask_app_pid != os.getpid():
+        with _flask_app_lock:
+            if _flask_app is None or _flask_app_pid != os.getpid():
+                from app import create_app
+                _flask_app = create_app(bootstrap=False)
+                _flask_app_pid = os.getpid()
+    return _flask_app
+
+class ContextTask(celery.Task):
+    def __call__(self, *args, **kwargs):
+        # Eager tasks run inside the caller's app context already
+        if has_app_context():
+            return super().__call__(*args, **kwargs)
+        with get_flask_app().app_context():
+            return super().__call__(*args, **kwargs)
+
+celery.Task = ContextTask
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    get_flask_app()
 
 @celery.task
 def test_task(x, y):
@@ -32,308 +131,133 @@ def test_task(x, y):
     return x + y
 
 @celery.task(name='celery_worker.export_quiz_history_task')
-def export_quiz_history_task(user_id):
-    app = get_flask_app()
-    with app.app_context():
-        user = User.query.get(user_id)
-        scores = Score.query.filter_by(user_id=user_id).all()
-        filename = f"quiz_history_{user_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}.csv"
-        export_dir = os.path.join(os.getcwd(), 'exports')
-        os.makedirs(export_dir, exist_ok=True)
-        filepath = os.path.join(export_dir, filename)
-        with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(['Quiz ID', 'Chapter ID', 'Chapter Name', 'Subject Name', 'Date of Quiz', 'Quiz Duration', 'Quiz Remarks', 'Score', 'Attempt Date', 'User Name'])
-            for score in scores:
-                quiz = Quiz.query.get(score.quiz_id)
-                chapter = Chapter.query.get(quiz.chapter_id) if quiz else None
-                subject = Subject.query.get(chapter.subject_id) if chapter else None
-                writer.writerow([
-                    score.quiz_id,
-                    quiz.chapter_id if quiz else 'N/A',
-                    chapter.name if chapter else 'N/A',
-                    subject.name if subject else 'N/A',
-                    quiz.date_of_quiz.strftime('%Y-%m-%d') if quiz else 'N/A',
-                    quiz.duration if quiz else 'N/A',
-                    quiz.remarks if quiz else 'N/A',
-                    score.total_score,
-                    score.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                    user.full_name
-                ])
-        send_email(
-            to=user.email,
-            subject="Quiz Master: Quiz History Export Complete",
-            body=f"Hi {user.full_name},\n\nYour quiz history export has been completed successfully!\n\nExport Details:\n- File: {filename}\n- Records: {len(scores)} quiz attempts\n- Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\nYou can download the file from your dashboard.\n\nBest regards,\nQuiz Master Team"
-        )
-        print(f"Quiz history export completed for user {user_id}: {filename}")
-        return filepath
+def export_quiz_history_task(user_id, compression=None):
+    from exports import export_quiz_history_file
+    user = User.query.get(user_id)
+    filepath, rows = export_quiz_history_file(user_id, compression)
+    filename = os.path.basename(filepath)
+    send_email(
+        to=user.email,
+        subject="Quiz Master: Quiz History Export Complete",
+        body=f"Hi {user.full_name},\n\nYour quiz history export has been completed successfully!\n\nExport Details:\n- File: {filename}\n- Records: {rows} quiz attempts\n- Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\nYou can download the file from your dashboard.\n\nBest regards,\nQuiz Master Team"
+    )
+    print(f"Quiz history export completed for user {user_id}: {filename}")
+    return filepath
 
 @celery.task(name='celery_worker.export_all_users_stats_task')
 def export_all_users_stats_task():
-    app = get_flask_app()
-    with app.app_context():
-        users = User.query.filter(User.role == 'user').all()
-        filename = f"all_users_stats_{datetime.now().strftime('%Y%m%d%H%M%S')}.csv"
-        export_dir = os.path.join(os.getcwd(), 'exports')
-        os.makedirs(export_dir, exist_ok=True)
-        filepath = os.path.join(export_dir, filename)
-        with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(['User ID', 'Email', 'Quizzes Taken', 'Average Score'])
-            for user in users:
-                scores = Score.query.filter_by(user_id=user.id).all()
-                quizzes_taken = len(scores)
-                avg_score = sum(s.total_score for s in scores) / quizzes_taken if quizzes_taken else 0
-                writer.writerow([user.id, user.email, quizzes_taken, round(avg_score, 2)])
-        return filepath
-
-def get_inactive_users(since_days=1):
-    app = get_flask_app()
-    with app.app_context():
-        cutoff = datetime.now() - timedelta(days=since_days)
-        users = User.query.filter(User.role == 'user').all()
-        inactive = []
-        for user in users:
-            last_score = Score.query.filter_by(user_id=user.id).order_by(Score.timestamp.desc()).first()
-            if not last_score or last_score.timestamp < cutoff:
-                inactive.append(user)
-        return inactive
-
-def get_new_quiz_users():
-    app = get_flask_app()
-    with app.app_context():
-        yesterday = datetime.now() - timedelta(days=1)
-        recent_quizzes = Quiz.query.filter(Quiz.date_of_quiz >= yesterday.date()).all()
-        if not recent_quizzes:
-            return []
-        users = User.query.filter(User.role == 'user').all()
-        unattempted = []
-        for user in users:
-            for quiz in recent_quizzes:
-                attempted = Score.query.filter_by(user_id=user.id, quiz_id=quiz.id).first()
-                if not attempted:
-                    unattempted.append((user, quiz))
-        return unattempted
-
-def send_google_chat_message(webhook_url, message):
-    try:
-        payload = {"text": message}
-        response = requests.post(webhook_url, json=payload, timeout=10)
-        return response.status_code == 200
-    except Exception as e:
-        print(f"Google Chat error: {e}")
-        return False
-
-def send_sms_message(phone_number, message):
-    try:
-        print(f"SMS would be sent to {phone_number}: {message}")
-        return True
-    except Exception as e:
-        print(f"SMS error: {e}")
-        return False
+    rows = db.session.query(User.id, User.email, UserScoreSummary.attempts, UserScoreSummary.total_score) \
+        .outerjoin(UserScoreSummary, UserScoreSummary.user_id == User.id) \
+        .filter(User.role == 'user').order_by(User.id).all()
+    filename = f"all_users_stats_{datetime.now().strftime('%Y%m%d%H%M%S')}.csv"
+    export_dir = os.path.join(os.getcwd(), 'exports')
+    os.makedirs(export_dir, exist_ok=True)
+    filepath = os.path.join(export_dir, filename)
+    with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['User ID', 'Email', 'Quizzes Taken', 'Average Score'])
+        for user_id, email, attempts, total_score in rows:
+            quizzes_taken = attempts or 0
+            avg_score = total_score / quizzes_taken if quizzes_taken else 0
+            writer.writerow([user_id, email, quizzes_taken, round(avg_score, 2)])
+    return filepath
 
 @celery.task(name='celery_worker.daily_reminder_task')
 def daily_reminder_task():
-    app = get_flask_app()
-    with app.app_context():
-        reminder_time = os.getenv('DAILY_REMINDER_TIME', '18:00')
-        use_email = os.getenv('REMINDER_USE_EMAIL', 'true').lower() == 'true'
-        use_google_chat = os.getenv('REMINDER_USE_GOOGLE_CHAT', 'false').lower() == 'true'
-        use_sms = os.getenv('REMINDER_USE_SMS', 'false').lower() == 'true'
-        google_chat_webhook = os.getenv('GOOGLE_CHAT_WEBHOOK_URL', '')
-        inactive_users = get_inactive_users()
-        new_quiz_users = get_new_quiz_users()
-        notified = set()
-        total_notifications = 0
-        for user in inactive_users:
-            if user.email in notified:
-                continue
-            message = f"Hi {user.full_name},\n\nYou haven't visited Quiz Master in the last day. Don't forget to attempt the latest quizzes!\n\nBest,\nQuiz Master Team"
-            if use_email:
-                send_email(
-                    to=user.email,
-                    subject="Quiz Master: Daily Reminder",
-                    body=message
-                )
-                total_notifications += 1
-            if use_google_chat and google_chat_webhook:
-                send_google_chat_message(google_chat_webhook, message)
-                total_notifications += 1
-            if use_sms:
-                pass
-            notified.add(user.email)
-        for user, quiz in new_quiz_users:
-            if user.email in notified:
-                continue
-            message = f"Hi {user.full_name},\n\nA new quiz has been created: Quiz {quiz.id} (Date: {quiz.date_of_quiz}). Don't miss out - attempt it now!\n\nBest,\nQuiz Master Team"
-            if use_email:
-                send_email(
-                    to=user.email,
-                    subject="Quiz Master: New Quiz Available",
-                    body=message
-                )
-                total_notifications += 1
-            if use_google_chat and google_chat_webhook:
-                send_google_chat_message(google_chat_webhook, message)
-                total_notifications += 1
-            if use_sms:
-                pass
-            notified.add(user.email)
-        print(f"Daily reminders sent to {len(notified)} users via {total_notifications} notifications.")
-        return f"Reminders sent: {len(notified)} users, {total_notifications} notifications"
+    reminder_time = os.getenv('DAILY_REMINDER_TIME', '18:00')
+    use_email = os.getenv('REMINDER_USE_EMAIL', 'true').lower() == 'true'
+    use_google_chat = os.getenv('REMINDER_USE_GOOGLE_CHAT', 'false').lower() == 'true'
+    use_sms = os.getenv('REMINDER_USE_SMS', 'false').lower() == 'true'
+    google_chat_webhook = os.getenv('GOOGLE_CHAT_WEBHOOK_URL', '')
+    from reminders import reminder_audience, reminder_message
+    from notifications import dispatch
+    notified = 0
+    # One consolidated message per user, audiences streamed in batches and fed
+    # to the dispatcher as they are read; each channel sends concurrently with
+    # its own limits, and webhook messages go out as digests
+    def reminder_notifications():
+        nonlocal notified
+        for batch in reminder_audience(batch_size=current_app.config.get('REMINDER_BATCH_SIZE', 500)):
+            for recipient in batch:
+                subject, message = reminder_message(recipient)
+                if use_email:
+                    yield 'email', recipient['email'], subject, message
+                if use_google_chat and google_chat_webhook:
+                    yield 'google_chat', google_chat_webhook, subject, message
+                if use_sms:
+                    # No phone numbers are stored yet; the SMS stub is addressed by email
+                    yield 'sms', recipient['email'], subject, message
+                notified += 1
+    results = dispatch(reminder_notifications(), current_app.config)
+    total_notifications = sum(channel['sent'] for channel in results.values())
+    for name, channel in results.items():
+        if channel['sent'] or channel['failed'] or channel['skipped']:
+            print(f"Daily reminders via {name}: {channel}")
+    print(f"Daily reminders sent to {notified} users via {total_notifications} notifications.")
+    return {'users': notified, 'notifications': total_notifications, 'channels': results}
 
 @celery.task(name='celery_worker.monthly_report_task')
 def monthly_report_task():
-    app = get_flask_app()
-    with app.app_context():
-        users = User.query.filter(User.role == 'user').all()
-        now = datetime.now()
-        start = datetime(now.year, now.month, 1)
-        all_monthly_scores = Score.query.filter(Score.timestamp >= start).all()
-        for user in users:
-            scores = Score.query.filter(Score.user_id == user.id, Score.timestamp >= start).all()
-            total = len(scores)
-            avg = sum(s.total_score for s in scores) / total if total else 0
-            quiz_rankings = []
-            for score in scores:
-                quiz_scores = [s for s in all_monthly_scores if s.quiz_id == score.quiz_id]
-                quiz_scores.sort(key=lambda x: x.total_score, reverse=True)
-                rank = next((i + 1 for i, s in enumerate(quiz_scores) if s.user_id == user.id), 0)
-                total_participants = len(quiz_scores)
-                quiz = Quiz.query.get(score.quiz_id)
-                subject = Subject.query.get(quiz.subject_id) if quiz else None
-                chapter = Chapter.query.get(quiz.chapter_id) if quiz else None
-                quiz_rankings.append({
-                    'quiz_id': score.quiz_id,
-                    'score': score.total_score,
-                    'rank': rank,
-                    'total_participants': total_participants,
-                    'quiz_name': quiz.title if quiz else f"Quiz {score.quiz_id}",
-                    'subject': subject.name if subject else "Unknown",
-                    'chapter': chapter.name if chapter else "Unknown",
-                    'date': score.timestamp.strftime('%Y-%m-%d %H:%M')
-                })
-            user_total_score = sum(s.total_score for s in scores)
-            all_user_totals = []
-            for u in users:
-                u_scores = Score.query.filter(Score.user_id == u.id, Score.timestamp >= start).all()
-                u_total = sum(s.total_score for s in u_scores)
-                all_user_totals.append((u.id, u_total))
-            all_user_totals.sort(key=lambda x: x[1], reverse=True)
-            overall_rank = next((i + 1 for i, (uid, _) in enumerate(all_user_totals) if uid == user.id), 0)
-            total_users = len(all_user_totals)
-            report_html = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta charset=\"UTF-8\">
-                <title>Quiz Master - Monthly Activity Report</title>
-                <style>
-                    body {{ font-family: Arial, sans-serif; margin: 20px; background-color: #f5f5f5; }}
-                    .container {{ max-width: 800px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-                    .header {{ text-align: center; color: #2c3e50; border-bottom: 3px solid #3498db; padding-bottom: 20px; margin-bottom: 30px; }}
-                    .stats-grid {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 20px; margin-bottom: 30px; }}
-                    .stat-card {{ background: #ecf0f1; padding: 20px; border-radius: 8px; text-align: center; }}
-                    .stat-number {{ font-size: 2em; font-weight: bold; color: #3498db; }}
-                    .stat-label {{ color: #7f8c8d; margin-top: 5px; }}
-                    .quiz-table {{ width: 100%; border-collapse: collapse; margin-top: 20px; }}
-                    .quiz-table th, .quiz-table td {{ padding: 12px; text-align: left; border-bottom: 1px solid #ddd; }}
-                    .quiz-table th {{ background-color: #3498db; color: white; }}
-                    .quiz-table tr:nth-child(even) {{ background-color: #f9f9f9; }}
-                    .rank-badge {{ background: #e74c3c; color: white; padding: 4px 8px; border-radius: 12px; font-size: 0.8em; }}
-                    .footer {{ margin-top: 30px; text-align: center; color: #7f8c8d; font-size: 0.9em; }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <div class="header">
-                        <h1>📊 Monthly Activity Report</h1>
-                        <p>Report Period: {start.strftime('%B %Y')}</p>
-                    </div>
-                    <div class="stats-grid">
-                        <div class="stat-card">
-                            <div class="stat-number">{total}</div>
-                            <div class="stat-label">Quizzes Taken</div>
-                        </div>
-                        <div class="stat-card">
-                            <div class="stat-number">{avg:.1f}</div>
-                            <div class="stat-label">Average Score</div>
-                        </div>
-                        <div class="stat-card">
-                            <div class="stat-number">{overall_rank}/{total_users}</div>
-                            <div class="stat-label">Overall Rank</div>
-                        </div>
-                        <div class="stat-card">
-                            <div class="stat-number">{user_total_score}</div>
-                            <div class="stat-label">Total Points</div>
-                        </div>
-                    </div>
-                    <h2>📝 Quiz Performance Details</h2>
-                    <table class="quiz-table">
-                        <thead>
-                            <tr>
-                                <th>Quiz</th>
-                                <th>Subject</th>
-                                <th>Chapter</th>
-                                <th>Score</th>
-                                <th>Rank</th>
-                                <th>Date</th>
-                            </tr>
-                        </thead>
-                        <tbody>
-            """
-            for quiz_data in quiz_rankings:
-                rank_class = "rank-badge" if quiz_data['rank'] <= 3 else ""
-                rank_text = f"#{quiz_data['rank']}" if quiz_data['rank'] > 0 else "N/A"
-                report_html += f"""
-                            <tr>
-                                <td><strong>{quiz_data['quiz_name']}</strong></td>
-                                <td>{quiz_data['subject']}</td>
-                                <td>{quiz_data['chapter']}</td>
-                                <td><strong>{quiz_data['score']}</strong></td>
-                                <td><span class=\"{rank_class}\">{rank_text}</span></td>
-                                <td>{quiz_data['date']}</td>
-                            </tr>
-                """
-            report_html += f"""
-                        </tbody>
-                    </table>
-                    <div class="footer">
-                        <p>Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-                        <p>Keep up the great work! 🚀</p>
-                    </div>
-                </div>
-            </body>
-            </html>
-            """
-            send_email(
-                to=user.email,
-                subject=f"Quiz Master: Monthly Activity Report - {start.strftime('%B %Y')}",
-                body=f"Hi {user.full_name},\n\nYour monthly activity report for {start.strftime('%B %Y')} is attached.\n\nBest regards,\nQuiz Master Team",
-                html=report_html
-            )
-        print(f"Monthly reports sent to {len(users)} users.")
-        return f"Monthly reports sent to {len(users)} users"
+    from monthly_reports import report_period, collect_monthly_reports, chunked
+    start, end = report_period()
+    # Fan out: rankings for everyone in one pass, then one subtask per chunk of users
+    reports, total_users = collect_monthly_reports(start, end)
+    if not reports:
+        return "Monthly reports sent to 0 users"
+    period_label = start.strftime('%B %Y')
+    chunk_size = current_app.config.get('MONTHLY_REPORT_CHUNK_SIZE', 200)
+    header = [send_monthly_report_chunk.s(chunk, period_label, total_users) for chunk in chunked(reports, chunk_size)]
+    result = chord(header)(monthly_report_summary.s(period_label))
+    print(f"Monthly reports for {len(reports)} users dispatched in {len(header)} chunks.")
+    return f"Monthly reports for {len(reports)} users dispatched in {len(header)} chunks (summary task {result.id})"
+
+@celery.task(name='celery_worker.send_monthly_report_chunk')
+def send_monthly_report_chunk(reports, period_label, total_users):
+    from monthly_reports import report_email
+    from mailer import send_many
+    stats = send_many(report_email(report, period_label, total_users) for report in reports)
+    return {'users': len(reports), 'sent': stats['sent']}
+
+@celery.task(name='celery_worker.monthly_report_summary')
+def monthly_report_summary(results, period_label):
+    # Fan in: add up what every chunk sent
+    users = sum(result['users'] for result in results)
+    sent = sum(result['sent'] for result in results)
+    print(f"Monthly reports for {period_label}: {sent}/{users} sent.")
+    return f"Monthly reports sent to {sent} of {users} users"
+
+@celery.task(bind=True, name='celery_worker.warm_cache_task')
+def warm_cache_task(self, top_users=None):
+    from cache_warmer import warm_cache
+    def progress(done, total, name):
+        self.update_state(state='PROGRESS', meta={'done': done, 'total': total, 'current': name})
+    return warm_cache(top_users, progress=progress)
+
+@celery.task(name='celery_worker.flush_submissions_task')
+def flush_submissions_task():
+    from submissions import flush_submissions, write_behind_enabled
+    if not write_behind_enabled():
+        # Attempts are saved synchronously; leftovers drain with flask flush-submissions
+        return 0
+    return flush_submissions()
 
 @celery.task(name='celery_worker.test_email_task')
 def test_email_task():
-    app = get_flask_app()
-    with app.app_context():
-        try:
-            result = send_email(
-                to=app.config['MAIL_DEFAULT_SENDER'],
-                subject="Quiz Master: Email Test",
-                body="This is a test email from Quiz Master backend jobs system."
-            )
-            if result:
-                print("Test email sent successfully!")
-                return "Email sent successfully"
-            else:
-                print("Failed to send test email")
-                return "Email failed"
-        except Exception as e:
-            print(f"Email test error: {e}")
-            return f"Email error: {e}"
+    try:
+        result = send_email(
+            to=current_app.config['MAIL_DEFAULT_SENDER'],
+            subject="Quiz Master: Email Test",
+            body="This is a test email from Quiz Master backend jobs system."
+        )
+        if result:
+            print("Test email sent successfully!")
+            return "Email sent successfully"
+        else:
+            print("Failed to send test email")
+            return "Email failed"
+    except Exception as e:
+        print(f"Email test error: {e}")
+        return f"Email error: {e}"
 
 celery.conf.beat_schedule = {
     'send-daily-reminders': {
@@ -344,4 +268,15 @@ celery.conf.beat_schedule = {
         'task': 'celery_worker.monthly_report_task',
         'schedule': 120,  # every 30 days must change once demonstrated
     },
-} 
\ No newline at end of file
+    'warm-cache': {
+        'task': 'celery_worker.warm_cache_task',
+        'schedule': Config.CACHE_WARM_INTERVAL,
+    },
+}
+
+# Only needed while attempts go through the submission queue
+if Config.SUBMISSIONS_WRITE_BEHIND:
+    celery.conf.beat_schedule['flush-submissions'] = {
+        'task': 'celery_worker.flush_submissions_task',
+        'schedule': Config.SUBMISSIONS_FLUSH_INTERVAL,
+    }
\ No newline at end of file
@@ -1,4 +1,12 @@
-from celery_app import celery
+import sys
+from celery_app import celery, TASK_QUEUES, worker_argv, queue_setting
 
 if __name__ == '__main__':
-    celery.start()
+    # python celery_worker.py <queue>  starts a worker for one queue with its configured pool
+    if len(sys.argv) == 2 and sys.argv[1] in TASK_QUEUES:
+        queue = sys.argv[1]
+        if queue_setting(queue, 'pool') != 'prefork':
+            print(f"Warning: the {queue_setting(queue, 'pool')} pool does not enforce the {queue} queue's time limits")
+        celery.worker_main(worker_argv(queue))
+    else:
+        celery.start()
@@ -6,11 +6,13 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
     # Enhanced Caching Configuration
-    CACHE_TYPE = "RedisCache"
+    CACHE_TYPE = "cache_backends.TwoTierRedisCache"  # in-process LRU in front of Redis
     CACHE_REDIS_HOST = "localhost"
     CACHE_REDIS_PORT = 6379
     CACHE_REDIS_DB = 1
     CACHE_DEFAULT_TIMEOUT = 300  # 5 minutes default
+    CACHE_LOCAL_MAX_ENTRIES = 1024    # per-process LRU size
+    CACHE_LOCAL_TIMEOUT = 30          # max seconds a local copy may outlive a missed invalidation
     
     # Cache-specific timeouts
     CACHE_TIMEOUT_SUBJECTS = 600      # 10 minutes - rarely changes
@@ -21,9 +23,46 @@ class Config:
     CACHE_TIMEOUT_USER_DATA = 60      # 1 minute - user-specific data
     CACHE_TIMEOUT_SEARCH = 30         # 30 seconds - search results
     
+    # Stampede protection for the expensive dashboards (cache_policy.py)
+    CACHE_STALE_GRACE = 60            # seconds a superseded payload may still be served while one worker rebuilds
+    CACHE_REBUILD_LEASE = 15          # seconds the rebuild lock is held before another worker may take over
+    
+    # Cache warming (cache_warmer.py)
+    CACHE_WARM_ON_BOOT = True         # enqueue a warming run when the app starts
+    CACHE_WARM_BOOT_WINDOW = 300      # at most one boot-triggered run per window (seconds)
+    CACHE_WARM_INTERVAL = 600         # celery beat re-warms every 10 minutes
+    CACHE_WARM_TOP_USERS = 50         # most recently active users whose analytics are precomputed
+    
     # Cache key prefixes for organization
     CACHE_KEY_PREFIX = "quiz_master"
     
+    # List endpoint pagination (keyset, see listing.py)
+    API_DEFAULT_PAGE_SIZE = 100
+    API_MAX_PAGE_SIZE = 1000
+    API_STREAM_BATCH_SIZE = 1000      # rows fetched and flushed per chunk when streaming
+    EXPORT_BATCH_SIZE = 1000          # quiz history export rows per fetch and per written chunk (exports.py)
+    
+    # Write-behind queue for quiz attempts (submissions.py); needs celery beat running
+    SUBMISSIONS_WRITE_BEHIND = os.getenv('SUBMISSIONS_WRITE_BEHIND', 'false').lower() == 'true'
+    SUBMISSIONS_FLUSH_INTERVAL = 2    # seconds between flusher runs
+    SUBMISSIONS_FLUSH_BATCH = 500     # scores inserted per transaction
+    SUBMISSIONS_CLAIM_IDLE_MS = 60000 # entries of a flusher idle this long are taken over
+    SUBMISSIONS_FLUSH_LOCK_TIMEOUT = 300  # seconds one flusher may hold the flush lock
+    SUBMISSIONS_MAX_DELIVERIES = 5    # failed reads of one entry before it is dead-lettered
+    
+    # Per-request SQL profiling (profiling.py)
+    PROFILING_ENABLED = True
+    SLOW_QUERY_MS = 100               # statements slower than this are logged with their endpoint
+
+    # Prometheus metrics at /metrics (METRICS_TOKEN, if set, is required as a Bearer token)
+    METRICS_ENABLED = True
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+    # Monthly reports: users per parallel subtask (monthly_reports.py)
+    MONTHLY_REPORT_CHUNK_SIZE = 200
+    # Daily reminders: recipients fetched per batch (reminders.py)
+    REMINDER_BATCH_SIZE = 500
+    
     # Email settings for MailHog (local development)
     MAIL_SERVER = 'localhost'
     MAIL_PORT = 1025
@@ -32,6 +71,22 @@ class Config:
     MAIL_USERNAME = ''
     MAIL_PASSWORD = ''
     MAIL_DEFAULT_SENDER = 'admin@123.com'
+    MAIL_TIMEOUT = 30
+    # Pooled SMTP delivery (mailer.py)
+    MAIL_POOL_SIZE = 4                        # parallel senders and idle connections kept per process
+    MAIL_MAX_MESSAGES_PER_CONNECTION = 100    # reconnect after this many messages
+    MAIL_POOL_IDLE_TIMEOUT = 30               # seconds an idle connection is trusted
+    MAIL_MAX_RETRIES = 3                      # retries of a transient failure (4xx, dropped connection)
+    MAIL_RETRY_BACKOFF = 1.0                  # seconds before the first retry, doubled each time
+    # Notification dispatcher (notifications.py): per channel, parallel sends,
+    # rate limit (sends per second, None for none) with its burst, and the
+    # consecutive failures that open the circuit for reset_timeout seconds
+    NOTIFY_CHANNELS = {
+        'email': {'concurrency': MAIL_POOL_SIZE, 'rate': None, 'failure_threshold': 20, 'reset_timeout': 60},
+        'google_chat': {'concurrency': 2, 'rate': 1.0, 'burst': 5, 'failure_threshold': 3, 'reset_timeout': 120},
+        'sms': {'concurrency': 2, 'rate': 5.0, 'burst': 5, 'failure_threshold': 5, 'reset_timeout': 60},
+    }
+    WEBHOOK_DIGEST_MAX_CHARS = 4000           # Google Chat messages are batched up to this size
     
     # Gmail App Password Instructions:
     # 1. Enable 2-Factor Authentication on your Gmail account
@@ -0,0 +1,127 @@
+import os
+import csv
+import io
+import zlib
+from datetime import datetime
+from flask import current_app
+from extensions import db
+from models import User, Subject, Chapter, Quiz, Score
+
+# Quiz history export pipeline, shared by the Celery task and the direct
+# download endpoint.
+#
+# One statement joins every attempt of the user to its quiz, chapter and
+# subject (outer joins, so attempts of deleted quizzes still export as N/A)
+# and is streamed with yield_per, oldest first (the order of
+# ix_score_user_id_timestamp, so SQLite never sorts the history). Rows are
+# written to a CSV buffer that is flushed every EXPORT_BATCH_SIZE rows,
+# optionally through an incremental gzip or zstd compressor, so memory stays
+# flat however long the history is.
+# The same chunks either go to a file under exports/ (task) or straight into
+# the HTTP response (direct). zstd needs the zstandard package.
+
+QUIZ_HISTORY_HEADER = ['Quiz ID', 'Chapter ID', 'Chapter Name', 'Subject Name', 'Date of Quiz', 'Quiz Duration',
+                       'Quiz Remarks', 'Score', 'Attempt Date', 'User Name']
+
+EXPORT_COMPRESSION = {
+    None: {'suffix': '', 'mimetype': 'text/csv'},
+    'gzip': {'suffix': '.gz', 'mimetype': 'application/gzip'},
+    'zstd': {'suffix': '.zst', 'mimetype': 'application/zstd'},
+}
+
+def parse_compression(value):
+    """None, 'gzip' or 'zstd'; ValueError for anything else or when zstd is unavailable"""
+    if value in (None, '', 'none'):
+        return None
+    if value not in EXPORT_COMPRESSION:
+        raise ValueError(f"Unsupported compression: {value}")
+    if value == 'zstd':
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            raise ValueError("zstd compression needs the zstandard package")
+    return value
+
+def quiz_history_filename(user_id, compression=None):
+    stamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    return f"quiz_history_{user_id}_{stamp}.csv{EXPORT_COMPRESSION[compression]['suffix']}"
+
+def quiz_history_statement(user_id):
+    return db.select(
+        Score.quiz_id, Quiz.id, Quiz.chapter_id, Chapter.name, Subject.name, Quiz.date_of_quiz,
+        Quiz.duration, Quiz.remarks, Score.total_score, Score.timestamp, User.full_name
+    ).join(User, User.id == Score.user_id) \
+        .outerjoin(Quiz, Quiz.id == Score.quiz_id) \
+        .outerjoin(Chapter, Chapter.id == Quiz.chapter_id) \
+        .outerjoin(Subject, Subject.id == Chapter.subject_id) \
+        .where(Score.user_id == user_id) \
+        .order_by(Score.timestamp, Score.id)
+
+def quiz_history_rows(user_id, batch_size):
+    rows = db.session.execute(quiz_history_statement(user_id).execution_options(yield_per=batch_size))
+    for quiz_id, found_quiz, chapter_id, chapter, subject, quiz_date, duration, remarks, score, timestamp, name in rows:
+        quiz = found_quiz is not None
+        yield [
+            quiz_id,
+            chapter_id if quiz else 'N/A',
+            chapter if chapter is not None else 'N/A',
+            subject if subject is not None else 'N/A',
+            quiz_date.strftime('%Y-%m-%d') if quiz else 'N/A',
+            duration if quiz else 'N/A',
+            remarks if quiz else 'N/A',
+            score,
+            timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+            name
+        ]
+
+def _csv_chunks(header, rows, batch_size, counter):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        counter['rows'] += 1
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode('utf-8')
+
+def _compressor(compression):
+    if compression == 'gzip':
+        # wbits 31: gzip header and trailer, so the output is a regular .gz file
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+    import zstandard
+    return zstandard.ZstdCompressor(level=3).compressobj()
+
+def _compressed(chunks, compression):
+    if compression is None:
+        yield from chunks
+        return
+    compressor = _compressor(compression)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def quiz_history_chunks(user_id, compression=None, counter=None):
+    """Byte chunks of the user's quiz history CSV, compressed as asked; counter['rows'] counts rows written"""
+    counter = {'rows': 0} if counter is None else counter
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+    rows = quiz_history_rows(user_id, batch_size)
+    return _compressed(_csv_chunks(QUIZ_HISTORY_HEADER, rows, batch_size, counter), compression)
+
+def export_quiz_history_file(user_id, compression=None, export_dir=None):
+    """Write the export under exports/; returns (filepath, rows)"""
+    export_dir = export_dir or os.path.join(os.getcwd(), 'exports')
+    os.makedirs(export_dir, exist_ok=True)
+    filepath = os.path.join(export_dir, quiz_history_filename(user_id, compression))
+    counter = {'rows': 0}
+    with open(filepath, 'wb') as export_file:
+        for chunk in quiz_history_chunks(user_id, compression, counter):
+            export_file.write(chunk)
+    return filepath, counter['rows']
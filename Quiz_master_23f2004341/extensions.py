@@ -3,9 +3,7 @@ from flask_login import LoginManager
 from flask_bcrypt import Bcrypt
 from flask_caching import Cache
 import redis
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from cache_backends import LocalLRU, InvalidationBus
 from flask import current_app
 
 db = SQLAlchemy()
@@ -21,65 +19,108 @@ redis_client = redis.StrictRedis(
     decode_responses=True
 )
 
+# Pub/sub channel that evicts per-process cache entries in every worker
+invalidation_bus = InvalidationBus(redis_client)
+
 @login_manager.user_loader
 def load_user(user_id):
     from models import User
     return db.session.get(User, int(user_id))
 
 def send_email(to, subject, body, html=None):
-    msg = MIMEMultipart('alternative')
-    msg['Subject'] = subject
-    msg['From'] = current_app.config['MAIL_DEFAULT_SENDER']
-    msg['To'] = to
-    part1 = MIMEText(body, 'plain')
-    msg.attach(part1)
-    if html:
-        part2 = MIMEText(html, 'html')
-        msg.attach(part2)
-    try:
-        with smtplib.SMTP(current_app.config['MAIL_SERVER'], current_app.config['MAIL_PORT']) as server:
-            if current_app.config.get('MAIL_USE_TLS'):
-                server.starttls()
-            server.login(current_app.config['MAIL_USERNAME'], current_app.config['MAIL_PASSWORD'])
-            server.sendmail(msg['From'], [to], msg.as_string())
-        return True
-    except Exception as e:
-        print(f"Failed to send email: {e}")
-        return False
+    # Pooled SMTP connection with retries; bulk senders use mailer.send_many
+    from mailer import build_message, send_message
+    msg = build_message(current_app.config['MAIL_DEFAULT_SENDER'], to, subject, body, html)
+    return send_message(msg)
 
 # Cache utility functions for performance optimization
-def invalidate_cache_pattern(pattern):
+#
+# Invalidation is tag based. Every cached entry lists the entity tags it depends
+# on ("subjects", "quiz:7", "user:5", ...) and its key embeds the current
+# generation counter of each of those tags. A write bumps the counters of the
+# tags it touches with one INCR each, so entries built against the old
+# generation are simply never read again and age out through their TTL.
+# No keyspace scans are needed, whatever the number of cached entries.
+#
+# Generations are also kept in a small per-process map so building a key does
+# not need a Redis round trip; invalidate_tags broadcasts on the invalidation
+# bus and every worker forgets the bumped tags.
+TAG_KEY_PREFIX = "quiz_master:tag:"
+
+local_tag_generations = LocalLRU(max_entries=4096, ttl=30)
+
+def configure_local_tags(max_entries, ttl):
+    local_tag_generations.max_entries = max_entries
+    local_tag_generations.ttl = ttl
+
+def _forget_local_tags(message):
+    if message.get('clear'):
+        local_tag_generations.clear()
+    elif message.get('tags'):
+        local_tag_generations.delete(*message['tags'])
+
+invalidation_bus.subscribe(_forget_local_tags)
+
+def _tag_key(tag):
+    return f"{TAG_KEY_PREFIX}{tag}"
+
+def tag_generations(tags):
+    if not tags:
+        return []
+    invalidation_bus.ensure_listener()
+    generations = [local_tag_generations.get(tag) for tag in tags]
+    missing = [tag for tag, generation in zip(tags, generations) if not isinstance(generation, int)]
+    if not missing:
+        return generations
     try:
-        keys = redis_client.keys(f"quiz_master:{pattern}")
-        if keys:
-            redis_client.delete(*keys)
-            print(f"Invalidated {len(keys)} cache keys matching pattern: {pattern}")
+        fetched = dict(zip(missing, (int(value or 0) for value in redis_client.mget([_tag_key(tag) for tag in missing]))))
+    except Exception as e:
+        print(f"Cache tag lookup error: {e}")
+        return [g if isinstance(g, int) else 0 for g in generations]
+    for tag, generation in fetched.items():
+        local_tag_generations.set(tag, generation)
+    return [g if isinstance(g, int) else fetched[tag] for tag, g in zip(tags, generations)]
+
+def tagged_cache_key(name, tags, **params):
+    generations = ".".join(str(g) for g in tag_generations(tags))
+    return cache_key_with_params(f"{name}@{generations}", **params)
+
+def untagged_cache_key(key):
+    # Same entry as tagged_cache_key built, minus the tag generations
+    name, _, rest = key.partition("@")
+    _, _, params = rest.partition(":")
+    return f"{name}:{params}"
+
+def invalidate_tags(*tags):
+    if not tags:
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for tag in tags:
+            pipe.incr(_tag_key(tag))
+        pipe.execute()
     except Exception as e:
         print(f"Cache invalidation error: {e}")
+    invalidation_bus.publish(tags=tags)
 
-def invalidate_user_cache(user_id):
-    invalidate_cache_pattern(f"user:{user_id}:*")
-
-def invalidate_subject_cache():
-    invalidate_cache_pattern("subjects*")
+def invalidate_user_cache(user_id=None):
+    invalidate_tags("users", *([f"user:{user_id}"] if user_id is not None else []))
 
-def invalidate_chapter_cache():
-    invalidate_cache_pattern("chapters*")
+def invalidate_subject_cache(subject_id=None):
+    invalidate_tags("subjects", *([f"subject:{subject_id}"] if subject_id is not None else []))
 
-def invalidate_quiz_cache():
-    invalidate_cache_pattern("quizzes*")
+def invalidate_chapter_cache(chapter_id=None):
+    invalidate_tags("chapters", *([f"chapter:{chapter_id}"] if chapter_id is not None else []))
 
-def invalidate_question_cache():
-    invalidate_cache_pattern("questions*")
+def invalidate_quiz_cache(quiz_id=None):
+    invalidate_tags("quizzes", *([f"quiz:{quiz_id}"] if quiz_id is not None else []))
 
-def invalidate_charts_cache():
-    invalidate_cache_pattern("charts*")
-    invalidate_cache_pattern("analytics*")
+def invalidate_question_cache(question_id=None):
+    invalidate_tags("questions", *([f"question:{question_id}"] if question_id is not None else []))
 
-def delete_cache_pattern(pattern):
-    keys = redis_client.keys(pattern)
-    if keys:
-        redis_client.delete(*keys)
+def invalidate_score_cache(user_id):
+    # A new attempt changes the user's history/analytics and every score aggregate
+    invalidate_tags("scores", f"user:{user_id}:scores")
 
 def cache_key_with_user(key, user_id):
     return f"user:{user_id}:{key}"
@@ -88,6 +129,11 @@ def cache_key_with_params(key, **params):
     param_str = ":".join([f"{k}={v}" for k, v in sorted(params.items())])
     return f"{key}:{param_str}"
 
+def get_cache_tier_stats():
+    # Hit/miss counters of the in-process and Redis tiers (this worker only)
+    tier_stats = getattr(cache.cache, 'tier_stats', None)
+    return tier_stats() if tier_stats else {}
+
 def get_cache_stats():
     try:
         info = redis_client.info()
@@ -96,15 +142,12 @@ def get_cache_stats():
             'used_memory': info.get('used_memory_human', '0B'),
             'keyspace_hits': info.get('keyspace_hits', 0),
             'keyspace_misses': info.get('keyspace_misses', 0),
-            'total_commands_processed': info.get('total_commands_processed', 0)
+            'total_commands_processed': info.get('total_commands_processed', 0),
+            'tiers': get_cache_tier_stats()
         }
     except Exception as e:
         print(f"Cache stats error: {e}")
-        return {}
-
-def warm_cache():
-    print("Cache warming is a no-op in this configuration.")
-    return True
+        return {'tiers': get_cache_tier_stats()}
 
 def get_cache_hit_rate():
     try:
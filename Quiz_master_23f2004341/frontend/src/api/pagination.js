@@ -0,0 +1,15 @@
+import axios from 'axios';
+
+// List endpoints are keyset-paginated: keep requesting pages until next_cursor is null
+export async function fetchAll(url, key, params = {}) {
+  const items = [];
+  let after = null;
+  do {
+    const pageParams = { ...params, limit: 1000 };
+    if (after !== null) pageParams.after = after;
+    const res = await axios.get(url, { params: pageParams });
+    items.push(...res.data[key]);
+    after = res.data.next_cursor;
+  } while (after !== null && after !== undefined);
+  return items;
+}
@@ -0,0 +1,81 @@
+import operator
+from extensions import db, cache, tagged_cache_key
+from models import Question
+
+# Grading against compact answer keys.
+#
+# An answer key is (question_ids, correct_options): two parallel tuples in
+# question id order, built from two columns instead of full Question rows and
+# cached per quiz. Keys carry the "questions" tag, which every question write
+# (and every cascading quiz/chapter/subject delete) bumps, so a changed
+# question never grades against an old key.
+#
+# A submission is graded by mapping its answers onto the key's order and
+# comparing both sequences element-wise in C (map(operator.eq, ...)), with no
+# per-question Python branching. Answers that are missing or not a valid
+# integer count as wrong.
+
+ANSWER_KEY_TIMEOUT = 3600
+
+def _answer_key_cache_key(quiz_id):
+    return tagged_cache_key(f"answer_key_{quiz_id}", ["questions"])
+
+def _load_answer_keys(quiz_ids):
+    keys = {quiz_id: ((), ()) for quiz_id in quiz_ids}
+    rows = db.session.query(Question.quiz_id, Question.id, Question.correct_option) \
+        .filter(Question.quiz_id.in_(quiz_ids)) \
+        .order_by(Question.quiz_id, Question.id).all()
+    grouped = {}
+    for quiz_id, question_id, correct_option in rows:
+        grouped.setdefault(quiz_id, ([], []))
+        grouped[quiz_id][0].append(question_id)
+        grouped[quiz_id][1].append(correct_option)
+    for quiz_id, (question_ids, correct_options) in grouped.items():
+        keys[quiz_id] = (tuple(question_ids), tuple(correct_options))
+    return keys
+
+def answer_keys(quiz_ids):
+    """{quiz_id: (question_ids, correct_options)} from the cache, one query for the misses"""
+    quiz_ids = list(dict.fromkeys(quiz_ids))
+    if not quiz_ids:
+        return {}
+    try:
+        cache_keys = [_answer_key_cache_key(quiz_id) for quiz_id in quiz_ids]
+        cached = dict(zip(quiz_ids, cache.get_many(*cache_keys)))
+    except Exception as e:
+        print(f"Answer key cache read error: {e}")
+        cache_keys, cached = None, {}
+    keys = {quiz_id: key for quiz_id, key in cached.items() if key is not None}
+    missing = [quiz_id for quiz_id in quiz_ids if quiz_id not in keys]
+    if missing:
+        loaded = _load_answer_keys(missing)
+        keys.update(loaded)
+        if cache_keys is not None:
+            try:
+                positions = {quiz_id: i for i, quiz_id in enumerate(quiz_ids)}
+                cache.set_many({cache_keys[positions[q]]: loaded[q] for q in missing}, timeout=ANSWER_KEY_TIMEOUT)
+            except Exception as e:
+                print(f"Answer key cache write error: {e}")
+    return keys
+
+def answer_key(quiz_id):
+    return answer_keys([quiz_id])[quiz_id]
+
+def _as_option(value):
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def grade(key, answers):
+    """Number of correct answers; ``answers`` maps question id (str) to option"""
+    question_ids, correct_options = key
+    submitted = [_as_option(answers.get(str(question_id))) for question_id in question_ids]
+    return sum(map(operator.eq, submitted, correct_options))
+
+def grade_submissions(submissions):
+    """Grade many (quiz_id, answers) pairs at once; returns (score, question count) per submission"""
+    keys = answer_keys([quiz_id for quiz_id, _ in submissions])
+    return [(grade(keys[quiz_id], answers), len(keys[quiz_id][0])) for quiz_id, answers in submissions]
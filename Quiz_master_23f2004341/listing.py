@@ -0,0 +1,202 @@
+import csv
+import io
+import json
+from flask import request, jsonify, current_app, Response, stream_with_context
+from extensions import db
+from models import User, Subject, Chapter, Quiz, Question, Score
+
+# Keyset (cursor) pagination for the list endpoints.
+#
+#   GET /api/<resource>?limit=100&after=<id>&fields=id,name&<filter>=<value>
+#
+# Rows are returned in id order. ``next_cursor`` is the id to pass as ``after``
+# for the next page and is null on the last page. Only the requested columns
+# are selected from the database; ``id`` is always included.
+#
+# Adding ``format=ndjson|csv`` (or ``stream=1``) switches to a streaming
+# response over the whole listing: rows are fetched in batches with yield_per
+# and written out chunk by chunk, so memory stays flat regardless of table
+# size. ``limit`` is optional in that mode. ``format=json`` (the default) is
+# the paged response; any other format is rejected with 400 on both paths.
+
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+def _format_date(value):
+    return value.strftime('%Y-%m-%d') if value else None
+
+def _format_datetime(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+LISTINGS = {
+    'users': {
+        'model': User,
+        'fields': {'id': User.id, 'email': User.email, 'full_name': User.full_name, 'role': User.role},
+        'filters': {},
+        'base_filters': lambda: [User.role == 'user'],
+    },
+    'subjects': {
+        'model': Subject,
+        'fields': {'id': Subject.id, 'name': Subject.name, 'description': Subject.description},
+        'filters': {},
+    },
+    'chapters': {
+        'model': Chapter,
+        'fields': {'id': Chapter.id, 'name': Chapter.name, 'description': Chapter.description,
+                   'subject_id': Chapter.subject_id},
+        'filters': {'subject_id': Chapter.subject_id},
+    },
+    'quizzes': {
+        'model': Quiz,
+        'fields': {'id': Quiz.id, 'chapter_id': Quiz.chapter_id, 'date_of_quiz': Quiz.date_of_quiz,
+                   'duration': Quiz.duration, 'remarks': Quiz.remarks},
+        'formatters': {'date_of_quiz': _format_date},
+        'filters': {'chapter_id': Quiz.chapter_id},
+    },
+    'questions': {
+        'model': Question,
+        'fields': {'id': Question.id, 'quiz_id': Question.quiz_id,
+                   'question_statement': Question.question_statement,
+                   'option1': Question.option1, 'option2': Question.option2,
+                   'option3': Question.option3, 'option4': Question.option4,
+                   'correct_option': Question.correct_option},
+        'filters': {'quiz_id': Question.quiz_id},
+    },
+    'scores': {
+        'model': Score,
+        'fields': {'id': Score.id, 'user_id': Score.user_id, 'quiz_id': Score.quiz_id,
+                   'total_score': Score.total_score, 'timestamp': Score.timestamp},
+        'formatters': {'timestamp': _format_datetime},
+        'filters': {'quiz_id': Score.quiz_id, 'user_id': Score.user_id},
+    },
+}
+
+def _parse_int(args, name, minimum=None):
+    value = args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an integer")
+    if minimum is not None and value < minimum:
+        raise ValueError(f"'{name}' must be at least {minimum}")
+    return value
+
+def is_stream_request():
+    return request.args.get('stream') in ('1', 'true') or request.args.get('format') in STREAM_FORMATS
+
+def parse_list_args(resource, args, streaming=False):
+    """Validate format/limit/after/fields/filter query parameters for a listing"""
+    listing = LISTINGS[resource]
+    default_limit = current_app.config.get('API_DEFAULT_PAGE_SIZE', 100)
+    max_limit = current_app.config.get('API_MAX_PAGE_SIZE', 1000)
+    fmt = args.get('format')
+    if fmt and fmt != 'json' and fmt not in STREAM_FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    limit = _parse_int(args, 'limit', minimum=1)
+    after = _parse_int(args, 'after', minimum=0)
+
+    fields = list(listing['fields'])
+    if args.get('fields'):
+        requested = [f.strip() for f in args['fields'].split(',') if f.strip()]
+        unknown = [f for f in requested if f not in listing['fields']]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        fields = ['id'] + [f for f in requested if f != 'id']
+
+    filters = {}
+    for name in listing['filters']:
+        value = _parse_int(args, name)
+        if value is not None:
+            filters[name] = value
+
+    if not streaming:
+        limit = min(limit or default_limit, max_limit)
+    return {'limit': limit, 'after': after, 'fields': fields, 'filters': filters}
+
+def list_query(resource, fields, filters, after=None):
+    """Column-only query for a listing, ordered by id, starting after the cursor"""
+    listing = LISTINGS[resource]
+    model = listing['model']
+    query = db.session.query(*[listing['fields'][f] for f in fields])
+    conditions = list(listing.get('base_filters', lambda: [])())
+    conditions += [listing['filters'][name] == value for name, value in filters.items()]
+    if after is not None:
+        conditions.append(model.id > after)
+    return query.filter(*conditions).order_by(model.id)
+
+def serialize_row(resource, fields, row):
+    formatters = LISTINGS[resource].get('formatters', {})
+    return {
+        field: formatters[field](value) if field in formatters else value
+        for field, value in zip(fields, row)
+    }
+
+def fetch_page(resource, limit, after, fields, filters):
+    rows = list_query(resource, fields, filters, after).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    items = [serialize_row(resource, fields, row) for row in rows[:limit]]
+    return {
+        resource: items,
+        'next_cursor': items[-1]['id'] if has_more else None,
+        'has_more': has_more
+    }
+
+def _ndjson_chunks(resource, fields, rows, batch_size):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(serialize_row(resource, fields, row), separators=(',', ':')))
+        if len(lines) >= batch_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+def _csv_chunks(resource, fields, rows, batch_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    pending = 0
+    for row in rows:
+        item = serialize_row(resource, fields, row)
+        writer.writerow([item[f] for f in fields])
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+def stream_listing(resource, fmt, limit, after, fields, filters):
+    """Generator of response chunks for the whole listing, fetched in batches"""
+    batch_size = current_app.config.get('API_STREAM_BATCH_SIZE', 1000)
+    query = list_query(resource, fields, filters, after)
+    if limit:
+        query = query.limit(limit)
+    rows = query.yield_per(batch_size)
+    chunks = _csv_chunks if fmt == 'csv' else _ndjson_chunks
+    return chunks(resource, fields, rows, batch_size)
+
+def stream_response(resource, params):
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in STREAM_FORMATS:
+        return jsonify({'error': f"Unsupported stream format: {fmt}"}), 400
+    headers = {'X-Accel-Buffering': 'no'}
+    if fmt == 'csv':
+        headers['Content-Disposition'] = f'attachment; filename="{resource}.csv"'
+    body = stream_with_context(stream_listing(resource, fmt, **params))
+    return Response(body, mimetype=STREAM_FORMATS[fmt], headers=headers)
+
+def list_response(resource):
+    streaming = is_stream_request()
+    try:
+        params = parse_list_args(resource, request.args, streaming=streaming)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if streaming:
+        return stream_response(resource, params)
+    return jsonify(fetch_page(resource, **params)), 200
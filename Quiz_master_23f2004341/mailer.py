@@ -0,0 +1,195 @@
+import os
+import time
+import queue
+import random
+import smtplib
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from flask import current_app
+from metrics import record_email
+
+# SMTP delivery with pooled, authenticated connections.
+#
+# Opening a connection, STARTTLS and AUTH cost several round trips, far more
+# than sending one message, so connections are kept in a per-process pool and
+# reused: send_email takes one for a single message, send_many hands a stream
+# of messages to MAIL_POOL_SIZE sender threads that each hold a connection.
+# A connection is replaced after MAIL_MAX_MESSAGES_PER_CONNECTION messages or
+# MAIL_POOL_IDLE_TIMEOUT seconds unused (servers drop idle sessions).
+#
+# Transient failures (dropped connection, 4xx replies, network errors) are
+# retried up to MAIL_MAX_RETRIES times with exponential backoff and jitter on a
+# fresh connection; permanent 5xx replies fail the message right away.
+
+class MailConnection:
+    def __init__(self, config):
+        self.smtp = _connect(config)
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self.smtp.quit()
+        except Exception:
+            try:
+                self.smtp.close()
+            except Exception:
+                pass
+
+def _connect(config):
+    timeout = config.get('MAIL_TIMEOUT', 30)
+    if config.get('MAIL_USE_SSL'):
+        smtp = smtplib.SMTP_SSL(config['MAIL_SERVER'], config['MAIL_PORT'], timeout=timeout)
+    else:
+        smtp = smtplib.SMTP(config['MAIL_SERVER'], config['MAIL_PORT'], timeout=timeout)
+        if config.get('MAIL_USE_TLS'):
+            smtp.starttls()
+    if config.get('MAIL_USERNAME'):
+        smtp.login(config['MAIL_USERNAME'], config['MAIL_PASSWORD'])
+    return smtp
+
+class SMTPPool:
+    """Idle authenticated connections to one SMTP server, shared by the threads of a process"""
+
+    def __init__(self, config):
+        self.config = dict(config)
+        self.size = config.get('MAIL_POOL_SIZE', 4)
+        self.max_messages = config.get('MAIL_MAX_MESSAGES_PER_CONNECTION', 100)
+        self.idle_timeout = config.get('MAIL_POOL_IDLE_TIMEOUT', 30)
+        self._idle = queue.LifoQueue()
+
+    def acquire(self):
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                return MailConnection(self.config)
+            if time.monotonic() - connection.last_used < self.idle_timeout:
+                return connection
+            connection.close()
+
+    def release(self, connection, healthy=True):
+        connection.last_used = time.monotonic()
+        if not healthy or connection.sent >= self.max_messages or self._idle.qsize() >= self.size:
+            connection.close()
+        else:
+            self._idle.put(connection)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(config=None):
+    config = config or current_app.config
+    # Per process (a forked worker must not share sockets) and per server/account
+    key = (os.getpid(), config['MAIL_SERVER'], config['MAIL_PORT'], config.get('MAIL_USERNAME'))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = SMTPPool(config)
+        return pool
+
+def build_message(sender, to, subject, body, html=None):
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = sender
+    msg['To'] = to
+    msg.attach(MIMEText(body, 'plain'))
+    if html:
+        msg.attach(MIMEText(html, 'html'))
+    return msg
+
+def _is_transient(error):
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    # Dropped sessions, refused connections, timeouts
+    return isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError))
+
+def _deliver(pool, msg, connection=None):
+    """Send one message, retrying transient errors; returns (sent, connection to keep using or None, retries)"""
+    retries = 0
+    while True:
+        started = time.perf_counter()
+        try:
+            if connection is None:
+                connection = pool.acquire()
+            connection.smtp.sendmail(msg['From'], [msg['To']], msg.as_string())
+            connection.sent += 1
+            record_email(time.perf_counter() - started)
+            if connection.sent >= pool.max_messages:
+                pool.release(connection)
+                connection = None
+            return True, connection, retries
+        except Exception as e:
+            record_email(time.perf_counter() - started, error=e)
+            if connection is not None:
+                # The session state is unknown after an error; start over on a new one
+                pool.release(connection, healthy=False)
+                connection = None
+            if not _is_transient(e) or retries >= pool.config.get('MAIL_MAX_RETRIES', 3):
+                print(f"Failed to send email to {msg['To']}: {e}")
+                return False, None, retries
+            retries += 1
+            backoff = pool.config.get('MAIL_RETRY_BACKOFF', 1.0) * 2 ** (retries - 1)
+            time.sleep(backoff * (0.5 + random.random() / 2))
+
+def send_message(msg, config=None):
+    """Deliver one prepared message over a pooled connection; returns True if the server accepted it"""
+    pool = get_pool(config)
+    sent, connection, _ = _deliver(pool, msg)
+    if connection is not None:
+        pool.release(connection)
+    return sent
+
+def send_many(messages, config=None, workers=None):
+    """Deliver an iterable of (to, subject, body, html) with bounded parallelism.
+
+    The iterable is consumed lazily, at most two messages per sender ahead, so
+    a generator over a large audience is never materialized. Each sender thread
+    keeps one pooled connection for all of its messages. Returns counts of
+    sent, failed and retried deliveries.
+    """
+    config = config or current_app.config
+    pool = get_pool(config)
+    workers = workers or pool.size
+    sender = config['MAIL_DEFAULT_SENDER']
+    # Sender thread -> the connection it is holding between messages
+    held = {}
+    stats = {'sent': 0, 'failed': 0, 'retries': 0}
+
+    def send(message):
+        to, subject, body, html = message
+        msg = build_message(sender, to, subject, body, html)
+        thread = threading.get_ident()
+        sent, held[thread], retries = _deliver(pool, msg, held.get(thread))
+        return sent, retries
+
+    def collect(futures):
+        for future in futures:
+            sent, retries = future.result()
+            stats['sent' if sent else 'failed'] += 1
+            stats['retries'] += retries
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mailer') as executor:
+        in_flight = set()
+        for message in messages:
+            if len(in_flight) >= workers * 2:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            in_flight.add(executor.submit(send, message))
+        collect(wait(in_flight)[0])
+    # Hand the senders' connections back for the next batch; the pool keeps at most its size
+    for connection in held.values():
+        if connection is not None:
+            pool.release(connection)
+    return stats
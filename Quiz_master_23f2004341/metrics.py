@@ -0,0 +1,333 @@
+import os
+import re
+import json
+import atexit
+import time
+import bisect
+import threading
+from flask import g, request, Response, current_app
+
+# Prometheus text exposition at /metrics, without the prometheus_client dependency.
+#
+# Request latency and cache lookups happen in the web process on every request,
+# so they are kept in process memory: an observation is a bisect into the bucket
+# bounds plus a few integer additions under a lock (a couple of microseconds).
+# Like prometheus_client without multiprocess mode, each web worker reports its
+# own requests.
+#
+# Celery tasks and emails run in the worker processes, where nothing scrapes
+# them, so their histograms and counters live in Redis hashes and every
+# /metrics scrape reads them back. Observations only add to an in-process
+# buffer; a background thread writes it to Redis in one pipeline every
+# METRICS_FLUSH_INTERVAL seconds (and on exit), so a slow or unreachable Redis
+# never holds up a send or a task. A failed write keeps the increments for the
+# next one.
+
+METRICS_KEY_PREFIX = "quiz_master:metrics:"
+METRICS_FLUSH_INTERVAL = 5.0
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TASK_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+SMTP_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _histogram_lines(name, label_names, buckets, series):
+    """Exposition lines for {label values: (per-bucket counts incl. +Inf, sum)}"""
+    lines = []
+    for values, (counts, total) in sorted(series.items()):
+        cumulative = 0
+        for bound, count in zip(buckets + ('+Inf',), counts):
+            cumulative += count
+            le = bound if bound == '+Inf' else repr(float(bound))
+            lines.append(f"{name}_bucket{_format_labels(label_names + ('le',), values + (le,))} {cumulative}")
+        labels = _format_labels(label_names, values)
+        lines.append(f"{name}_sum{labels} {_format_value(float(total))}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+    return lines
+
+class Histogram:
+    """In-process histogram keyed by a tuple of label values"""
+
+    def __init__(self, name, documentation, label_names, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, values, amount):
+        index = bisect.bisect_left(self.buckets, amount)
+        with self._lock:
+            series = self._series.get(values)
+            if series is None:
+                series = self._series[values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += amount
+
+    def collect(self):
+        with self._lock:
+            series = {values: (list(counts), total) for values, (counts, total) in self._series.items()}
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram",
+                *_histogram_lines(self.name, self.label_names, self.buckets, series)]
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+class Counter:
+    """In-process counter keyed by a tuple of label values"""
+
+    def __init__(self, name, documentation, label_names):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, values, amount=1):
+        with self._lock:
+            self._values[values] = self._values.get(values, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter",
+                *(f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+                  for labels, value in sorted(values.items()))]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+class SharedMetricsBuffer:
+    """Pending HINCRBY/HINCRBYFLOAT amounts of this process, keyed by (key, field)"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._reset()
+        # A forked child (prefork worker) starts empty; the parent flushes its own
+        os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.flush)
+
+    def _reset(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, key, field, amount):
+        with self._lock:
+            self._pending[(key, field)] = self._pending.get((key, field), 0) + amount
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='metrics-flush', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            from extensions import redis_client
+            pipe = redis_client.pipeline(transaction=False)
+            for (key, field), amount in pending.items():
+                if isinstance(amount, float):
+                    pipe.hincrbyfloat(key, field, amount)
+                else:
+                    pipe.hincrby(key, field, amount)
+            pipe.execute()
+        except Exception as e:
+            print(f"Metrics flush error: {e}")
+            # Keep them for the next flush; one entry per series, so this stays small
+            with self._lock:
+                for field, amount in pending.items():
+                    self._pending[field] = self._pending.get(field, 0) + amount
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+
+shared_buffer = SharedMetricsBuffer(METRICS_FLUSH_INTERVAL)
+
+class RedisHistogram:
+    """Histogram shared by every process through one Redis hash.
+
+    Fields are "<label values as JSON>|<bucket index>" and "<label values>|sum".
+    """
+
+    def __init__(self, name, documentation, label_names, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self.key = f"{METRICS_KEY_PREFIX}{name}"
+
+    def observe(self, values, amount):
+        labels = json.dumps(list(values))
+        shared_buffer.add(self.key, f"{labels}|{bisect.bisect_left(self.buckets, amount)}", 1)
+        shared_buffer.add(self.key, f"{labels}|sum", float(amount))
+
+    def collect(self):
+        from extensions import redis_client
+        series = {}
+        for field, value in redis_client.hgetall(self.key).items():
+            labels, _, slot = field.rpartition('|')
+            counts, total = series.setdefault(tuple(json.loads(labels)), ([0] * (len(self.buckets) + 1), [0.0]))
+            if slot == 'sum':
+                total[0] = float(value)
+            else:
+                counts[int(slot)] = int(value)
+        series = {values: (counts, total[0]) for values, (counts, total) in series.items()}
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram",
+                *_histogram_lines(self.name, self.label_names, self.buckets, series)]
+
+    def clear(self):
+        from extensions import redis_client
+        redis_client.delete(self.key)
+
+class RedisCounter:
+    """Counter shared by every process through one Redis hash"""
+
+    def __init__(self, name, documentation, label_names):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.key = f"{METRICS_KEY_PREFIX}{name}"
+
+    def inc(self, values, amount=1):
+        shared_buffer.add(self.key, json.dumps(list(values)), amount)
+
+    def collect(self):
+        from extensions import redis_client
+        values = {tuple(json.loads(labels)): int(value) for labels, value in redis_client.hgetall(self.key).items()}
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter",
+                *(f"{self.name}{_format_labels(self.label_names, labels)} {value}"
+                  for labels, value in sorted(values.items()))]
+
+    def clear(self):
+        from extensions import redis_client
+        redis_client.delete(self.key)
+
+http_request_duration = Histogram(
+    'quiz_master_http_request_duration_seconds', 'Time spent handling HTTP requests, per route.',
+    ('method', 'route', 'status'), REQUEST_BUCKETS
+)
+cache_lookups = Counter(
+    'quiz_master_cache_lookups_total', 'Application cache lookups per key prefix and result.',
+    ('prefix', 'result')
+)
+celery_task_duration = RedisHistogram(
+    'quiz_master_celery_task_duration_seconds', 'Celery task runtime, per task and final state.',
+    ('task', 'state'), TASK_BUCKETS
+)
+smtp_send_duration = RedisHistogram(
+    'quiz_master_smtp_send_duration_seconds', 'Time spent sending one email over SMTP.',
+    ('outcome',), SMTP_BUCKETS
+)
+smtp_send_failures = RedisCounter(
+    'quiz_master_smtp_send_failures_total', 'Emails that could not be sent, per exception type.',
+    ('reason',)
+)
+
+LOCAL_METRICS = (http_request_duration, cache_lookups)
+SHARED_METRICS = (celery_task_duration, smtp_send_duration, smtp_send_failures)
+
+# "user_analytics_12@3.1:..." -> "user_analytics", "score_5_12" -> "score",
+# "stale:admin_charts_admin:..." -> "stale:admin_charts_admin". Every numeric
+# segment goes, wherever it sits, so ids never become label values.
+_KEY_PREFIX_RE = re.compile(r'^(stale:)?([^:@]*)')
+_NUMERIC_SEGMENT_RE = re.compile(r'_\d+(?=_|$)')
+
+def cache_key_prefix(key):
+    match = _KEY_PREFIX_RE.match(key)
+    return (match.group(1) or '') + _NUMERIC_SEGMENT_RE.sub('', match.group(2))
+
+def record_cache_lookup(key, hit):
+    cache_lookups.inc((cache_key_prefix(key), 'hit' if hit else 'miss'))
+
+def record_task(task_name, state, seconds):
+    celery_task_duration.observe((task_name, state), seconds)
+
+def record_email(seconds, error=None):
+    smtp_send_duration.observe(('failure' if error else 'success',), seconds)
+    if error:
+        smtp_send_failures.inc((type(error).__name__,))
+
+def render_metrics():
+    # This process's own buffered observations go out first so the scrape sees them
+    shared_buffer.flush()
+    lines = []
+    for metric in LOCAL_METRICS:
+        lines.extend(metric.collect())
+    for metric in SHARED_METRICS:
+        try:
+            lines.extend(metric.collect())
+        except Exception as e:
+            print(f"Metrics error ({metric.name}): {e}")
+    return '\n'.join(lines) + '\n'
+
+def reset_metrics():
+    shared_buffer.clear()
+    for metric in LOCAL_METRICS + SHARED_METRICS:
+        metric.clear()
+
+def _start_timer():
+    g.metrics_started = time.perf_counter()
+
+def _observe_request(response):
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        http_request_duration.observe((request.method, route, str(response.status_code)),
+                                      time.perf_counter() - started)
+    return response
+
+def metrics_view():
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f"Bearer {token}":
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def init_metrics(app):
+    """Time every request and expose /metrics"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    app.before_request(_start_timer)
+    app.after_request(_observe_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+
+def instrument_celery(celery_app):
+    """Record the runtime of every task run by this Celery app"""
+    from celery import signals
+    started = {}
+
+    @signals.task_prerun.connect(weak=False)
+    def _task_started(task_id=None, **kwargs):
+        started[task_id] = time.perf_counter()
+
+    @signals.worker_process_shutdown.connect(weak=False)
+    def _flush_metrics(**kwargs):
+        # Prefork children leave through os._exit, which skips atexit
+        shared_buffer.flush()
+
+    @signals.task_postrun.connect(weak=False)
+    def _task_finished(task_id=None, task=None, state=None, **kwargs):
+        began = started.pop(task_id, None)
+        if began is not None and task is not None and task.app is celery_app:
+            record_task(task.name, state or 'UNKNOWN', time.perf_counter() - began)
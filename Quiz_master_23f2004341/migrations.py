@@ -0,0 +1,73 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import text
+from extensions import db
+
+# Schema changes for databases created by an older db.create_all().
+# create_all() only creates missing tables, so anything added to an existing
+# table (indexes, columns) has to be applied here. Each step runs once and the
+# applied version is stored in SQLite's PRAGMA user_version. Steps must be
+# idempotent: on a fresh database create_all() has already done the work.
+# Steps spell out their DDL instead of reading the models, which describe the
+# final schema, not the one the step upgrades. benchmarks/check_migrations
+# upgrades a first-release database to catch a step that breaks this.
+
+# The indexes migration 1 introduced, frozen: building it from db.metadata
+# would also pick up indexes on columns that later migrations add
+INITIAL_INDEXES = [
+    ('ix_chapter_subject_id', 'chapter', 'subject_id'),
+    ('ix_quiz_chapter_id', 'quiz', 'chapter_id'),
+    ('ix_quiz_date_of_quiz', 'quiz', 'date_of_quiz'),
+    ('ix_question_quiz_id', 'question', 'quiz_id'),
+    ('ix_score_timestamp', 'score', 'timestamp'),
+    ('ix_score_user_id_timestamp', 'score', 'user_id, timestamp'),
+    ('ix_score_quiz_id_total_score', 'score', 'quiz_id, total_score'),
+]
+
+def _create_initial_indexes(connection):
+    for name, table, columns in INITIAL_INDEXES:
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+
+def _add_score_submission_id(connection):
+    columns = {row[1] for row in connection.execute(text("PRAGMA table_info(score)"))}
+    if 'submission_id' not in columns:
+        connection.execute(text("ALTER TABLE score ADD COLUMN submission_id VARCHAR(36)"))
+    # SQLite cannot add a UNIQUE column; a unique index gives the same guarantee
+    connection.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_score_submission_id ON score (submission_id)"
+    ))
+
+def _add_score_user_quiz_index(connection):
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_score_user_id_quiz_id ON score (user_id, quiz_id)"
+    ))
+
+MIGRATIONS = [
+    (1, 'Indexes on score, question, quiz and chapter foreign keys', _create_initial_indexes),
+    (2, 'Score.submission_id for idempotent queued submissions', _add_score_submission_id),
+    (3, 'Index on score (user_id, quiz_id) for the reminder audience', _add_score_user_quiz_index),
+]
+
+def current_schema_version(connection):
+    return connection.execute(text("PRAGMA user_version")).scalar()
+
+def upgrade_schema():
+    applied = []
+    with db.engine.begin() as connection:
+        version = current_schema_version(connection)
+        for target, description, step in MIGRATIONS:
+            if target <= version:
+                continue
+            step(connection)
+            # PRAGMA does not accept bound parameters; target is a trusted int
+            connection.execute(text(f"PRAGMA user_version = {int(target)}"))
+            applied.append(description)
+            print(f"Applied migration {target}: {description}")
+    return applied
+
+@click.command('upgrade-db')
+@with_appcontext
+def upgrade_db_command():
+    """Apply pending schema migrations to the configured database."""
+    applied = upgrade_schema()
+    click.echo(f"{len(applied)} migration(s) applied.")
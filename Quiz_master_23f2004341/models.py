@@ -25,22 +25,22 @@ class Subject(db.Model):
 
 class Chapter(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False, index=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     quizzes = db.relationship('Quiz', backref='chapter', cascade="all, delete", lazy=True)
 
 class Quiz(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id'), nullable=False)
-    date_of_quiz = db.Column(db.Date, nullable=False)
+    chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id'), nullable=False, index=True)
+    date_of_quiz = db.Column(db.Date, nullable=False, index=True)
     duration = db.Column(db.String(10), nullable=False)  # hours:minutes
     remarks = db.Column(db.Text)
     questions = db.relationship('Question', backref='quiz', cascade="all, delete", lazy=True)
 
 class Question(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False, index=True)
     question_statement = db.Column(db.Text, nullable=False)
     option1 = db.Column(db.String(200), nullable=False)
     option2 = db.Column(db.String(200), nullable=False)
@@ -49,15 +49,51 @@ class Question(db.Model):
     correct_option = db.Column(db.Integer, nullable=False)  # 1 to 4
 
 class Score(db.Model):
+    __table_args__ = (
+        # History, latest-attempt and per-user window lookups
+        db.Index('ix_score_user_id_timestamp', 'user_id', 'timestamp'),
+        # Has this user attempted this quiz (reminder audience anti-join)
+        db.Index('ix_score_user_id_quiz_id', 'user_id', 'quiz_id'),
+        # Per-quiz leaderboards and rankings
+        db.Index('ix_score_quiz_id_total_score', 'quiz_id', 'total_score'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    timestamp = db.Column(db.DateTime, nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False, index=True)
     total_score = db.Column(db.Integer, nullable=False)
+    # Set for attempts that went through the submission queue; makes replays idempotent
+    submission_id = db.Column(db.String(36), unique=True, index=True)
+
+class UserScoreSummary(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    total_score = db.Column(db.Integer, nullable=False, default=0)
+    best_score = db.Column(db.Integer, nullable=False, default=0)
+    last_attempt = db.Column(db.DateTime)
+
+class QuizScoreSummary(db.Model):
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    total_score = db.Column(db.Integer, nullable=False, default=0)
+    min_score = db.Column(db.Integer, nullable=False, default=0)
+    max_score = db.Column(db.Integer, nullable=False, default=0)
+
+class UserSubjectScoreSummary(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    total_score = db.Column(db.Integer, nullable=False, default=0)
+
+class DailyScoreSummary(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    total_score = db.Column(db.Integer, nullable=False, default=0)
 """this code defines the User, Subject, Chapter, Quiz, Question, and Score models.
 The User model represents the users of the application. It has columns for the user's email, password, full name, qualification, date of birth, and role (admin or user).
 The Subject model represents the subjects in the application. It has columns for the subject's name and description.
 The Chapter model represents the chapters in the application. It has columns for the chapter's name, description, and the subject it belongs to.
 The Quiz model represents the quizzes in the application. It has columns for the quiz's date, duration, remarks, and the chapter it belongs to.
 The Question model represents the questions in the application. It has columns for the question statement, options, and correct option.
-The Score model represents the scores of users in quizzes. It has columns for the quiz, user, timestamp, and total score."""
\ No newline at end of file
+The Score model represents the scores of users in quizzes. It has columns for the quiz, user, timestamp, and total score, plus the submission id of attempts recorded through the submission queue (see submissions.py).
+The UserScoreSummary, QuizScoreSummary, UserSubjectScoreSummary and DailyScoreSummary models hold running totals of the Score table per user, per quiz, per (user, subject) and per day. They are updated in the same transaction as every Score insert (see aggregates.py) so analytics can read a handful of rows instead of scanning all scores."""
\ No newline at end of file
@@ -0,0 +1,141 @@
+import os
+import json
+from functools import lru_cache
+from datetime import datetime
+from jinja2 import Environment, FileSystemLoader
+from markupsafe import escape
+from extensions import db
+from models import User, Quiz, Score, Subject, Chapter
+
+# Monthly activity reports, computed in one pass and rendered in chunks.
+#
+# collect_monthly_reports runs two queries for the whole month: per-user totals
+# with the overall rank (RANK() over the summed scores), and every attempt with
+# its rank and participant count on that quiz (RANK()/COUNT() partitioned by
+# quiz), names joined in. The rows are grouped per user and split into chunks
+# that celery_app.monthly_report_task fans out to parallel subtasks; a chord
+# callback adds up what each chunk sent. Each report is rendered from the
+# templates in templates/reports as HTML, plain text or JSON from the same data.
+
+def report_period(now=None):
+    """(start, end) of the month being reported: from the 1st up to now"""
+    now = now or datetime.now()
+    return datetime(now.year, now.month, 1), now
+
+def monthly_totals_statement(start, end):
+    """Per-user attempt count, summed score and overall rank for the period, ordered by user id"""
+    month_total = db.func.coalesce(db.func.sum(Score.total_score), 0)
+    return db.select(
+        User.id, User.email, User.full_name, db.func.count(Score.id), month_total,
+        db.func.rank().over(order_by=month_total.desc())
+    ).outerjoin(Score, db.and_(Score.user_id == User.id, Score.timestamp >= start, Score.timestamp < end)) \
+        .where(User.role == 'user') \
+        .group_by(User.id).order_by(User.id)
+
+def monthly_attempts_statement(start, end):
+    """Every attempt of the period with its rank and participant count on that quiz"""
+    return db.select(
+        Score.user_id, Score.quiz_id, Score.total_score, Score.timestamp,
+        db.func.rank().over(partition_by=Score.quiz_id, order_by=Score.total_score.desc()),
+        db.func.count(Score.id).over(partition_by=Score.quiz_id),
+        Chapter.name, Subject.name
+    ).outerjoin(Quiz, Quiz.id == Score.quiz_id) \
+        .outerjoin(Chapter, Chapter.id == Quiz.chapter_id) \
+        .outerjoin(Subject, Subject.id == Chapter.subject_id) \
+        .where(Score.timestamp >= start, Score.timestamp < end) \
+        .order_by(Score.user_id, Score.timestamp, Score.id)
+
+def collect_monthly_reports(start, end):
+    """Report data for every user, ordered by user id; returns (reports, total_users)"""
+    user_rows = db.session.execute(monthly_totals_statement(start, end)).all()
+    reports = {
+        user_id: {
+            'user_id': user_id, 'email': email, 'full_name': full_name,
+            'attempts': attempts, 'total_score': total_score, 'rank': rank, 'quizzes': []
+        } for user_id, email, full_name, attempts, total_score, rank in user_rows
+    }
+
+    # Per-quiz leaderboard position of every attempt in the month
+    ranked = db.session.execute(monthly_attempts_statement(start, end))
+    for user_id, quiz_id, score, timestamp, rank, participants, chapter, subject in ranked:
+        report = reports.get(user_id)
+        if report is None:
+            # Admin attempts count on the leaderboards but get no report
+            continue
+        report['quizzes'].append({
+            'quiz_id': quiz_id,
+            'score': score,
+            'rank': rank,
+            'total_participants': participants,
+            'quiz_name': f"Quiz {quiz_id}",
+            'subject': subject or "Unknown",
+            'chapter': chapter or "Unknown",
+            'date': timestamp.strftime('%Y-%m-%d %H:%M')
+        })
+    return list(reports.values()), len(reports)
+
+def chunked(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+# Templates are compiled once per process on first use and kept; the
+# stylesheet is read once and shared, so a render only fills in the numbers
+# and the quiz rows. Only free text is HTML-escaped (|esc), and as subject and
+# chapter names repeat across thousands of reports, escaped names are cached.
+REPORT_FORMATS = ('html', 'text', 'json')
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'reports')
+_environment = None
+
+@lru_cache(maxsize=4096)
+def _escape_text(value):
+    return str(escape(value))
+
+def report_environment():
+    global _environment
+    if _environment is None:
+        environment = Environment(
+            loader=FileSystemLoader(TEMPLATE_DIR),
+            autoescape=False,
+            auto_reload=False,
+            keep_trailing_newline=True
+        )
+        with open(os.path.join(TEMPLATE_DIR, 'monthly_report.css'), encoding='utf-8') as css:
+            environment.globals['stylesheet'] = css.read()
+        environment.filters['esc'] = _escape_text
+        _environment = environment
+    return _environment
+
+def report_summary(report, period_label, total_users, generated_at=None):
+    """Everything a rendered report shows, as plain data"""
+    attempts = report['attempts']
+    return {
+        'user_id': report['user_id'],
+        'full_name': report['full_name'],
+        'period_label': period_label,
+        'attempts': attempts,
+        'average': round(report['total_score'] / attempts, 1) if attempts else 0,
+        'rank': report['rank'],
+        'total_users': total_users,
+        'total_score': report['total_score'],
+        'quizzes': report['quizzes'],
+        'generated_at': generated_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+def render_monthly_report(report, period_label, total_users, fmt='html', generated_at=None):
+    """One user's report as an HTML page, a plain-text summary or JSON"""
+    if fmt not in REPORT_FORMATS:
+        raise ValueError(f"Unknown report format: {fmt}")
+    summary = report_summary(report, period_label, total_users, generated_at)
+    if fmt == 'json':
+        return json.dumps(summary)
+    template = report_environment().get_template('monthly_report.html' if fmt == 'html' else 'monthly_report.txt')
+    return template.render(summary)
+
+def report_email(report, period_label, total_users, generated_at=None):
+    """(to, subject, body, html) for mailer.send_many; the text part is the same report"""
+    generated_at = generated_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    return (
+        report['email'],
+        f"Quiz Master: Monthly Activity Report - {period_label}",
+        render_monthly_report(report, period_label, total_users, 'text', generated_at),
+        render_monthly_report(report, period_label, total_users, 'html', generated_at)
+    )
@@ -0,0 +1,221 @@
+import time
+import asyncio
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+# Multi-channel notification dispatcher.
+#
+# Notifications are (channel, target, subject, body) tuples: email to an
+# address, google_chat to a webhook URL, sms to a phone number. dispatch()
+# runs an asyncio loop with one bounded queue and a fixed number of worker
+# coroutines per channel, so a slow webhook only holds up its own channel.
+# Each channel has
+#   - a concurrency limit (worker count) and a token-bucket rate limit,
+#   - a circuit breaker: after failure_threshold consecutive failures the
+#     channel is skipped for reset_timeout seconds, then one trial decides,
+# and the blocking sends (SMTP through the mailer pool, requests.post, ...)
+# run on a thread pool sized to the sum of the channel limits.
+#
+# Webhook messages are not posted one by one: identical texts are collapsed
+# (with a count) and the rest are joined into digests of at most
+# WEBHOOK_DIGEST_MAX_CHARS characters per webhook, posted as each one fills.
+
+def send_google_chat_message(webhook_url, message):
+    try:
+        payload = {"text": message}
+        response = requests.post(webhook_url, json=payload, timeout=10)
+        return response.status_code == 200
+    except Exception as e:
+        print(f"Google Chat error: {e}")
+        return False
+
+def send_sms_message(phone_number, message):
+    try:
+        print(f"SMS would be sent to {phone_number}: {message}")
+        return True
+    except Exception as e:
+        print(f"SMS error: {e}")
+        return False
+
+class TokenBucket:
+    """rate tokens per second, up to burst at once; rate None means unlimited"""
+
+    def __init__(self, rate=None, burst=1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        if not self.rate:
+            return 0.0
+        waited = 0.0
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return waited
+            delay = (1 - self.tokens) / self.rate
+            waited += delay
+            await asyncio.sleep(delay)
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.trips = 0
+
+    def allow(self):
+        if self.opened_at is None:
+            return True
+        if time.monotonic() - self.opened_at < self.reset_timeout or self.trial_running:
+            return False
+        # Half-open: let one delivery through to probe the channel
+        self.trial_running = True
+        return True
+
+    def record(self, success):
+        self.trial_running = False
+        if success:
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                self.trips += 1
+            self.opened_at = time.monotonic()
+
+class Channel:
+    def __init__(self, name, send, concurrency=1, rate=None, burst=1, failure_threshold=5, reset_timeout=60):
+        self.name = name
+        self.send = send
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.stats = {'sent': 0, 'failed': 0, 'skipped': 0, 'rate_limited_seconds': 0.0, 'seconds': 0.0}
+
+    async def deliver(self, loop, executor, target, subject, body):
+        if not self.breaker.allow():
+            self.stats['skipped'] += 1
+            return
+        self.stats['rate_limited_seconds'] += await self.bucket.acquire()
+        started = time.perf_counter()
+        try:
+            ok = await loop.run_in_executor(executor, self.send, target, subject, body)
+        except Exception as e:
+            print(f"{self.name} notification error: {e}")
+            ok = False
+        self.stats['seconds'] += time.perf_counter() - started
+        self.breaker.record(ok)
+        self.stats['sent' if ok else 'failed'] += 1
+
+    def report(self):
+        stats = dict(self.stats)
+        stats['rate_limited_seconds'] = round(stats['rate_limited_seconds'], 3)
+        stats['seconds'] = round(stats['seconds'], 3)
+        stats['circuit_trips'] = self.breaker.trips
+        stats['circuit_open'] = self.breaker.opened_at is not None
+        return stats
+
+class WebhookDigest:
+    """Collapses webhook messages per URL into as few posts as the size limit allows"""
+
+    # Separator plus room for a "(xN)" duplicate count
+    ENTRY_OVERHEAD = 16
+
+    def __init__(self, max_chars=4000):
+        self.max_chars = max_chars
+        self.pending = {}
+        self.sizes = {}
+
+    def add(self, url, text):
+        """Buffer text for url; returns a full digest to post when the buffer overflows, else None"""
+        counts = self.pending.setdefault(url, {})
+        if text in counts:
+            counts[text] += 1
+            return None
+        ready = None
+        if counts and self.sizes[url] + len(text) > self.max_chars:
+            ready = self._join(counts)
+            counts.clear()
+            self.sizes[url] = 0
+        counts[text] = 1
+        self.sizes[url] = self.sizes.get(url, 0) + len(text) + self.ENTRY_OVERHEAD
+        return ready
+
+    def flush(self):
+        for url, counts in self.pending.items():
+            if counts:
+                yield url, self._join(counts)
+        self.pending = {}
+        self.sizes = {}
+
+    @staticmethod
+    def _join(counts):
+        entries = [f"{text}\n(x{count})" if count > 1 else text for text, count in counts.items()]
+        header = f"Quiz Master digest ({sum(counts.values())} notifications)"
+        return "\n\n---\n\n".join([header] + entries)
+
+def default_channels(config):
+    """email, google_chat and sms channels configured from NOTIFY_CHANNELS"""
+    from mailer import build_message, send_message
+    settings = config.get('NOTIFY_CHANNELS', {})
+    mail_config = dict(config)
+    senders = {
+        'email': lambda to, subject, body: send_message(
+            build_message(mail_config['MAIL_DEFAULT_SENDER'], to, subject, body), mail_config),
+        'google_chat': lambda url, subject, body: send_google_chat_message(url, body),
+        'sms': lambda number, subject, body: send_sms_message(number, body),
+    }
+    return {name: Channel(name, send, **settings.get(name, {})) for name, send in senders.items()}
+
+class NotificationDispatcher:
+    def __init__(self, channels, digest_max_chars=4000):
+        self.channels = channels
+        self.digest = WebhookDigest(digest_max_chars)
+
+    async def _worker(self, channel, queue, loop, executor):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            await channel.deliver(loop, executor, *item)
+
+    async def run(self, notifications):
+        loop = asyncio.get_running_loop()
+        threads = sum(channel.concurrency for channel in self.channels.values())
+        with ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix='notify') as executor:
+            queues, workers = {}, []
+            for name, channel in self.channels.items():
+                # Bounded, so a large audience is read only as fast as it is sent
+                queues[name] = asyncio.Queue(maxsize=channel.concurrency * 2)
+                workers += [loop.create_task(self._worker(channel, queues[name], loop, executor))
+                            for _ in range(channel.concurrency)]
+            for channel_name, target, subject, body in notifications:
+                if channel_name not in queues:
+                    raise ValueError(f"Unknown notification channel: {channel_name}")
+                if channel_name == 'google_chat':
+                    digest = self.digest.add(target, body)
+                    if digest is not None:
+                        await queues[channel_name].put((target, None, digest))
+                else:
+                    await queues[channel_name].put((target, subject, body))
+            if 'google_chat' in queues:
+                for url, text in self.digest.flush():
+                    await queues['google_chat'].put((url, None, text))
+            for name, channel in self.channels.items():
+                for _ in range(channel.concurrency):
+                    await queues[name].put(None)
+            await asyncio.gather(*workers)
+        return {name: channel.report() for name, channel in self.channels.items()}
+
+def dispatch(notifications, config, channels=None):
+    """Send (channel, target, subject, body) notifications; returns per-channel results"""
+    dispatcher = NotificationDispatcher(channels or default_channels(config), config.get('WEBHOOK_DIGEST_MAX_CHARS', 4000))
+    return asyncio.run(dispatcher.run(notifications))
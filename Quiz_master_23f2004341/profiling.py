@@ -0,0 +1,100 @@
+import os
+import time
+import threading
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from extensions import db
+
+# Per-request SQL profiling built on SQLAlchemy engine events.
+#
+# Every statement is timed between before_cursor_execute and
+# after_cursor_execute. Inside a request the count and DB time are added to
+# flask.g, reported back in a Server-Timing header and folded into per-endpoint
+# totals (kept per worker process) for /api/admin/profiling/endpoints.
+# Statements slower than SLOW_QUERY_MS are printed with the endpoint that ran
+# them, which is how N+1 loops and missing indexes show up in the logs.
+
+_endpoint_stats = {}
+_stats_lock = threading.Lock()
+_slow_query_ms = 100
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_started'] = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop('query_started', time.perf_counter())
+    endpoint = 'background'
+    if has_request_context():
+        g.db_queries = g.get('db_queries', 0) + 1
+        g.db_time = g.get('db_time', 0.0) + elapsed
+        endpoint = request.endpoint or request.path
+    if elapsed * 1000 >= _slow_query_ms:
+        print(f"Slow query ({elapsed * 1000:.1f} ms) in {endpoint}: {' '.join(statement.split())[:500]}")
+
+def _start_request():
+    g.request_started = time.perf_counter()
+    g.db_queries = 0
+    g.db_time = 0.0
+
+def _finish_request(response):
+    started = g.get('request_started')
+    if started is None:
+        return response
+    total = time.perf_counter() - started
+    queries = g.get('db_queries', 0)
+    db_time = g.get('db_time', 0.0)
+    response.headers.add(
+        'Server-Timing', f'db;dur={db_time * 1000:.2f};desc="{queries} queries", app;dur={total * 1000:.2f}'
+    )
+    endpoint = request.endpoint or 'unmatched'
+    with _stats_lock:
+        stats = _endpoint_stats.setdefault(endpoint, {
+            'requests': 0, 'queries': 0, 'max_queries': 0, 'db_ms': 0.0, 'max_db_ms': 0.0, 'total_ms': 0.0
+        })
+        stats['requests'] += 1
+        stats['queries'] += queries
+        stats['max_queries'] = max(stats['max_queries'], queries)
+        stats['db_ms'] += db_time * 1000
+        stats['max_db_ms'] = max(stats['max_db_ms'], db_time * 1000)
+        stats['total_ms'] += total * 1000
+    return response
+
+def top_endpoints(sort='db_ms', limit=20):
+    """Endpoints of this worker ranked by total DB time (or 'queries', 'requests', ...)"""
+    with _stats_lock:
+        snapshot = {name: dict(stats) for name, stats in _endpoint_stats.items()}
+    rows = []
+    for name, stats in snapshot.items():
+        requests = stats['requests']
+        rows.append({
+            'endpoint': name,
+            'requests': requests,
+            'queries': stats['queries'],
+            'avg_queries': round(stats['queries'] / requests, 2),
+            'max_queries': stats['max_queries'],
+            'db_ms': round(stats['db_ms'], 2),
+            'avg_db_ms': round(stats['db_ms'] / requests, 2),
+            'max_db_ms': round(stats['max_db_ms'], 2),
+            'avg_total_ms': round(stats['total_ms'] / requests, 2),
+        })
+    if rows and sort not in rows[0]:
+        raise ValueError(f"Unknown sort field: {sort}")
+    rows.sort(key=lambda row: row[sort], reverse=True)
+    return {'worker_pid': os.getpid(), 'endpoints': rows[:limit]}
+
+def reset_profiling():
+    with _stats_lock:
+        _endpoint_stats.clear()
+
+def init_profiling(app):
+    """Attach the engine listeners and request hooks; call inside an app context"""
+    global _slow_query_ms
+    if not app.config.get('PROFILING_ENABLED', True):
+        return
+    _slow_query_ms = app.config.get('SLOW_QUERY_MS', 100)
+    engine = db.engine
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
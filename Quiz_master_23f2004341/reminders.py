@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+from itertools import groupby
+from extensions import db
+from models import User, Quiz, Score
+
+# Audience selection for the daily reminders.
+#
+# Both audiences come from one UNION ALL statement ordered by user:
+#   inactive    users with no attempt since the cutoff (NOT EXISTS anti-join on
+#               ix_score_user_id_timestamp); one row per user, quiz columns NULL
+#   unattempted (user, recent quiz) pairs without an attempt of that quiz (anti-join
+#               on ix_score_user_id_quiz_id); one row per pair
+# The rows are streamed with yield_per and folded into one recipient per user,
+# so a user gets a single message listing every quiz they still have to take.
+
+def audience_statement(cutoff, quizzes_since):
+    inactive = db.select(
+        User.id, User.email, User.full_name,
+        db.type_coerce(db.null(), db.Integer).label('quiz_id'), db.type_coerce(db.null(), db.Date).label('quiz_date')
+    ).where(
+        User.role == 'user',
+        ~db.exists().where(Score.user_id == User.id, Score.timestamp >= cutoff)
+    )
+    unattempted = db.select(
+        User.id, User.email, User.full_name, Quiz.id, Quiz.date_of_quiz
+    ).join(Quiz, Quiz.date_of_quiz >= quizzes_since).where(
+        User.role == 'user',
+        ~db.exists().where(Score.user_id == User.id, Score.quiz_id == Quiz.id)
+    )
+    union = db.union_all(inactive, unattempted).subquery()
+    user_id, email, full_name, quiz_id, quiz_date = union.c
+    # NULL quiz ids sort first, so the inactive marker leads each user's rows
+    return db.select(user_id, email, full_name, quiz_id, quiz_date).order_by(user_id, quiz_id)
+
+def reminder_audience(now=None, inactive_days=1, new_quiz_days=1, batch_size=500):
+    """Yield lists of up to batch_size recipients:
+    {'user_id', 'email', 'full_name', 'inactive', 'quizzes': [(quiz_id, date_of_quiz), ...]}"""
+    now = now or datetime.now()
+    statement = audience_statement(now - timedelta(days=inactive_days), (now - timedelta(days=new_quiz_days)).date())
+    rows = db.session.execute(statement.execution_options(yield_per=batch_size))
+    batch = []
+    for (user_id, email, full_name), user_rows in groupby(rows, key=lambda row: tuple(row[:3])):
+        recipient = {'user_id': user_id, 'email': email, 'full_name': full_name, 'inactive': False, 'quizzes': []}
+        for _, _, _, quiz_id, quiz_date in user_rows:
+            if quiz_id is None:
+                recipient['inactive'] = True
+            else:
+                recipient['quizzes'].append((quiz_id, quiz_date))
+        batch.append(recipient)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def reminder_message(recipient):
+    """(subject, body) of the one reminder a recipient gets"""
+    lines = [f"Hi {recipient['full_name']},", ""]
+    if recipient['inactive']:
+        lines.append("You haven't visited Quiz Master in the last day. Don't forget to attempt the latest quizzes!")
+    quizzes = recipient['quizzes']
+    if quizzes:
+        if recipient['inactive']:
+            lines.append("")
+        lines.append("New quizzes you haven't attempted yet:" if len(quizzes) > 1 else "A new quiz has been created:")
+        lines.extend(f"- Quiz {quiz_id} (Date: {quiz_date})" for quiz_id, quiz_date in quizzes)
+        lines.append("Don't miss out - attempt them now!" if len(quizzes) > 1 else "Don't miss out - attempt it now!")
+    lines.extend(["", "Best,", "Quiz Master Team"])
+    if recipient['inactive']:
+        subject = "Quiz Master: Daily Reminder"
+    else:
+        subject = "Quiz Master: New Quizzes Available" if len(quizzes) > 1 else "Quiz Master: New Quiz Available"
+    return subject, "\n".join(lines)
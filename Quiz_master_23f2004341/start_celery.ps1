@@ -1,3 +1,8 @@
-# PowerShell script to start Celery worker with correct PYTHONPATH
+# PowerShell script to start one Celery worker per queue with correct PYTHONPATH
+# Pool and concurrency per queue come from CELERY_<QUEUE>_POOL / CELERY_<QUEUE>_CONCURRENCY (see env_template.txt)
+# prefork is not available on Windows, so these workers use the threads pool and do not enforce the task time limits
 $env:PYTHONPATH = "C:\Users\LENOVO\OneDrive\Desktop\Quiz_master_23f2004341"
-celery -A celery_worker worker --loglevel=info --pool=solo 
\ No newline at end of file
+foreach ($queue in @("interactive", "maintenance", "notifications")) {
+    Start-Process python -ArgumentList "celery_worker.py", $queue -NoNewWindow
+}
+python celery_worker.py reports 
\ No newline at end of file
@@ -0,0 +1,246 @@
+import os
+import uuid
+import socket
+import threading
+import click
+from datetime import datetime
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy.exc import OperationalError
+from extensions import db, redis_client, invalidate_tags
+from models import Score
+from aggregates import record_score, subject_ids_for_quizzes
+
+# Write-behind queue for quiz attempts.
+#
+# attempt_quiz grades the submission and appends it to a Redis stream (XADD),
+# then answers right away instead of waiting on SQLite's single writer lock.
+# A flusher (celery beat, or the flush-submissions command) reads the stream
+# through a consumer group, inserts the batch in one transaction together with
+# the score summaries, acknowledges it (XACK) and bumps each affected cache tag
+# once per batch.
+#
+# Crash safety: entries stay pending in the group until acknowledged. A flusher
+# that dies after reading is covered by XAUTOCLAIM (other flushers take over its
+# entries once idle for SUBMISSIONS_CLAIM_IDLE_MS); one that dies after
+# committing but before XACK is covered by Score.submission_id, which is unique
+# and makes replaying the same entry a no-op. Redis persistence (AOF, see
+# optimize_cache_performance) keeps the stream across Redis restarts.
+#
+# Flushes are serialized by a Redis lock: beat fires every couple of seconds
+# and the maintenance worker runs several threads, so a run that overlaps a
+# slower one just returns. The consumer name also carries the thread id, so
+# even flushers that do overlap (a lock lease running out) never re-read each
+# other's pending entries.
+#
+# Poison entries: when a batch fails to commit for anything but a busy or
+# unavailable database, its entries are saved one at a time so the good ones
+# go through. An entry that still fails stays pending and is retried by the
+# next run; once it has been delivered SUBMISSIONS_MAX_DELIVERIES times it is
+# copied to the dead-letter stream with the error and acknowledged, so one bad
+# entry cannot hold up the queue. The flush task only runs when write-behind is
+# on; entries left over after turning it off drain with flush-submissions.
+
+SUBMISSIONS_STREAM = "quiz_master:submissions"
+SUBMISSIONS_GROUP = "score-writers"
+SUBMISSIONS_DEAD_STREAM = "quiz_master:submissions:dead"
+FLUSH_LOCK_KEY = "quiz_master:lock:flush_submissions"
+
+def _consumer_name():
+    return f"{socket.gethostname()}-{os.getpid()}-{threading.get_ident()}"
+
+def write_behind_enabled():
+    return current_app.config.get('SUBMISSIONS_WRITE_BEHIND', False)
+
+def enqueue_submission(user_id, quiz_id, total_score, timestamp):
+    """Append a graded attempt to the stream; returns its submission id, or None if Redis is unavailable"""
+    submission_id = str(uuid.uuid4())
+    try:
+        redis_client.xadd(SUBMISSIONS_STREAM, {
+            'submission_id': submission_id,
+            'user_id': user_id,
+            'quiz_id': quiz_id,
+            'total_score': total_score,
+            'timestamp': timestamp.isoformat()
+        })
+    except Exception as e:
+        print(f"Submission queue error, saving synchronously: {e}")
+        return None
+    return submission_id
+
+def save_scores(scores):
+    """Insert Score rows with their summaries in the caller's transaction"""
+    subject_ids = subject_ids_for_quizzes({score.quiz_id for score in scores})
+    db.session.add_all(scores)
+    for score in scores:
+        record_score(score, subject_ids.get(score.quiz_id))
+
+def _ensure_group():
+    try:
+        redis_client.xgroup_create(SUBMISSIONS_STREAM, SUBMISSIONS_GROUP, id='0', mkstream=True)
+    except Exception as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+def _read_batch(consumer, count, claim_idle_ms):
+    # Entries abandoned by a dead flusher first, then new ones
+    _, claimed, *_ = redis_client.xautoclaim(
+        SUBMISSIONS_STREAM, SUBMISSIONS_GROUP, consumer, claim_idle_ms, start_id='0-0', count=count
+    )
+    if claimed:
+        return claimed
+    # Own entries that were read but never acknowledged (e.g. a failed commit)
+    pending = redis_client.xreadgroup(SUBMISSIONS_GROUP, consumer, {SUBMISSIONS_STREAM: '0'}, count=count)
+    if pending and pending[0][1]:
+        return pending[0][1]
+    new = redis_client.xreadgroup(SUBMISSIONS_GROUP, consumer, {SUBMISSIONS_STREAM: '>'}, count=count)
+    return new[0][1] if new else []
+
+def _parse_entry(fields):
+    return Score(
+        submission_id=fields['submission_id'],
+        user_id=int(fields['user_id']),
+        quiz_id=int(fields['quiz_id']),
+        total_score=int(fields['total_score']),
+        timestamp=datetime.fromisoformat(fields['timestamp'])
+    )
+
+def flush_submissions(batch_size=None, claim_idle_ms=None, max_batches=None):
+    """Move queued submissions into the database; returns the number of scores inserted"""
+    config = current_app.config
+    batch_size = batch_size or config.get('SUBMISSIONS_FLUSH_BATCH', 500)
+    claim_idle_ms = config.get('SUBMISSIONS_CLAIM_IDLE_MS', 60000) if claim_idle_ms is None else claim_idle_ms
+    lock = redis_client.lock(FLUSH_LOCK_KEY, timeout=config.get('SUBMISSIONS_FLUSH_LOCK_TIMEOUT', 300))
+    if not lock.acquire(blocking=False):
+        # Another flusher is draining the stream
+        return 0
+    try:
+        return _flush(batch_size, claim_idle_ms, max_batches, config.get('SUBMISSIONS_MAX_DELIVERIES', 5))
+    finally:
+        try:
+            lock.release()
+        except Exception as e:
+            # The lease ran out and another flusher may hold the lock now
+            print(f"Submission flush lock release error: {e}")
+
+def _flush(batch_size, claim_idle_ms, max_batches, max_deliveries=5):
+    consumer = _consumer_name()
+    _ensure_group()
+    inserted = batches = 0
+    while max_batches is None or batches < max_batches:
+        entries = _read_batch(consumer, batch_size, claim_idle_ms)
+        if not entries:
+            break
+        batches += 1
+        scores, entry_ids = {}, {}
+        for entry_id, fields in entries:
+            if fields is None:
+                # Trimmed from the stream while pending; nothing left to save
+                continue
+            try:
+                score = _parse_entry(fields)
+            except (KeyError, ValueError) as e:
+                print(f"Dropping malformed submission {entry_id}: {e}")
+                continue
+            scores[score.submission_id] = score
+            entry_ids[score.submission_id] = (entry_id, fields)
+        # Entries already committed by a flusher that died before XACK
+        existing = {sid for (sid,) in db.session.query(Score.submission_id)
+                    .filter(Score.submission_id.in_(list(scores)))}
+        new_scores = [score for sid, score in scores.items() if sid not in existing]
+        failed = {}
+        if new_scores:
+            try:
+                save_scores(new_scores)
+                db.session.commit()
+            except OperationalError:
+                # Database busy or unavailable: the whole batch stays pending for the next run
+                db.session.rollback()
+                raise
+            except Exception as e:
+                db.session.rollback()
+                print(f"Submission batch failed, saving its entries one by one: {e}")
+                new_scores, failed = _save_individually(
+                    [entry_ids[score.submission_id] for score in new_scores]
+                )
+        retrying = _dead_letter_exhausted(failed, max_deliveries) if failed else set()
+        acked = [entry_id for entry_id, _ in entries if entry_id not in retrying]
+        if acked:
+            redis_client.xack(SUBMISSIONS_STREAM, SUBMISSIONS_GROUP, *acked)
+        if new_scores:
+            user_ids = {score.user_id for score in new_scores}
+            invalidate_tags("scores", *[f"user:{user_id}:scores" for user_id in user_ids])
+        inserted += len(new_scores)
+        if retrying:
+            # They are read again first; leave that to the next run instead of spinning on them
+            break
+    # Acknowledged entries are no longer needed
+    if batches:
+        redis_client.xtrim(SUBMISSIONS_STREAM, minid=_oldest_pending_id(), approximate=True)
+    return inserted
+
+def _save_individually(entries):
+    """Commit each (entry_id, fields) on its own; returns (saved scores, {entry_id: (fields, error)})"""
+    saved, failed = [], {}
+    for entry_id, fields in entries:
+        # Fresh objects: the ones from the failed batch were rolled back with it
+        score = _parse_entry(fields)
+        try:
+            save_scores([score])
+            db.session.commit()
+        except OperationalError:
+            db.session.rollback()
+            raise
+        except Exception as e:
+            db.session.rollback()
+            failed[entry_id] = (fields, e)
+            continue
+        saved.append(score)
+    return saved, failed
+
+def _dead_letter_exhausted(failed, max_deliveries):
+    """Move entries delivered max_deliveries times to the dead-letter stream; returns the ids left to retry"""
+    pipe = redis_client.pipeline(transaction=False)
+    for entry_id in failed:
+        pipe.xpending_range(SUBMISSIONS_STREAM, SUBMISSIONS_GROUP, min=entry_id, max=entry_id, count=1)
+    deliveries = {entry_id: (pending[0]['times_delivered'] if pending else 0)
+                  for entry_id, pending in zip(failed, pipe.execute())}
+    retrying = set()
+    for entry_id, (fields, error) in failed.items():
+        if deliveries[entry_id] < max_deliveries:
+            print(f"Submission {entry_id} failed (delivery {deliveries[entry_id]} of {max_deliveries}): {error}")
+            retrying.add(entry_id)
+            continue
+        print(f"Dead-lettering submission {entry_id} after {deliveries[entry_id]} deliveries: {error}")
+        redis_client.xadd(SUBMISSIONS_DEAD_STREAM, {**fields, 'entry_id': entry_id, 'error': str(error)[:500]})
+    return retrying
+
+def _oldest_pending_id():
+    summary = redis_client.xpending(SUBMISSIONS_STREAM, SUBMISSIONS_GROUP)
+    if summary and summary.get('pending'):
+        return summary['min']
+    # Nothing pending: everything up to the last delivered entry can go
+    for group in redis_client.xinfo_groups(SUBMISSIONS_STREAM):
+        if group['name'] == SUBMISSIONS_GROUP:
+            last_id = group['last-delivered-id']
+            ms, seq = (int(part) for part in last_id.split('-'))
+            return f"{ms}-{seq + 1}"
+    return '0-0'
+
+def submission_queue_stats():
+    try:
+        _ensure_group()
+        pending = redis_client.xpending(SUBMISSIONS_STREAM, SUBMISSIONS_GROUP)
+        return {'length': redis_client.xlen(SUBMISSIONS_STREAM), 'pending': pending.get('pending', 0),
+                'dead': redis_client.xlen(SUBMISSIONS_DEAD_STREAM)}
+    except Exception as e:
+        print(f"Submission queue stats error: {e}")
+        return {}
+
+@click.command('flush-submissions')
+@click.option('--claim-all', is_flag=True, help='Also take over entries pending on other (possibly dead) flushers.')
+@with_appcontext
+def flush_submissions_command(claim_all):
+    """Write every queued quiz submission to the database."""
+    inserted = flush_submissions(claim_idle_ms=0 if claim_all else None)
+    click.echo(f"{inserted} submission(s) written.")